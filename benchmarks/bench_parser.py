@@ -0,0 +1,205 @@
+"""Benchmarks for the GDSF parser.
+
+Generates a synthetic corpus (see ``corpus.py``) and measures, for each
+loader, parse time, throughput in MB/s and records/s and peak Python heap;
+then the latency of the indexed lookups.
+
+    python benchmarks/bench_parser.py                  # run and compare
+    python benchmarks/bench_parser.py --save-baseline  # record this machine
+
+Baselines are stored per corpus configuration in ``baseline.json`` next to
+this file (not committed, since timings are machine specific). A run that is
+slower, or uses more memory, than the baseline by more than ``--tolerance``
+reports the regression and exits with status 1.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from gdsf import GDSFParser, iter_records  # noqa: E402
+from gdsf.mapped import MappedGDSFReader  # noqa: E402
+
+from corpus import add_corpus_arguments, corpus_options, write_corpus  # noqa: E402
+
+BASELINE_FILE = Path(__file__).with_name("baseline.json")
+# Metrics checked against the baseline (lower is better). Throughput figures
+# are derived from ``seconds`` and would only repeat its verdict.
+COMPARED = ("seconds", "peak_mb", "us_per_call")
+
+
+def _parse_text(path):
+    return GDSFParser(path)
+
+
+def _iter_text(path):
+    with open(path) as f:
+        for _ in iter_records(f):
+            pass
+
+
+def _iter_mapped(path):
+    with MappedGDSFReader(path) as reader:
+        for _ in reader.iter_records():
+            pass
+
+
+def _parse_snapshot(path):
+    return GDSFParser(path, snapshot=True)
+
+
+LOADERS = {
+    "parser": _parse_text,
+    "iter_records": _iter_text,
+    "mapped": _iter_mapped,
+    "snapshot_warm": _parse_snapshot,
+}
+
+
+def _best_time(func, path, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(path)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def _peak_memory(func, path):
+    tracemalloc.start()
+    try:
+        func(path)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_loaders(path, records, repeat):
+    size_mb = os.path.getsize(path) / 1e6
+    # Prime the snapshot sidecar so the warm path is measured.
+    _parse_snapshot(path)
+    results = {}
+    for name, func in LOADERS.items():
+        seconds = _best_time(func, path, repeat)
+        results[name] = {
+            "seconds": seconds,
+            "mb_per_s": size_mb / seconds,
+            "records_per_s": records / seconds,
+            "peak_mb": _peak_memory(func, path) / 1e6,
+        }
+    return results
+
+
+def bench_lookups(path, samples, seed):
+    parser = GDSFParser(path)
+    rng = random.Random(seed)
+    ids = [s["id"] for s in parser.schemas] or ["missing"]
+    names = [s["name"] for s in parser.schemas] or ["missing"]
+    sections = list(parser.sections) or ["missing"]
+    lookups = {
+        "get_schema": (parser.get_schema, ids),
+        "get_schemas_by_name": (parser.get_schemas_by_name, names),
+        "get_schemas_by_type": (parser.get_schemas_by_type, ["component", "mechanic"]),
+        "get_edges_from": (parser.get_edges_from, ids),
+        "get_section": (parser.get_section, sections),
+    }
+    results = {}
+    for name, (func, keys) in lookups.items():
+        args = [rng.choice(keys) for _ in range(samples)]
+        start = time.perf_counter()
+        for arg in args:
+            func(arg)
+        results[name] = {"us_per_call": (time.perf_counter() - start) / samples * 1e6}
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return human-readable regressions of ``results`` against ``baseline``."""
+    regressions = []
+    for group, metrics in baseline.items():
+        for metric, old in metrics.items():
+            new = results.get(group, {}).get(metric)
+            if metric not in COMPARED or new is None or not old:
+                continue
+            change = (new - old) / old
+            # Sub-MB heap figures are dominated by noise.
+            if metric == "peak_mb" and new - old < 1:
+                continue
+            if change > tolerance:
+                regressions.append(f"{group}.{metric}: {old:.3f} -> {new:.3f} ({change:+.0%})")
+    return regressions
+
+
+def _print_table(title, results):
+    print(title)
+    for name, metrics in results.items():
+        cells = "  ".join(f"{metric}={value:,.3f}" for metric, value in metrics.items())
+        print(f"  {name:<20} {cells}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GDSF parser benchmarks.")
+    add_corpus_arguments(parser)
+    parser.add_argument("--corpus", help="benchmark this file instead of generating one")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per loader (best wins)")
+    parser.add_argument("--lookups", type=int, default=20000, help="calls per lookup benchmark")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--baseline-file", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if args.corpus:
+            # Work on a copy: the snapshot loader writes a sidecar next to
+            # the file it reads.
+            path = os.path.join(tmpdir, Path(args.corpus).name)
+            shutil.copyfile(args.corpus, path)
+            key = f"file:{Path(path).name}:{os.path.getsize(path)}"
+        else:
+            options = corpus_options(args)
+            path = os.path.join(tmpdir, "corpus.gdsf")
+            write_corpus(path, **options)
+            key = json.dumps(options, sort_keys=True)
+
+        with open(path) as f:
+            records = sum(1 for _ in iter_records(f))
+        print(f"Corpus: {os.path.getsize(path) / 1e6:.1f} MB, {records:,} records")
+        results = bench_loaders(path, records, args.repeat)
+        lookups = bench_lookups(path, args.lookups, args.seed)
+
+    _print_table("Loaders", results)
+    _print_table("Lookups", lookups)
+    results.update(lookups)
+
+    baselines = {}
+    if args.baseline_file.exists():
+        baselines = json.loads(args.baseline_file.read_text())
+    if args.save_baseline:
+        baselines[key] = results
+        args.baseline_file.write_text(json.dumps(baselines, indent=2) + "\n")
+        print(f"Saved baseline to {args.baseline_file}")
+        return 0
+    if key not in baselines:
+        print("No baseline for this corpus; run with --save-baseline to record one.")
+        return 0
+
+    regressions = compare(results, baselines[key], args.tolerance)
+    if regressions:
+        print(f"Regressions beyond {args.tolerance:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"No regressions beyond {args.tolerance:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Synthetic GDSF corpus generator for the parser benchmarks.
+
+The generated files exercise every path of the parser: ``[meta]``,
+``[schema]`` and ``[edge]`` records, free-form JSON sections, multi-line values
+(including blank lines), comments and malformed lines that the parser
+has to skip. Output is deterministic for a given seed.
+
+    python benchmarks/corpus.py out.gdsf --schemas 100000 --edges 200000
+"""
+
+import argparse
+import json
+import random
+
+PROPERTIES = ("component", "mechanic", "skill", "emotion")
+RELATIONS = ("uses", "requires", "evokes", "supports")
+WORDS = (
+    "play", "unit", "board", "token", "score", "turn", "risk", "trust",
+    "quest", "craft", "trade", "build", "timer", "reward", "focus", "story",
+)
+
+
+def _text(rng, size):
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def _multiline(rng, size):
+    """A quoted value spread over several lines, with a blank line inside."""
+    lines = [_text(rng, 20) for _ in range(max(2, size // 20))]
+    lines.insert(len(lines) // 2, "")
+    return '"' + "\n".join(lines) + '"'
+
+
+def iter_corpus(
+    schemas=1000,
+    edges=2000,
+    sections=50,
+    value_size=40,
+    multiline_ratio=0.2,
+    comment_ratio=0.05,
+    malformed_ratio=0.02,
+    seed=0,
+):
+    """Yield the corpus text block by block, so huge files never sit in memory."""
+    rng = random.Random(seed)
+
+    def noise():
+        parts = []
+        if rng.random() < comment_ratio:
+            parts.append(f"# {_text(rng, 30)}\n")
+        if rng.random() < malformed_ratio:
+            parts.append(f"{_text(rng, 20)}\n")
+        return "".join(parts)
+
+    yield f'[meta]\nversion = "1"\ngenerator = "benchmarks/corpus.py"\nseed = "{seed}"\n\n'
+
+    for i in range(schemas):
+        if rng.random() < multiline_ratio:
+            description = _multiline(rng, value_size)
+        else:
+            description = f'"{_text(rng, value_size)}"'
+        yield (
+            f"{noise()}[schema]\n"
+            f"id = S{i}\n"
+            f'name = "{rng.choice(WORDS).title()} {i}"\n'
+            f'property = "{rng.choice(PROPERTIES)}"\n'
+            f"description = {description}\n\n"
+        )
+
+    for _ in range(edges if schemas else 0):
+        yield (
+            f"{noise()}[edge]\n"
+            f"from = S{rng.randrange(schemas)}\n"
+            f"to = S{rng.randrange(schemas)}\n"
+            f'relation = "{rng.choice(RELATIONS)}"\n\n'
+        )
+
+    for i in range(sections):
+        payload = {
+            f"k{j}": [_text(rng, value_size // 2) for _ in range(3)]
+            for j in range(max(1, value_size // 40))
+        }
+        # Stored the way ``app_utils`` saves JSON sections.
+        yield f'{noise()}[section_{i}]\nvalue = "{json.dumps(payload)}"\n\n'
+
+
+def write_corpus(path, **options):
+    """Write a corpus to ``path`` and return its size in bytes."""
+    size = 0
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for block in iter_corpus(**options):
+            size += f.write(block)
+    return size
+
+
+def add_corpus_arguments(parser):
+    parser.add_argument("--schemas", type=int, default=20000)
+    parser.add_argument("--edges", type=int, default=40000)
+    parser.add_argument("--sections", type=int, default=200)
+    parser.add_argument("--value-size", type=int, default=80)
+    parser.add_argument("--multiline-ratio", type=float, default=0.2)
+    parser.add_argument("--comment-ratio", type=float, default=0.05)
+    parser.add_argument("--malformed-ratio", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def corpus_options(args):
+    return {
+        "schemas": args.schemas,
+        "edges": args.edges,
+        "sections": args.sections,
+        "value_size": args.value_size,
+        "multiline_ratio": args.multiline_ratio,
+        "comment_ratio": args.comment_ratio,
+        "malformed_ratio": args.malformed_ratio,
+        "seed": args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+    size = write_corpus(args.path, **corpus_options(args))
+    print(f"Wrote {size / 1e6:.1f} MB to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,5 @@
-from .main import GDSFParser
+from .main import GDSFParser, iter_records
+from .store import ConflictError, GDSFStore, StorageBackend
+from .sqlite_store import SQLiteStore
+from .backends import open_store
+from .journal import Journal
@@ -0,0 +1,29 @@
+"""Choose the section store for a project file."""
+
+import os
+
+from .sqlite_store import SQLiteStore
+from .store import GDSFStore
+
+BACKENDS = {"gdsf": GDSFStore, "sqlite": SQLiteStore}
+SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+
+
+def backend_for(path):
+    """Return the backend name implied by the suffix of ``path``."""
+    suffix = os.path.splitext(str(path))[1].lower()
+    return "sqlite" if suffix in SQLITE_SUFFIXES else "gdsf"
+
+
+def open_store(path, backend=None, **options):
+    """Open the section store for ``path``.
+
+    ``backend`` is ``"gdsf"`` or ``"sqlite"``; by default it follows the
+    suffix of ``path``. ``options`` go to the store's constructor.
+    """
+    backend = backend or backend_for(path)
+    try:
+        cls = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown storage backend: {backend!r}") from None
+    return cls(path, **options)
@@ -0,0 +1,362 @@
+"""Append-only change journal for section stores.
+
+The journal lives next to its store (``info.gdsf.journal``), one JSON object
+per line. Every change records the previous and the new value of each
+section it touches, so undo and redo only rewrite those sections. Undo and
+redo are journaled too: the undo and redo stacks can be rebuilt from the
+file by any process, and every past state can be replayed.
+
+The journal is written ahead of the store. A change is appended first, then
+applied to the store, then confirmed by a ``commit`` marker (or an ``abort``
+marker if the store refused it). Only confirmed changes count. A change
+left without a marker by a crashed writer is settled by the next writer:
+it is committed if the store holds its new values and aborted otherwise.
+
+Every ``checkpoint_every`` changes a full copy of the sections is appended,
+so rebuilding a past state replays at most that many entries::
+
+    {"seq": 1, "ts": 1.7e9, "op": "checkpoint", "sections": {...}}
+    {"seq": 2, "ts": 1.7e9, "op": "edit", "changes": {"theme": [before, after]}}
+    {"seq": 3, "ts": 1.7e9, "op": "commit", "target": 2}
+    {"seq": 4, "ts": 1.7e9, "op": "undo", "target": 2, "changes": {...}}
+    {"seq": 5, "ts": 1.7e9, "op": "commit", "target": 4}
+    {"seq": 6, "ts": 1.7e9, "op": "redo", "target": 2, "changes": {...}}
+    {"seq": 7, "ts": 1.7e9, "op": "abort", "target": 6}
+    {"seq": 8, "ts": 1.7e9, "op": "restore", "target": 1, "changes": {...}}
+    {"seq": 9, "ts": 1.7e9, "op": "commit", "target": 8}
+
+``before`` and ``after`` are section values, ``null`` for a section that did
+not exist. The journal is locked with ``flock`` while a change is committed,
+so processes sharing a project keep one consistent history.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .store import _O_BINARY, locked_file, normalize_sections
+
+
+def apply_changes(store, changes, **options):
+    """Write ``changes`` to ``store``; ``None`` values delete their section.
+
+    ``options`` (``atomic``, ``expected_revision``) go to the store.
+    """
+    if all(values is not None for values in changes.values()):
+        return store.write(changes, **options)
+    sections = dict(store.read()[1])
+    for name, values in changes.items():
+        if values is None:
+            sections.pop(name, None)
+        else:
+            sections[name] = values
+    return store.replace(sections, expected_revision=options.get("expected_revision"))
+
+
+class Journal:
+    """Undo/redo history of a section store, kept in the file ``path``."""
+
+    def __init__(self, path, checkpoint_every=50):
+        self.path = path
+        self.checkpoint_every = checkpoint_every
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._reset()
+
+    def _reset(self):
+        self._offset = 0  # Bytes of the file indexed so far.
+        self._seq = 0
+        self._spans = {}  # seq -> (offset, length) of its line.
+        self._entries = []  # Summaries for ``history()``.
+        self._checkpoints = []
+        self._committed = set()
+        self._pending = None  # Summary of a change awaiting its marker.
+        self._since_checkpoint = 0
+        self._undo = []
+        self._redo = []
+
+    # -- reading -----------------------------------------------------------
+
+    def _refresh(self):
+        """Index the lines appended since the last call."""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+        if size < self._offset:
+            self._reset()  # The file was replaced.
+        if size == self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        offset = self._offset
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break  # A write still in flight; index it next time.
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                entry = None  # Torn by a crash: skip it.
+            if entry is not None:
+                self._track(entry, offset, len(line))
+            offset += len(line)
+        self._offset = offset
+
+    def _track(self, entry, offset, length):
+        seq = entry["seq"]
+        op = entry["op"]
+        self._seq = seq
+        self._spans[seq] = (offset, length)
+        if op in ("commit", "abort"):
+            pending, self._pending = self._pending, None
+            if op == "commit" and pending is not None and pending["seq"] == entry["target"]:
+                self._confirm(pending)
+            return
+        summary = {
+            "seq": seq,
+            "ts": entry["ts"],
+            "op": op,
+            "target": entry.get("target"),
+            "sections": list(entry.get("changes", ())),
+        }
+        if op == "checkpoint":
+            self._entries.append(summary)
+            self._checkpoints.append(seq)
+            self._since_checkpoint = 0
+        else:
+            self._pending = summary
+
+    def _confirm(self, summary):
+        """Apply a committed change to the history and the undo/redo stacks."""
+        seq = summary["seq"]
+        self._entries.append(summary)
+        self._committed.add(seq)
+        self._since_checkpoint += 1
+        op = summary["op"]
+        if op == "undo":
+            self._undo.remove(summary["target"])
+            self._redo.append(summary["target"])
+        elif op == "redo":
+            self._redo.remove(summary["target"])
+            self._undo.append(summary["target"])
+        else:  # edit, restore
+            self._undo.append(seq)
+            self._redo.clear()
+
+    def _read(self, first, last=None):
+        """Return the entries ``first`` to ``last`` (inclusive) from the file."""
+        last = first if last is None else last
+        start = self._spans[first][0]
+        end = sum(self._spans[last])
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        entries = []
+        for line in data.splitlines():
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                pass
+        return entries
+
+    def history(self):
+        """Return every committed change and checkpoint, oldest first.
+
+        Entries are ``{seq, ts, op, target, sections}``.
+        """
+        with self._lock:
+            self._refresh()
+            return [dict(entry) for entry in self._entries]
+
+    def can_undo(self):
+        with self._lock:
+            self._refresh()
+            return bool(self._undo)
+
+    def can_redo(self):
+        with self._lock:
+            self._refresh()
+            return bool(self._redo)
+
+    def seq_at(self, timestamp):
+        """Return the last entry written at or before ``timestamp`` (or ``None``)."""
+        with self._lock:
+            self._refresh()
+            found = None
+            for entry in self._entries:
+                if entry["ts"] > timestamp:
+                    break
+                found = entry["seq"]
+            return found
+
+    def state_at(self, seq):
+        """Rebuild the sections as they were right after entry ``seq``."""
+        with self._lock:
+            self._refresh()
+            if seq not in self._committed and seq not in self._checkpoints:
+                raise ValueError(f"No journal entry {seq}.")
+            base = max((c for c in self._checkpoints if c <= seq), default=None)
+            if base is None:
+                raise ValueError(f"No checkpoint at or before journal entry {seq}.")
+            sections = {}
+            for entry in self._read(base, seq):
+                if entry["op"] == "checkpoint":
+                    sections = dict(entry["sections"])
+                    continue
+                if entry["seq"] not in self._committed:
+                    continue  # A marker, or a change that never went through.
+                for name, (_, after) in entry["changes"].items():
+                    if after is None:
+                        sections.pop(name, None)
+                    else:
+                        sections[name] = after
+            return sections
+
+    # -- writing -----------------------------------------------------------
+
+    @contextmanager
+    def _locked(self, store):
+        """Hold the journal lock (re-entrant) with the index up to date.
+
+        A change left unsettled by a crashed writer is settled against
+        ``store`` first.
+        """
+        with self._lock:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            with locked_file(self.path):
+                self._lock_depth += 1
+                try:
+                    self._refresh()
+                    self._settle(store)
+                    yield
+                finally:
+                    self._lock_depth -= 1
+
+    def _append(self, entry):
+        entry = {"seq": self._seq + 1, "ts": time.time(), **entry}
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        data = line
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT | _O_BINARY, 0o666)
+        try:
+            offset = os.fstat(fd).st_size
+            if offset:
+                # Cut off a line torn by a crash so it cannot swallow ours.
+                os.lseek(fd, offset - 1, os.SEEK_SET)
+                if os.read(fd, 1) != b"\n":
+                    data = b"\n" + line
+                    offset += 1
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self._track(entry, offset, len(line))
+        self._offset = offset + len(line)
+        return entry["seq"]
+
+    def _settle(self, store):
+        """Commit or abort a change whose writer died before its marker."""
+        if self._pending is None:
+            return
+        seq = self._pending["seq"]
+        (entry,) = self._read(seq)
+        # Compare with what actually reached storage, not with a cache a
+        # failed write may have left behind.
+        store.reload()
+        current = store.read()[1]
+        applied = all(current.get(name) == after for name, (_, after) in entry["changes"].items())
+        self._append({"op": "commit" if applied else "abort", "target": seq})
+
+    def _record(self, store, op, changes, target=None, **options):
+        """Journal ``changes``, apply them to ``store`` and confirm them."""
+        before = dict(store.read()[1])
+        if not self._seq:
+            # Baseline, so restoring to before the first change works.
+            self._append({"op": "checkpoint", "sections": before})
+        after = normalize_sections({n: v for n, v in changes.items() if v is not None})
+        diff = {
+            name: [before.get(name), after.get(name)]
+            for name in changes
+            if before.get(name) != after.get(name)
+        }
+        if not diff and op == "edit":
+            return apply_changes(store, changes, **options)
+        entry = {"op": op, "changes": diff}
+        if target is not None:
+            entry["target"] = target
+        seq = self._append(entry)
+        try:
+            version = apply_changes(store, changes, **options)
+        except BaseException:
+            self._settle(store)
+            raise
+        self._append({"op": "commit", "target": seq})
+        if self._since_checkpoint >= self.checkpoint_every:
+            self._append({"op": "checkpoint", "sections": dict(store.read()[1])})
+        return version
+
+    def commit(self, store, changes, **options):
+        """Write ``changes`` (``None`` deletes a section) and journal them.
+
+        Returns the store's new version. ``options`` go to the store; a
+        stale ``expected_revision`` raises and the change is journaled as
+        aborted.
+        """
+        with self._locked(store):
+            return self._record(store, "edit", changes, **options)
+
+    def undo(self, store):
+        """Revert the latest change that is not undone yet.
+
+        Returns the journal ``seq`` of the reverted change, or ``None`` if
+        there is nothing to undo.
+        """
+        with self._locked(store):
+            if not self._undo:
+                return None
+            target = self._undo[-1]
+            (entry,) = self._read(target)
+            changes = {name: before for name, (before, _) in entry["changes"].items()}
+            self._record(store, "undo", changes, target)
+            return target
+
+    def redo(self, store):
+        """Re-apply the latest undone change; returns its ``seq`` or ``None``."""
+        with self._locked(store):
+            if not self._redo:
+                return None
+            target = self._redo[-1]
+            (entry,) = self._read(target)
+            changes = {name: after for name, (_, after) in entry["changes"].items()}
+            self._record(store, "redo", changes, target)
+            return target
+
+    def restore(self, store, seq):
+        """Bring ``store`` back to its state right after entry ``seq``.
+
+        The restore is journaled as a change of its own, so it can be undone.
+        """
+        with self._locked(store):
+            target = self.state_at(seq)
+            current = store.read()[1]
+            changes = {
+                name: target.get(name)
+                for name in [*target, *(n for n in current if n not in target)]
+                if current.get(name) != target.get(name)
+            }
+            self._record(store, "restore", changes, seq)
+
+    def checkpoint(self, store):
+        """Append a full copy of the store's sections; returns its ``seq``."""
+        with self._locked(store):
+            return self._append({"op": "checkpoint", "sections": dict(store.read()[1])})
@@ -1,80 +1,264 @@
+import io
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+# Sections the parser always materializes, even when their block is empty.
+_RECORD_SECTIONS = ("schema", "edge", "meta")
+# Attributes filled by parsing; a lazy parser loads the file on first access.
+_PARSED_ATTRS = (
+    "edges",
+    "meta",
+    "sections",
+    "schemas",
+    "seen_ids",
+    "_by_property",
+    "_by_id",
+    "_by_name",
+    "_outgoing",
+    "_incoming",
+)
+
+
+def normalize_name(name):
+    """Return the lookup key for a schema name (spaces and case ignored)."""
+    return name.replace(" ", "").casefold()
+
+
+def iter_records(lines):
+    """Yield ``(section_type, values, line_number)`` for each block in ``lines``.
+
+    ``lines`` is any iterable of text lines, such as an open file. A record is
+    yielded as soon as its block ends, so memory is bounded by the largest
+    block rather than the whole document. ``line_number`` is the line of the
+    block's ``[header]``.
+    """
+    section = None
+    start = 0
+    current = {}
+    line_num = 0
+    pending_key = None
+    pending_lines: list[str] = []
+    for line_num, raw_line in enumerate(lines, start=1):
+        stripped = raw_line.strip()
+
+        if pending_key is not None:
+            # We are collecting a multi-line value. Preserve exact
+            # line contents (without the trailing newline) including
+            # blank lines.
+            pending_lines.append(raw_line.rstrip("\n"))
+            if stripped.endswith('"'):
+                value = "\n".join(pending_lines).strip()
+                if value.startswith('"') and value.endswith('"'):
+                    value = value[1:-1]
+                current[pending_key] = value
+                pending_key = None
+                pending_lines = []
+            continue
+
+        if not stripped or stripped.startswith("#"):
+            continue
+
+        if stripped.startswith("[") and stripped.endswith("]"):
+            if section and current:
+                yield section, current, start
+            section = stripped[1:-1]
+            start = line_num
+            current = {}
+        else:
+            if "=" not in raw_line:
+                # Ignore malformed lines outside of a multi-line value
+                continue
+            key, value = raw_line.split("=", 1)
+            key = key.strip()
+            value = value.strip()
+            if value.startswith('"') and not value.endswith('"'):
+                # Begin multi-line value and continue collecting in
+                # subsequent iterations until we hit a closing quote.
+                pending_key = key
+                pending_lines = [value]
+            else:
+                current[key] = value.strip('"')
+
+    # Add last entry
+    if pending_key is not None:
+        value = "\n".join(pending_lines).strip()
+        if value.startswith('"') and value.endswith('"'):
+            value = value[1:-1]
+        current[pending_key] = value
+    if section and (current or section in _RECORD_SECTIONS):
+        yield section, current, start
+
+
+def _load_file(filepath):
+    """Parse one file for ``GDSFParser.load_many``.
+
+    Returns the parser and the header line of each schema ID, so the caller
+    can point at both sides of a cross-file duplicate.
+    """
+    parser = GDSFParser.__new__(GDSFParser)
+    parser.filepath = filepath
+    parser.snapshot = False
+    parser._reset()
+    schema_lines = {}
+    try:
+        with open(filepath) as f:
+            for section, values, line_num in iter_records(f):
+                parser._add_record(section, values, line_num)
+                if section == "schema":
+                    schema_lines[values["id"]] = line_num
+    except ValueError as exc:
+        raise ValueError(f"{filepath}: {exc}") from exc
+    return parser, schema_lines
+
+
 class GDSFParser:
-    def __init__(self, filepath):
+    def __init__(self, filepath, lazy=False, snapshot=False):
+        """Parse ``filepath``.
+
+        With ``lazy`` nothing is read up front: ``get_section`` streams the
+        file on demand and the first access to ``schemas``, ``edges``,
+        ``meta`` or ``sections`` parses it completely.
+
+        With ``snapshot`` the parsed records are cached in a binary sidecar
+        next to the source (see ``gdsf.snapshot``). Later loads of an
+        unchanged source read the sidecar instead of parsing the text.
+        """
+        self.filepath = filepath
+        self.snapshot = snapshot
+        if not lazy:
+            self._load()
+
+    @classmethod
+    def from_string(cls, text):
+        """Parse GDSF ``text`` that is already held in memory."""
+        parser = cls.__new__(cls)
+        parser.filepath = None
+        parser._reset()
+        parser._parse(io.StringIO(text))
+        return parser
+
+    @classmethod
+    def load_many(cls, paths, workers=None, check_duplicates=True):
+        """Parse several files in parallel and return their parsers in order.
+
+        Files are spread over a pool of ``workers`` processes (all CPUs by
+        default; ``1`` parses in this process). Each file is validated on
+        its own as usual. With ``check_duplicates`` a schema ID defined in
+        more than one file raises a ``ValueError`` that lists every
+        conflict with its files and lines.
+        """
+        paths = list(paths)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(paths))
+        if workers <= 1:
+            results = [_load_file(path) for path in paths]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                chunksize = max(1, len(paths) // (workers * 4))
+                results = list(pool.map(_load_file, paths, chunksize=chunksize))
+
+        if check_duplicates:
+            first_seen = {}
+            conflicts = []
+            for path, (_, schema_lines) in zip(paths, results):
+                for schema_id, line_num in schema_lines.items():
+                    if schema_id in first_seen:
+                        other_path, other_line = first_seen[schema_id]
+                        conflicts.append(
+                            f"'{schema_id}' in {other_path} line {other_line} "
+                            f"and {path} line {line_num}"
+                        )
+                    else:
+                        first_seen[schema_id] = (path, line_num)
+            if conflicts:
+                raise ValueError("Duplicate schema IDs across files: " + "; ".join(conflicts))
+        return [parser for parser, _ in results]
+
+    def __getattr__(self, name):
+        # Only reached for attributes that are not set yet, i.e. on the first
+        # access to parsed data of a lazy parser.
+        if name in _PARSED_ATTRS:
+            self._load()
+            return getattr(self, name)
+        raise AttributeError(name)
+
+    def _reset(self):
         self.edges = []
         self.meta = {}
         self.sections = {}
         self.schemas = []
         self.seen_ids = set()
-        self._parse(filepath)
-
-    def _parse(self, filepath):
-        section = None
-        current = {}
-        line_num = 0
-        pending_key = None
-        pending_lines: list[str] = []
-        with open(filepath) as f:
-            for line_num, raw_line in enumerate(f, start=1):
-                stripped = raw_line.strip()
-
-                if pending_key is not None:
-                    # We are collecting a multi-line value. Preserve exact
-                    # line contents (without the trailing newline) including
-                    # blank lines.
-                    pending_lines.append(raw_line.rstrip("\n"))
-                    if stripped.endswith('"'):
-                        value = "\n".join(pending_lines).strip()
-                        if value.startswith('"') and value.endswith('"'):
-                            value = value[1:-1]
-                        current[pending_key] = value
-                        pending_key = None
-                        pending_lines = []
-                    continue
-
-                if not stripped or stripped.startswith("#"):
-                    continue
-
-                if stripped.startswith("[") and stripped.endswith("]"):
-                    if section == "schema" and current:
-                        self._append_validated_schema(current, line_num)
-                    elif section == "edge" and current:
-                        self.edges.append(current)
-                    elif section == "meta" and current:
-                        self.meta.update(current)
-                    elif section and current:
-                        self.sections[section] = current
-                    section = stripped[1:-1]
-                    current = {}
-                else:
-                    if "=" not in raw_line:
-                        # Ignore malformed lines outside of a multi-line value
-                        continue
-                    key, value = raw_line.split("=", 1)
-                    key = key.strip()
-                    value = value.strip()
-                    if value.startswith('"') and not value.endswith('"'):
-                        # Begin multi-line value and continue collecting in
-                        # subsequent iterations until we hit a closing quote.
-                        pending_key = key
-                        pending_lines = [value]
-                    else:
-                        current[key] = value.strip('"')
+        # Secondary indexes over ``schemas`` and ``edges``.
+        self._by_property = {}
+        self._by_id = {}
+        self._by_name = {}
+        self._outgoing = {}
+        self._incoming = {}
 
-            # Add last entry
-            if pending_key is not None:
-                value = "\n".join(pending_lines).strip()
-                if value.startswith('"') and value.endswith('"'):
-                    value = value[1:-1]
-                current[pending_key] = value
+    def _load(self):
+        self._reset()
+        if self.snapshot:
+            self._load_with_snapshot()
+            return
+        with open(self.filepath) as f:
+            self._parse(f)
+
+    def _load_with_snapshot(self):
+        from . import snapshot
+        from .store import atomic_write
+
+        with open(self.filepath, "rb") as f:
+            data = f.read()
+        digest = snapshot.source_digest(data)
+        sidecar = snapshot.snapshot_path(self.filepath)
+        try:
+            with open(sidecar, "rb") as f:
+                records = snapshot.load(f.read(), digest)
+        except (OSError, ValueError, IndexError, struct.error):
+            records = None
+
+        if records is None:
+            # Decode exactly like ``open()`` in text mode would.
+            text = io.TextIOWrapper(io.BytesIO(data))
+            records = list(iter_records(text))
+            for section, values, line_num in records:
+                self._add_record(section, values, line_num)
+            try:
+                atomic_write(sidecar, snapshot.dump(records, digest))
+            except OSError:
+                pass  # A read-only location just means no warm loads.
+            return
+
+        # The sidecar was only written after this content passed validation,
+        # so a warm load just rebuilds the indexes.
+        for section, values, line_num in records:
             if section == "schema":
-                self._append_validated_schema(current, line_num)
-            elif section == "edge":
-                self.edges.append(current)
-            elif section == "meta":
-                self.meta.update(current)
-            elif section and current:
-                self.sections[section] = current
-    
+                self.seen_ids.add(values["id"])
+                self._append_schema(values)
+            else:
+                self._add_record(section, values, line_num)
+
+    def _parse(self, lines):
+        for section, values, line_num in iter_records(lines):
+            self._add_record(section, values, line_num)
+
+    def _add_record(self, section, values, line_num):
+        if section == "schema":
+            self._append_validated_schema(values, line_num)
+        elif section == "edge":
+            self._append_edge(values)
+        elif section == "meta":
+            self.meta.update(values)
+        else:
+            self.sections[section] = values
+
+    def iter_records(self):
+        """Stream ``(section_type, values, line_number)`` records from the file."""
+        with open(self.filepath) as f:
+            yield from iter_records(f)
+
     def _validate_schema(self, schema, line_num):
         prop = schema.get("property", "").replace(" ", "")
         schema_id = schema.get("id")
@@ -105,10 +289,46 @@ class GDSFParser:
         
     def _append_validated_schema(self,schema,line_num):
         self._validate_schema(schema, line_num)
+        self._append_schema(schema)
+
+    def _append_schema(self, schema):
         self.schemas.append(schema)
+        self._by_id[schema["id"]] = schema
+        self._by_property.setdefault(schema.get("property"), []).append(schema)
+        self._by_name.setdefault(normalize_name(schema["name"]), []).append(schema)
+
+    def _append_edge(self, edge):
+        self.edges.append(edge)
+        self._outgoing.setdefault(edge.get("from"), []).append(edge)
+        self._incoming.setdefault(edge.get("to"), []).append(edge)
 
     def get_schemas_by_type(self, property_type):
-        return [s for s in self.schemas if s.get("property") == property_type]
+        return list(self._by_property.get(property_type, []))
+
+    def get_schema(self, schema_id):
+        """Return the schema with ``schema_id`` or ``None``."""
+        return self._by_id.get(schema_id)
+
+    def get_schemas_by_name(self, name):
+        """Return schemas whose name matches ``name``, ignoring spaces and case."""
+        return list(self._by_name.get(normalize_name(name), []))
+
+    def get_edges_from(self, schema_id):
+        """Return the edges leaving ``schema_id``."""
+        return list(self._outgoing.get(schema_id, []))
+
+    def get_edges_to(self, schema_id):
+        """Return the edges pointing at ``schema_id``."""
+        return list(self._incoming.get(schema_id, []))
     
     def get_section(self, name):
-        return self.sections.get(name, {})
+        if "sections" in self.__dict__ or name in _RECORD_SECTIONS:
+            return self.sections.get(name, {})
+        # Lazy parser: stream the file and keep only blocks named ``name``.
+        # A later block of the same name overrides an earlier one, so the
+        # scan has to reach the end of the file.
+        found = {}
+        for section, values, _ in self.iter_records():
+            if section == name:
+                found = values
+        return found
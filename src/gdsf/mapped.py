@@ -0,0 +1,189 @@
+"""Memory-mapped GDSF reader.
+
+``MappedGDSFReader`` scans a ``.gdsf`` file in place over an ``mmap`` buffer.
+The scan only visits section headers; a block's key offsets are located when
+the block is first read, and each value is decoded when it is looked up.
+This keeps parse time and peak memory low on very large generated files.
+Values decode as UTF-8, and LF and CRLF line endings are supported.
+"""
+
+import mmap
+import re
+from collections.abc import Mapping
+
+from .main import _RECORD_SECTIONS, GDSFParser
+
+_WS = rb"[ \t\r\f\v]*"
+_HEADER = rb"\[([^\n]*)\]" + _WS + rb"(?=\n|\Z)"
+# Value that starts with a quote and does not end with one. The possessive
+# branches cover lines ending in a non-quote character (optionally before a
+# CR); only lines with other trailing whitespace take the backtracking one.
+_OPENER = (
+    rb'(?![# \t\r\f\v])[^=\n]*=' + _WS + rb'"(?:'
+    rb'[^\n]*+(?<![" \t\r\f\v])'
+    rb'|[^\n]*+(?<=[^" \t\r\f\v]\r)'
+    rb'|(?=[^\n]*+(?<=[ \t\r\f\v]))[^\n]*[^" \t\r\f\v\n]' + _WS + rb"(?=\n|\Z)"
+    rb")"
+)
+
+# Lines that shape the block layout: headers, and the first line of a
+# multi-line value (which may contain header-like lines). The leading newline
+# lets the regex engine skip everything else with a fast literal scan.
+_LANDMARK = re.compile(rb"\n" + _WS + rb"(?:" + _HEADER + rb"|" + _OPENER + rb")")
+_FIRST_LANDMARK = re.compile(_WS + rb"(?:" + _HEADER + rb"|" + _OPENER + rb")")
+# Any ``key = value`` line, used to skip blocks without entries.
+_HAS_ENTRY = re.compile(rb"\n" + _WS + rb"(?![# \t\r\f\v\n])[^=\n]*=")
+# A ``key = value`` line, matched in place at a line start.
+_ENTRY = re.compile(
+    _WS + rb"(?![# \t\r\f\v])([^=\n]*)=" + _WS
+    + rb"((?:[^\n]*[^ \t\r\f\v\n])?)" + _WS + rb"(?=\n|\Z)"
+)
+# The end of the line that closes a multi-line value.
+_CLOSING_QUOTE = re.compile(rb'"' + _WS + rb"(?=\n|\Z)")
+_QUOTE = ord('"')
+
+
+class LazyRecord(Mapping):
+    """Read-only mapping over one block of a mapped file.
+
+    Key offsets are located on first access and each value is decoded only
+    when it is looked up.
+    """
+
+    __slots__ = ("_buf", "_start", "_end", "_spans")
+
+    def __init__(self, buf, start, end):
+        self._buf = buf
+        self._start = start
+        self._end = end
+        self._spans = None
+
+    def _index(self):
+        buf, end = self._buf, self._end
+        match_entry = _ENTRY.match
+        spans = {}
+        pos = self._start
+        while pos < end:
+            m = match_entry(buf, pos, end)
+            if m is None:
+                pos = buf.find(b"\n", pos, end) + 1 or end
+                continue
+            key = m.group(1).decode("utf-8").strip()
+            v_start, v_end = m.span(2)
+            pos = m.end() + 1
+            if v_end > v_start and buf[v_start] == _QUOTE and buf[v_end - 1] != _QUOTE:
+                close = _CLOSING_QUOTE.search(buf, pos, end) if pos < end else None
+                v_end = close.end() if close else end
+                spans[key] = (v_start, v_end, True)
+                pos = v_end + 1
+            else:
+                spans[key] = (v_start, v_end, False)
+        self._spans = spans
+        return spans
+
+    def __getitem__(self, key):
+        spans = self._spans if self._spans is not None else self._index()
+        start, end, multiline = spans[key]
+        text = self._buf[start:end].decode("utf-8")
+        if not multiline:
+            return text.strip('"')
+        # Mirror the text parser: the first line is stripped on its own, the
+        # following lines are kept verbatim, then the whole value is stripped
+        # and unquoted once.
+        first, _, rest = text.replace("\r\n", "\n").partition("\n")
+        value = f"{first.strip()}\n{rest}".strip()
+        if value.startswith('"') and value.endswith('"'):
+            value = value[1:-1]
+        return value
+
+    def __iter__(self):
+        return iter(self._spans if self._spans is not None else self._index())
+
+    def __len__(self):
+        return len(self._spans if self._spans is not None else self._index())
+
+    def __repr__(self):
+        return f"LazyRecord({dict(self)!r})"
+
+
+class MappedGDSFReader:
+    """Zero-copy reader over a memory-mapped ``.gdsf`` file.
+
+    Records handed out by the reader point into the mapping, so read their
+    values before calling ``close()`` (or leaving the ``with`` block).
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self._file = open(filepath, "rb")
+        try:
+            self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            self._buf = b""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+        self._file.close()
+
+    def iter_records(self):
+        """Yield ``(section_type, LazyRecord, line_number)`` per block.
+
+        Records follow the same rules as ``gdsf.iter_records``. Only header
+        lines and multi-line value openers are visited while scanning.
+        """
+        buf = self._buf
+        size = len(buf)
+        next_landmark = _LANDMARK.search
+        has_entry = _HAS_ENTRY.search
+
+        section = None
+        body_start = 0
+        start_line = 0
+        line_num = 1
+        counted = 0
+        m = _FIRST_LANDMARK.match(buf)
+        if m is None:
+            m = next_landmark(buf)
+        while m is not None:
+            h_start, h_end = m.span(1)
+            if h_start == -1:
+                # Multi-line value: resume after the line that closes it.
+                close = _CLOSING_QUOTE.search(buf, m.end() + 1) if m.end() < size else None
+                m = next_landmark(buf, close.end() if close else size)
+                continue
+
+            line_start = m.start() + 1 if m.start() or buf[:1] == b"\n" else 0
+            if section and has_entry(buf, body_start, line_start):
+                yield section, LazyRecord(buf, body_start, line_start), start_line
+            line_num += buf[counted:h_start].count(b"\n")
+            counted = h_start
+            section = buf[h_start:h_end].decode("utf-8")
+            start_line = line_num
+            body_start = m.end()
+            m = next_landmark(buf, body_start)
+
+        if section and (section in _RECORD_SECTIONS or has_entry(buf, body_start, size)):
+            yield section, LazyRecord(buf, body_start, size), start_line
+
+    def get_section(self, name):
+        """Return the last block named ``name`` as a ``LazyRecord`` or ``{}``."""
+        found = {}
+        for section, record, _ in self.iter_records():
+            if section == name:
+                found = record
+        return found
+
+    def to_parser(self):
+        """Decode every value and return an equivalent ``GDSFParser``."""
+        parser = GDSFParser.from_string("")
+        for section, record, line_num in self.iter_records():
+            parser._add_record(section, dict(record), line_num)
+        return parser
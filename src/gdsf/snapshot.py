@@ -0,0 +1,107 @@
+"""Compiled binary sidecars for ``.gdsf`` files.
+
+A snapshot stores the parsed records of a source file so a warm load can skip
+text parsing. Layout (all integers little-endian ``uint32`` unless noted)::
+
+    b"GDSFSNAP"  magic
+    uint16       format version
+    32 bytes     SHA-256 of the source file
+    count + ints   string lengths, in characters
+    count + ints   one ``section, line, pairs`` triple per record
+    count + ints   ``key, value`` string indexes of all records, in order
+    UTF-8 blob     the concatenated string table
+"""
+
+import hashlib
+import struct
+import sys
+from array import array
+from itertools import islice
+
+MAGIC = b"GDSFSNAP"
+FORMAT_VERSION = 1
+SUFFIX = "c"
+
+_HEADER = struct.Struct("<8sH32s")
+_COUNT = struct.Struct("<I")
+
+
+def snapshot_path(filepath):
+    """Return the sidecar path for ``filepath`` (``foo.gdsf`` -> ``foo.gdsfc``)."""
+    return f"{filepath}{SUFFIX}"
+
+
+def source_digest(data):
+    return hashlib.sha256(data).digest()
+
+
+def _uint32_array(values):
+    ints = array("I", values)
+    if sys.byteorder == "big":
+        ints.byteswap()
+    return ints
+
+
+def dump(records, digest):
+    """Serialize ``(section, values, line)`` records into snapshot bytes."""
+    strings = {}
+    heads = []
+    pairs = []
+    for section, values, line_num in records:
+        heads.extend((strings.setdefault(section, len(strings)), line_num, len(values)))
+        for key, value in values.items():
+            pairs.append(strings.setdefault(key, len(strings)))
+            pairs.append(strings.setdefault(value, len(strings)))
+
+    table = list(strings)
+    parts = [_HEADER.pack(MAGIC, FORMAT_VERSION, digest)]
+    for ints in (_uint32_array(len(s) for s in table), _uint32_array(heads), _uint32_array(pairs)):
+        parts.append(_COUNT.pack(len(ints)))
+        parts.append(ints.tobytes())
+    parts.append("".join(table).encode("utf-8"))
+    return b"".join(parts)
+
+
+def load(data, digest):
+    """Return the records stored in snapshot ``data``.
+
+    Returns ``None`` if ``data`` is not a snapshot of this format version or
+    was compiled from a source whose hash differs from ``digest``.
+    """
+    if len(data) < _HEADER.size:
+        return None
+    magic, version, stored_digest = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION or stored_digest != digest:
+        return None
+
+    view = memoryview(data)
+    offset = _HEADER.size
+    arrays = []
+    for _ in range(3):
+        (count,) = _COUNT.unpack_from(view, offset)
+        offset += _COUNT.size
+        ints = array("I")
+        ints.frombytes(view[offset : offset + 4 * count])
+        if len(ints) != count:
+            raise ValueError("Truncated GDSF snapshot.")
+        if sys.byteorder == "big":
+            ints.byteswap()
+        arrays.append(ints)
+        offset += 4 * count
+    lengths, heads, pairs = arrays
+
+    text = str(view[offset:], "utf-8")
+    table = []
+    pos = 0
+    for length in lengths:
+        table.append(text[pos : pos + length])
+        pos += length
+
+    # Resolve every string index in one pass, then hand out (key, value)
+    # tuples record by record.
+    flat = iter(list(map(table.__getitem__, pairs)))
+    items = zip(flat, flat)
+    return [
+        (table[heads[i]], dict(islice(items, heads[i + 2])), heads[i + 1])
+        for i in range(0, len(heads), 3)
+    ]
@@ -0,0 +1,250 @@
+"""SQLite section store.
+
+Each section is one row of ``sections``, and the ``[meta]``, ``[schema]`` and
+``[edge]`` records are kept in file order in ``records``, so a project goes
+through ``import_gdsf`` and ``export_gdsf`` unchanged. The leaves of
+``indexed`` sections are also flattened into ``cells`` rows, which
+``cells()`` looks up through an index instead of decoding the whole value.
+
+The database runs in WAL mode: readers in other threads and processes keep
+reading while a writer commits. Every commit bumps the ``revision`` in the
+``state`` table, which is how a store notices changes made by another
+connection and how ``expected_revision`` writes detect stale callers.
+"""
+
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from .main import GDSFParser
+from .store import (
+    _VERSIONS,
+    ConflictError,
+    StorageBackend,
+    atomic_write,
+    iter_cells,
+    normalize_sections,
+    render_gdsf,
+)
+
+# Deepest ``indexed`` section supported by the ``cells`` table.
+MAX_INDEX_LEVELS = 4
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sections (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    seq INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cells (
+    section TEXT NOT NULL,
+    k0 TEXT, k1 TEXT, k2 TEXT, k3 TEXT,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cells_by_k0 ON cells (section, k0, k1, k2);
+CREATE INDEX IF NOT EXISTS cells_by_k1 ON cells (section, k1, k2);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO state VALUES ('revision', 0);
+"""
+
+
+class SQLiteStore(StorageBackend):
+    """Section store backed by a SQLite database file."""
+
+    def __init__(self, path, indexed=None, timeout=30.0):
+        super().__init__(path, indexed)
+        for section, levels in self.indexed.items():
+            if len(levels) > MAX_INDEX_LEVELS:
+                raise ValueError(
+                    f"Section '{section}' has {len(levels)} levels; "
+                    f"at most {MAX_INDEX_LEVELS} can be indexed."
+                )
+        self.timeout = timeout
+        self._local = threading.local()
+        self._revision = None
+        self._sections = {}
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _reading(self):
+        conn = self._connect()
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.execute("COMMIT")
+
+    @contextmanager
+    def _writing(self, expected_revision=None):
+        """Run a write transaction and bump the revision on commit.
+
+        ``BEGIN IMMEDIATE`` takes the database write lock up front, so the
+        revision check and the write see the same state.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            (revision,) = conn.execute(
+                "SELECT value FROM state WHERE key = 'revision'"
+            ).fetchone()
+            if expected_revision is not None and expected_revision != revision:
+                raise ConflictError(self.path, expected_revision, revision)
+            yield conn
+            conn.execute("UPDATE state SET value = ? WHERE key = 'revision'", (revision + 1,))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        # Our cache is only current if nobody else committed in between.
+        self._revision = revision + 1 if self._revision == revision else None
+        self.revision = revision + 1
+
+    @property
+    def sections(self):
+        return self.read()[1]
+
+    def read(self):
+        with self._lock, self._reading() as conn:
+            (revision,) = conn.execute(
+                "SELECT value FROM state WHERE key = 'revision'"
+            ).fetchone()
+            if revision != self._revision:
+                rows = conn.execute("SELECT name, data FROM sections ORDER BY rowid")
+                self._sections = {name: json.loads(data) for name, data in rows}
+                self._revision = self.revision = revision
+                self.version = next(_VERSIONS)
+            return self.version, self._sections
+
+    def reload(self):
+        with self._lock:
+            self._revision = None
+
+    def write(self, changes, atomic=False, expected_revision=None):
+        """Persist ``changes`` (section name -> values) and return the new version.
+
+        Every write is a single transaction, so ``atomic`` is accepted for
+        compatibility with ``GDSFStore`` only.
+        """
+        changes = normalize_sections(changes)
+        with self._lock:
+            self.read()
+            with self._writing(expected_revision) as conn:
+                for name, values in changes.items():
+                    conn.execute(
+                        "INSERT INTO sections (name, data) VALUES (?, ?) "
+                        "ON CONFLICT (name) DO UPDATE SET data = excluded.data",
+                        (name, json.dumps(values)),
+                    )
+                    self._index(conn, name, values)
+            self._sections = {**self._sections, **changes}
+            self.version = next(_VERSIONS)
+            return self.version
+
+    def replace(self, sections, expected_revision=None):
+        sections = normalize_sections(sections)
+        with self._lock:
+            with self._writing(expected_revision) as conn:
+                conn.execute("DELETE FROM sections")
+                conn.execute("DELETE FROM cells")
+                self._insert_sections(conn, sections)
+            self._sections = sections
+            self.version = next(_VERSIONS)
+            return self.version
+
+    def compact(self):
+        """Fold the write-ahead log back into the database file."""
+        with self._lock:
+            self._connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return self.read()[0]
+
+    def import_gdsf(self, source):
+        parser = GDSFParser(source)
+        # The store keeps its own revision counter.
+        meta = {k: v for k, v in parser.meta.items() if k != "revision"}
+        records = []
+        if meta:
+            records.append(("meta", meta))
+        records.extend(("schema", schema) for schema in parser.schemas)
+        records.extend(("edge", edge) for edge in parser.edges)
+        with self._lock:
+            with self._writing() as conn:
+                for table in ("records", "sections", "cells"):
+                    conn.execute(f"DELETE FROM {table}")
+                conn.executemany(
+                    "INSERT INTO records (kind, data) VALUES (?, ?)",
+                    ((kind, json.dumps(values)) for kind, values in records),
+                )
+                self._insert_sections(conn, parser.sections)
+            self._sections = parser.sections
+            self.version = next(_VERSIONS)
+            return self.version
+
+    def export_gdsf(self, dest):
+        with self._lock:
+            with self._reading() as conn:
+                (revision,) = conn.execute(
+                    "SELECT value FROM state WHERE key = 'revision'"
+                ).fetchone()
+                records = {"meta": [], "schema": [], "edge": []}
+                for kind, data in conn.execute("SELECT kind, data FROM records ORDER BY seq"):
+                    records[kind].append(json.loads(data))
+                rows = conn.execute("SELECT name, data FROM sections ORDER BY rowid")
+                sections = {name: json.loads(data) for name, data in rows}
+        meta = {k: v for values in records["meta"] for k, v in values.items()}
+        meta["revision"] = str(revision)
+        text = render_gdsf(meta, records["schema"], records["edge"], sections)
+        atomic_write(dest, text.encode(self.encoding))
+
+    def cells(self, section, **filters):
+        levels = self._levels(section, filters)
+        columns = [f"k{i}" for i in range(len(levels))]
+        query = f"SELECT {', '.join(columns + ['value'])} FROM cells WHERE section = ?"
+        params = [section]
+        for name, wanted in filters.items():
+            query += f" AND k{levels.index(name)} = ?"
+            params.append(wanted)
+        with self._reading() as conn:
+            rows = conn.execute(query + " ORDER BY rowid", params).fetchall()
+        return [
+            {**dict(zip(levels, row)), "value": json.loads(row[-1])}
+            for row in rows
+        ]
+
+    def _insert_sections(self, conn, sections):
+        for name, values in sections.items():
+            conn.execute(
+                "INSERT INTO sections (name, data) VALUES (?, ?)",
+                (name, json.dumps(values)),
+            )
+            self._index(conn, name, values)
+
+    def _index(self, conn, name, values):
+        levels = self.indexed.get(name)
+        if levels is None:
+            return
+        conn.execute("DELETE FROM cells WHERE section = ?", (name,))
+        padding = (None,) * (MAX_INDEX_LEVELS - len(levels))
+        conn.executemany(
+            "INSERT INTO cells (section, k0, k1, k2, k3, value) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (name, *keys, *padding, json.dumps(value))
+                for keys, value in iter_cells(values.get("value"), len(levels))
+            ),
+        )
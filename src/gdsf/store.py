@@ -0,0 +1,482 @@
+import io
+import itertools
+import json
+import locale
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: stores still serialize writers in-process.
+    fcntl = None
+
+from .main import GDSFParser
+
+# Version stamps are unique across every store in the process, so caches keyed
+# on ``(path, version)`` stay valid when a store is dropped and re-created.
+_VERSIONS = itertools.count(1)
+# Keep Windows from translating newlines on raw descriptors.
+_O_BINARY = getattr(os, "O_BINARY", 0)
+# The block that ends every write, see ``GDSFStore``. The comment tells it
+# apart from ``[meta]`` blocks written by earlier versions.
+_MARKER = re.compile(rb'\[meta\]\nrevision = "(\d+)"\n# end of revision \1\n\n')
+_MARKER_MAX = 128  # Longest marker in bytes, with room to spare.
+_SCAN_CHUNK = 64 * 1024
+
+
+class ConflictError(Exception):
+    """A compare-and-swap write found a newer revision than it expected.
+
+    Reload, re-apply the change and write again (see ``expected_revision``).
+    """
+
+    def __init__(self, path, expected, actual):
+        super().__init__(
+            f"{path} is at revision {actual}, expected {expected}; "
+            "it was saved by someone else in the meantime."
+        )
+        self.path = path
+        self.expected = expected
+        self.actual = actual
+
+
+def meta_revision(meta):
+    """Return the ``revision`` stored in a ``[meta]`` mapping (0 if unset)."""
+    try:
+        return int(meta.get("revision", 0))
+    except ValueError:
+        return 0
+
+
+@contextmanager
+def locked_file(path, shared=False):
+    """Hold an advisory ``flock`` on ``path`` (created if missing).
+
+    The lock is exclusive unless ``shared``. It is not re-entrant: taking it
+    again through another descriptor from the same process blocks.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | _O_BINARY, 0o666)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield fd
+    finally:
+        os.close(fd)  # Closing the descriptor releases the lock.
+
+
+def file_signature(path):
+    """Return ``(mtime_ns, size, inode)`` for ``path`` or ``None`` if missing."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def committed_size(path):
+    """Return the length of ``path`` up to the end of its last revision marker.
+
+    Returns ``None`` if the file holds no marker at all.
+    """
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        carry = b""
+        while end > 0:
+            start = max(0, end - _SCAN_CHUNK)
+            f.seek(start)
+            window = f.read(end - start) + carry
+            pos = len(window)
+            while True:
+                pos = window.rfind(b"[meta]\n", 0, pos)
+                if pos < 0:
+                    break
+                if pos == 0 and start:
+                    break  # Seen again with the byte before it in the next window.
+                match = _MARKER.match(window, pos)
+                if match and (pos == 0 or window[pos - 1] == 0x0A):
+                    return start + match.end()
+            # Keep enough of this window to complete a marker cut by the edge.
+            carry = window[:_MARKER_MAX]
+            end = start
+    return None
+
+
+def revision_marker(revision):
+    """Return the ``[meta]`` block that completes a write of ``revision``."""
+    return f'[meta]\nrevision = "{revision}"\n# end of revision {revision}\n\n'
+
+
+def format_section(name, values):
+    """Serialize one section as a GDSF block."""
+    lines = [f"[{name}]"]
+    lines.extend(f'{k} = "{v}"' for k, v in values.items())
+    return "\n".join(lines) + "\n\n"
+
+
+def normalize_sections(sections):
+    """Return ``sections`` as they read back from a ``.gdsf`` file.
+
+    Keeps the backends interchangeable: a value saved to any of them is
+    stored exactly as exporting and re-importing it would return it.
+    """
+    text = "".join(format_section(name, values) for name, values in sections.items())
+    return GDSFParser.from_string(text).sections
+
+
+def render_gdsf(meta, schemas, edges, sections):
+    """Serialize parsed GDSF data back into file text."""
+    parts = []
+    if meta:
+        parts.append(format_section("meta", meta))
+    parts.extend(format_section("schema", s) for s in schemas)
+    parts.extend(format_section("edge", e) for e in edges)
+    parts.extend(format_section(n, v) for n, v in sections.items())
+    return "".join(parts)
+
+
+def iter_cells(raw, depth):
+    """Yield ``(keys, value)`` for the leaves ``depth`` levels deep in JSON ``raw``.
+
+    Branches that end early, and values that are not JSON, yield nothing.
+    """
+    try:
+        data = json.loads(raw)
+    except (TypeError, ValueError):
+        return
+
+    def walk(node, keys):
+        if len(keys) == depth:
+            yield keys, node
+        elif isinstance(node, dict):
+            for key, child in node.items():
+                yield from walk(child, keys + (key,))
+
+    yield from walk(data, ())
+
+
+def atomic_write(path, data):
+    """Replace ``path`` with ``data`` (bytes) via a synced temp file.
+
+    Readers and crashed writers only ever see the old or the new file, never a
+    truncated one.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class StorageBackend:
+    """Interface of the section stores.
+
+    A store holds the sections of one project (name -> ``{key: value}``)
+    and stamps every state it hands out with a ``version`` that is unique
+    across all stores in the process.
+
+    Every committed change also bumps the persistent ``revision``, which all
+    processes sharing the file agree on. Writes given an
+    ``expected_revision`` only go through while the store is still at that
+    revision and raise ``ConflictError`` otherwise.
+
+    ``indexed`` maps names of sections whose ``value`` is nested JSON to the
+    names of its levels, e.g. ``{"tit": ("emotion", "skill")}``. ``cells()``
+    returns the leaves of such a section as rows.
+    """
+
+    def __init__(self, path, indexed=None):
+        self.path = path
+        self.indexed = dict(indexed or {})
+        self.encoding = locale.getpreferredencoding(False)
+        self.version = 0
+        self.revision = 0
+        self._lock = threading.RLock()
+
+    @property
+    def sections(self):
+        return self.read()[1]
+
+    def current_revision(self):
+        """Return the revision of the latest committed state."""
+        with self._lock:
+            self.read()
+            return self.revision
+
+    def read(self):
+        """Return ``(version, sections)``."""
+        raise NotImplementedError
+
+    def reload(self):
+        """Drop the cached state so the next ``read()`` comes from storage."""
+        raise NotImplementedError
+
+    def write(self, changes, atomic=False, expected_revision=None):
+        """Persist ``changes`` (section name -> values) and return the new version."""
+        raise NotImplementedError
+
+    def replace(self, sections, expected_revision=None):
+        """Make the store hold exactly ``sections`` and return the new version."""
+        raise NotImplementedError
+
+    def compact(self):
+        """Reclaim space taken by superseded data and return the version."""
+        raise NotImplementedError
+
+    def import_gdsf(self, source):
+        """Replace the whole store, records included, with the ``.gdsf`` file ``source``."""
+        raise NotImplementedError
+
+    def export_gdsf(self, dest):
+        """Write the whole store, records included, to the ``.gdsf`` file ``dest``."""
+        raise NotImplementedError
+
+    def cells(self, section, **filters):
+        """Return the leaves of an ``indexed`` section as dict rows.
+
+        Each row maps the level names to their keys and ``"value"`` to the
+        leaf. Keyword ``filters`` select rows by level, e.g.
+        ``store.cells("tit", emotion="Joy")``.
+        """
+        levels = self._levels(section, filters)
+        raw = self.read()[1].get(section, {}).get("value")
+        return filter_cells(raw, levels, filters)
+
+    def _check_revision(self, expected_revision):
+        if expected_revision is not None and expected_revision != self.revision:
+            raise ConflictError(self.path, expected_revision, self.revision)
+
+    def _levels(self, section, filters=()):
+        try:
+            levels = self.indexed[section]
+        except KeyError:
+            raise ValueError(f"Section '{section}' is not indexed.") from None
+        unknown = set(filters) - set(levels)
+        if unknown:
+            raise ValueError(f"Unknown levels for '{section}': {', '.join(sorted(unknown))}")
+        return levels
+
+
+def filter_cells(raw, levels, filters):
+    """Return the ``cells()`` rows of the JSON value ``raw`` matching ``filters``."""
+    rows = []
+    for keys, value in iter_cells(raw, len(levels)):
+        row = dict(zip(levels, keys))
+        if all(row[name] == wanted for name, wanted in filters.items()):
+            row["value"] = value
+            rows.append(row)
+    return rows
+
+
+class GDSFStore(StorageBackend):
+    """Section store backed by a single ``.gdsf`` file.
+
+    Saving a section appends a fresh ``[name]`` block instead of rewriting the
+    file. The parser keeps the last block of each name, so the file stays
+    plain GDSF and write cost scales with the edited section only. Once
+    superseded blocks outweigh the live data by ``compact_ratio`` the file is
+    compacted with an atomic rewrite.
+
+    Writers take an exclusive ``flock`` on ``<path>.lock`` and re-read the
+    file under it, so writes from several processes never interleave and
+    never build on stale data. Every write ends with a ``revision_marker``,
+    a ``[meta]`` block holding the next ``revision``, which marks it as
+    complete: bytes after
+    the last such marker were left by a writer that died mid-append, and are
+    ignored on read and cut off before the next append. A file without any
+    marker (written by hand or by an older version) is rewritten on its
+    first save.
+    """
+
+    def __init__(self, path, compact_ratio=2.0, compact_min_bytes=64 * 1024, indexed=None):
+        super().__init__(path, indexed)
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self._signature = None
+        self._committed = None  # Length of the file up to its last marker.
+        self._parser = GDSFParser.from_string("")
+        self._block_sizes = {}
+        self._lock_depth = 0
+
+    @property
+    def sections(self):
+        return self._parser.sections
+
+    def read(self):
+        """Return ``(version, sections)``, re-parsing only if the file changed."""
+        with self._lock:
+            signature = file_signature(self.path)
+            if signature is None:
+                if self._signature is not None:
+                    self._set_parser(GDSFParser.from_string(""), None)
+                return 0, self.sections
+            if signature != self._signature:
+                # A shared lock keeps writers from appending mid-parse.
+                with self._file_lock(shared=True):
+                    self._load()
+            return self.version, self.sections
+
+    def reload(self):
+        with self._lock:
+            self._signature = None
+
+    def write(self, changes, atomic=False, expected_revision=None):
+        """Persist ``changes`` (section name -> values) and return the new version.
+
+        The blocks are appended to the file together with their revision
+        marker, so a killed process leaves either a complete write or a tail
+        that the next read ignores. With ``atomic`` the whole file is
+        rewritten through a temp file and ``os.replace`` instead, which also
+        compacts it.
+        """
+        with self._file_lock():
+            self.read()
+            self._check_revision(expected_revision)
+            revision = self.revision + 1
+            blocks = {name: format_section(name, values) for name, values in changes.items()}
+            text = "".join(blocks.values())
+            data = (text + revision_marker(revision)).encode(self.encoding)
+            sections = {**self.sections, **GDSFParser.from_string(text).sections}
+            if atomic or not self._committed:
+                return self._rewrite(revision, sections)
+
+            live = len(data) + sum(
+                size for name, size in self._block_sizes.items() if name not in blocks
+            )
+            projected = self._committed + len(data)
+            if projected > self.compact_min_bytes and projected > self.compact_ratio * live:
+                return self._rewrite(revision, sections)
+
+            self._append(data)
+            self._parser.sections = sections
+            self._parser.meta["revision"] = str(revision)
+            self.revision = revision
+            for name, block in blocks.items():
+                self._block_sizes[name] = len(block.encode(self.encoding))
+            self.version = next(_VERSIONS)
+            return self.version
+
+    def replace(self, sections, expected_revision=None):
+        """Atomically rewrite the file so that it holds exactly ``sections``."""
+        with self._file_lock():
+            self.read()
+            self._check_revision(expected_revision)
+            return self._rewrite(self.revision + 1, dict(sections))
+
+    def compact(self):
+        """Rewrite the file without superseded blocks and return the new version."""
+        with self._file_lock():
+            self.read()
+            return self._rewrite(self.revision)
+
+    def import_gdsf(self, source):
+        parser = GDSFParser(source)
+        with self._file_lock():
+            self.read()
+            return self._rewrite(self.revision + 1, parser=parser)
+
+    def export_gdsf(self, dest):
+        with self._lock:
+            self.read()
+            atomic_write(dest, self._render(self._parser, self.revision).encode(self.encoding))
+
+    def _rewrite(self, revision, sections=None, parser=None):
+        """Atomically write the file and only then adopt its new state.
+
+        ``sections`` replace those of ``parser`` (the current state by
+        default). If the write fails the store keeps matching the disk.
+        """
+        text = self._render(parser or self._parser, revision, sections)
+        atomic_write(self.path, text.encode(self.encoding))
+        self._set_parser(GDSFParser.from_string(text), file_signature(self.path))
+        return self.version
+
+    def _load(self):
+        """Parse the file up to its last revision marker."""
+        signature = file_signature(self.path)
+        committed = committed_size(self.path)
+        if committed is None or committed == signature[1]:
+            parser = GDSFParser(self.path)
+        else:
+            with open(self.path, "rb") as f:
+                data = f.read(committed)
+            # Decode exactly like ``open()`` in text mode would.
+            text = io.TextIOWrapper(io.BytesIO(data), encoding=self.encoding).read()
+            parser = GDSFParser.from_string(text)
+        self._set_parser(parser, signature)
+        self._committed = committed
+
+    @contextmanager
+    def _file_lock(self, shared=False):
+        """Hold ``<path>.lock`` (exclusively unless ``shared``) and ``self._lock``.
+
+        Re-entrant within this store: nested calls reuse the outer lock.
+        """
+        with self._lock:
+            if self._lock_depth or fcntl is None:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            with locked_file(f"{self.path}.lock", shared):
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+
+    def _render(self, parser, revision, sections=None):
+        """Return the file text for ``parser``, ending with the revision marker."""
+        meta = {k: v for k, v in parser.meta.items() if k != "revision"}
+        if sections is None:
+            sections = parser.sections
+        text = render_gdsf(meta, parser.schemas, parser.edges, sections)
+        return text + revision_marker(revision)
+
+    def _set_parser(self, parser, signature):
+        self._parser = parser
+        self._signature = signature
+        self._committed = signature[1] if signature else None
+        self.revision = meta_revision(parser.meta)
+        self._block_sizes = {
+            name: len(format_section(name, values).encode(self.encoding))
+            for name, values in parser.sections.items()
+        }
+        self.version = next(_VERSIONS)
+
+    def _append(self, data):
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT | _O_BINARY, 0o666)
+        try:
+            if os.fstat(fd).st_size != self._committed:
+                # Cut off a write torn by a crash so it cannot swallow ours.
+                os.ftruncate(fd, self._committed)
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            os.fsync(fd)
+            stat = os.fstat(fd)
+        finally:
+            os.close(fd)
+        self._signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        self._committed = stat.st_size
@@ -1,7 +1,20 @@
+import contextvars
+import functools
+import hashlib
+import itertools
 import json
+import queue
+import random
 import re
 import os
-from typing import List, Dict
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
 
 from dotenv import load_dotenv
 from langchain_ollama import ChatOllama
@@ -10,30 +23,829 @@ try:
         from langchain_google_genai import ChatGoogleGenerativeAI
 except Exception:  # Module may not be installed
         ChatGoogleGenerativeAI = None
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage
 from langchain_core.prompts import PromptTemplate
 
 load_dotenv(override=True)
 
-
-def get_llm():
-        """Return a chat model using Gemini if available, otherwise Ollama."""
+# Upper bound on simultaneous model requests for the batch helpers below.
+LLM_CONCURRENCY = int(os.getenv("VIOLETA_LLM_CONCURRENCY", "4"))
+# Seconds one kernel may take in step3b_all before it is reported as failed.
+STEP3B_TIMEOUT = float(os.getenv("VIOLETA_STEP3B_TIMEOUT", "180"))
+
+# Response cache settings; VIOLETA_LLM_CACHE=0 turns the cache off.
+LLM_CACHE_ENABLED = os.getenv("VIOLETA_LLM_CACHE", "1") != "0"
+LLM_CACHE_PATH = Path(__file__).resolve().parent / "data" / "llm_cache.sqlite"
+LLM_CACHE_MAX_BYTES = int(float(os.getenv("VIOLETA_LLM_CACHE_MAX_MB", "64")) * 1024 * 1024)
+LLM_CACHE_TTL = float(os.getenv("VIOLETA_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+# JSONL file with one line per model call; VIOLETA_LLM_TRACE=0 turns it off.
+_trace_setting = os.getenv("VIOLETA_LLM_TRACE", "")
+LLM_TRACE_PATH = (
+        None
+        if _trace_setting == "0"
+        else Path(_trace_setting or Path(__file__).resolve().parent / "data" / "llm_trace.jsonl")
+)
+# Once the trace grows past this size it is moved to ``<trace>.1``, replacing
+# the previous one, and a fresh trace is started.
+LLM_TRACE_MAX_BYTES = int(float(os.getenv("VIOLETA_LLM_TRACE_MAX_MB", "16")) * 1024 * 1024)
+
+
+def _map_concurrent(func, items, max_workers=None):
+        """Return ``[func(item) for item in items]`` using up to ``max_workers`` threads.
+
+        Results keep the order of ``items`` no matter which call finishes first.
+        """
+        items = list(items)
+        if max_workers is None:
+                max_workers = LLM_CONCURRENCY
+        if max_workers <= 1 or len(items) <= 1:
+                return [func(item) for item in items]
+        # Run each call in a copy of the caller's context so settings such as
+        # ``bypass_cache()`` reach the worker threads.
+        contexts = [contextvars.copy_context() for _ in items]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+                return list(pool.map(lambda ctx, item: ctx.run(func, item), contexts, items))
+
+
+# Chat clients shared by every session, keyed on provider, model and host (and
+# credentials). Each client keeps its own keep-alive HTTP connection pool.
+_LLM_CLIENTS = {}
+_LLM_LOCK = threading.Lock()
+
+
+def _llm_config():
+        """Return ``(provider, model, host, api_key)`` from the environment."""
+        if os.getenv("VIOLETA_LLM_PROVIDER", "").lower() == "fake":
+                return ("fake", "fake-llm", None, None)
         gemini_key = os.getenv("GEMINI_API_KEY") or os.getenv("GEMINI_KEY")
         if gemini_key:
+                return ("gemini", "gemini-2.5-flash", None, gemini_key) #gemini-2.5-flash #gemini-2.5-pro
+        return ("ollama", "deepseek-r1:14b", os.environ["OLLAMA_HOST"], None)
+
+
+def _build_llm(provider, model, host, api_key):
+        if provider == "gemini":
                 if ChatGoogleGenerativeAI is None:
                         raise ImportError(
                                 "langchain_google_genai must be installed to use Gemini"
                         )
-                return ChatGoogleGenerativeAI(
-                        model="gemini-2.5-flash", #gemini-2.5-flash #gemini-2.5-pro
-                        google_api_key=gemini_key,
+                return ChatGoogleGenerativeAI(model=model, google_api_key=api_key)
+        if provider == "fake":
+                return FakeChatModel.from_env()
+        return ChatOllama(model=model, base_url=host)
+
+
+def get_llm():
+        """Return a chat model using Gemini if available, otherwise Ollama.
+
+        Clients are built once per configuration and reused by every caller,
+        including concurrent Streamlit sessions.
+        """
+        config = _llm_config()
+        client = _LLM_CLIENTS.get(config)
+        if client is None:
+                with _LLM_LOCK:
+                        client = _LLM_CLIENTS.get(config)
+                        if client is None:
+                                client = _LLM_CLIENTS[config] = _build_llm(*config)
+        return client
+
+
+def reload_llm_clients():
+        """Re-read ``.env``, drop the pooled clients and reset the rate limits."""
+        global _SCHEDULER
+        load_dotenv(override=True)
+        with _LLM_LOCK:
+                _LLM_CLIENTS.clear()
+                _SCHEDULER = LLMScheduler.from_env()
+
+class ResponseCache:
+        """Content-addressed store of model responses in SQLite.
+
+        Entries expire ``ttl`` seconds after they were written. Once the
+        stored text exceeds ``max_bytes``, the least recently read entries
+        are evicted.
+        """
+
+        def __init__(self, path, max_bytes=LLM_CACHE_MAX_BYTES, ttl=LLM_CACHE_TTL):
+                self.path = Path(path)
+                self.max_bytes = max_bytes
+                self.ttl = ttl
+                self._local = threading.local()
+
+        def _connect(self):
+                conn = getattr(self._local, "conn", None)
+                if conn is None:
+                        self.path.parent.mkdir(parents=True, exist_ok=True)
+                        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        conn.execute(
+                                "CREATE TABLE IF NOT EXISTS responses ("
+                                "key TEXT PRIMARY KEY, content TEXT NOT NULL, "
+                                "size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+                        )
+                        conn.execute(
+                                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+                        )
+                        self._local.conn = conn
+                return conn
+
+        def get(self, key):
+                conn = self._connect()
+                row = conn.execute(
+                        "SELECT content, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                        return None
+                now = time.time()
+                if now - row[1] > self.ttl:
+                        conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        return None
+                conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                return row[0]
+
+        def put(self, key, content):
+                conn = self._connect()
+                now = time.time()
+                conn.execute(
+                        "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                        (key, content, len(content.encode("utf-8")), now, now),
+                )
+                self._evict(conn, now)
+
+        def _evict(self, conn, now):
+                conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+                (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+                if total <= self.max_bytes:
+                        return
+                stale = []
+                for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed"):
+                        if total <= self.max_bytes:
+                                break
+                        stale.append((key,))
+                        total -= size
+                conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+        def clear(self):
+                self._connect().execute("DELETE FROM responses")
+
+
+_RESPONSE_CACHE = ResponseCache(LLM_CACHE_PATH)
+# Set inside ``bypass_cache()``; context-local, so it only affects this session.
+_CACHE_BYPASS = contextvars.ContextVar("llm_cache_bypass", default=False)
+# Client attributes that change the sampled output.
+_SAMPLING_PARAMS = (
+        "temperature", "top_p", "top_k", "max_tokens", "max_output_tokens",
+        "num_predict", "num_ctx", "seed", "format",
+)
+
+
+@contextmanager
+def bypass_cache(enabled=True):
+        """Skip cached answers inside the block; fresh answers still refresh the cache."""
+        token = _CACHE_BYPASS.set(enabled)
+        try:
+                yield
+        finally:
+                _CACHE_BYPASS.reset(token)
+
+
+def _cache_key(model, messages):
+        """Return the cache key for ``messages`` sent to ``model``, or ``None``.
+
+        Only clients that name their model are cached. Message text is
+        normalized (line endings, surrounding whitespace) before hashing.
+        """
+        model_name = getattr(model, "model", None)
+        if not isinstance(model_name, str):
+                return None
+        params = {}
+        for name in _SAMPLING_PARAMS:
+                value = getattr(model, name, None)
+                if value is not None:
+                        params[name] = value
+        payload = {
+                "provider": type(model).__name__,
+                "model": model_name,
+                "host": getattr(model, "base_url", None),
+                "params": params,
+                "messages": [
+                        [message.type, str(message.content).replace("\r\n", "\n").strip()]
+                        for message in messages
+                ],
+        }
+        blob = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(blob).hexdigest()
+
+
+# Most recent call records, newest last, for the in-app metrics panel.
+_CALL_LOG = deque(maxlen=2000)
+_CALL_LOG_LOCK = threading.Lock()
+# Name of the step function a model call belongs to.
+_CURRENT_STEP = contextvars.ContextVar("llm_step", default=None)
+
+
+def instrumented(func):
+        """Tag the model calls made inside ``func`` with its name.
+
+        The innermost decorated step wins, so ``step3b`` calls made by
+        ``step3b_all`` are reported as ``step3b``.
+        """
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+                token = _CURRENT_STEP.set(func.__name__)
+                try:
+                        return func(*args, **kwargs)
+                finally:
+                        _CURRENT_STEP.reset(token)
+
+        return wrapper
+
+
+def _token_count(usage, key, text):
+        """Return ``(count, estimated)`` from provider usage data or a 4-chars-per-token guess."""
+        if isinstance(usage, dict) and isinstance(usage.get(key), int):
+                return usage[key], False
+        return max(1, len(text) // 4) if text else 0, True
+
+
+def _record_call(
+        model,
+        step,
+        messages,
+        started,
+        first_token=None,
+        content="",
+        usage=None,
+        cache_hit=False,
+        retries=0,
+        error=None,
+):
+        """Store one model call in the in-memory log and the JSONL trace."""
+        finished = time.perf_counter()
+        prompt_text = "".join(str(m.content) for m in messages)
+        prompt_tokens, prompt_estimated = _token_count(usage, "input_tokens", prompt_text)
+        completion_tokens, completion_estimated = _token_count(usage, "output_tokens", content or "")
+        model_name = getattr(model, "model", None)
+        record = {
+                "ts": time.time(),
+                "step": step or "unknown",
+                "provider": type(model).__name__,
+                "model": model_name if isinstance(model_name, str) else None,
+                "wall_ms": round((finished - started) * 1000, 2),
+                "ttft_ms": round((first_token - started) * 1000, 2) if first_token else None,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "tokens_estimated": prompt_estimated or completion_estimated,
+                "cache_hit": cache_hit,
+                "retries": retries,
+                "error": error,
+        }
+        with _CALL_LOG_LOCK:
+                _CALL_LOG.append(record)
+                if LLM_TRACE_PATH is not None:
+                        try:
+                                LLM_TRACE_PATH.parent.mkdir(parents=True, exist_ok=True)
+                                with open(LLM_TRACE_PATH, "a", encoding="utf-8") as f:
+                                        f.write(json.dumps(record) + "\n")
+                                        size = f.tell()
+                                if size > LLM_TRACE_MAX_BYTES:
+                                        os.replace(
+                                                LLM_TRACE_PATH,
+                                                LLM_TRACE_PATH.with_name(LLM_TRACE_PATH.name + ".1"),
+                                        )
+                        except OSError:
+                                pass  # Tracing must never break a model call.
+        return record
+
+
+def call_log() -> List[Dict]:
+        """Return a copy of the recent call records, oldest first."""
+        with _CALL_LOG_LOCK:
+                return list(_CALL_LOG)
+
+
+def clear_call_log():
+        with _CALL_LOG_LOCK:
+                _CALL_LOG.clear()
+
+
+def summarize_calls(records=None) -> Dict[str, Dict]:
+        """Aggregate call records per step: counts, cache hits, latency and tokens."""
+        summary = {}
+        for record in call_log() if records is None else records:
+                row = summary.setdefault(
+                        record["step"],
+                        {
+                                "calls": 0,
+                                "cache_hits": 0,
+                                "errors": 0,
+                                "retries": 0,
+                                "wall_ms": 0.0,
+                                "ttft_ms": [],
+                                "prompt_tokens": 0,
+                                "completion_tokens": 0,
+                        },
+                )
+                row["calls"] += 1
+                row["cache_hits"] += bool(record["cache_hit"])
+                row["errors"] += bool(record["error"])
+                row["retries"] += record["retries"]
+                row["wall_ms"] += record["wall_ms"]
+                if record["ttft_ms"] is not None:
+                        row["ttft_ms"].append(record["ttft_ms"])
+                row["prompt_tokens"] += record["prompt_tokens"]
+                row["completion_tokens"] += record["completion_tokens"]
+        for row in summary.values():
+                ttfts = row.pop("ttft_ms")
+                row["avg_wall_ms"] = round(row.pop("wall_ms") / row["calls"], 2)
+                row["avg_ttft_ms"] = round(sum(ttfts) / len(ttfts), 2) if ttfts else None
+        return summary
+
+
+class CircuitOpenError(RuntimeError):
+        """Raised without contacting a provider whose circuit breaker is open."""
+
+
+class TokenBucket:
+        """Rate limiter allowing ``rate`` calls per second in bursts of ``capacity``.
+
+        A ``rate`` of 0 disables the limit.
+        """
+
+        def __init__(self, rate, capacity=None, sleep=time.sleep):
+                self.rate = rate
+                self.capacity = capacity or max(1.0, rate)
+                self._tokens = self.capacity
+                self._updated = time.monotonic()
+                self._lock = threading.Lock()
+                self._sleep = sleep
+
+        def acquire(self):
+                """Block until a call may start."""
+                if self.rate <= 0:
+                        return
+                while True:
+                        with self._lock:
+                                now = time.monotonic()
+                                self._tokens = min(
+                                        self.capacity, self._tokens + (now - self._updated) * self.rate
+                                )
+                                self._updated = now
+                                if self._tokens >= 1:
+                                        self._tokens -= 1
+                                        return
+                                wait = (1 - self._tokens) / self.rate
+                        self._sleep(wait)
+
+
+class CircuitBreaker:
+        """Stop calling a provider after ``failure_threshold`` failures in a row.
+
+        While open, calls fail fast with ``CircuitOpenError``. After
+        ``reset_timeout`` seconds one trial call is let through; its outcome
+        closes the breaker again or re-opens it.
+        """
+
+        def __init__(self, failure_threshold=5, reset_timeout=30.0):
+                self.failure_threshold = failure_threshold
+                self.reset_timeout = reset_timeout
+                self._failures = 0
+                self._opened_at = None
+                self._probing = False
+                self._lock = threading.Lock()
+
+        @property
+        def is_open(self):
+                return self._opened_at is not None
+
+        def allow(self):
+                with self._lock:
+                        if self._opened_at is None:
+                                return
+                        remaining = self._opened_at + self.reset_timeout - time.monotonic()
+                        if remaining <= 0 and not self._probing:
+                                self._probing = True
+                                return
+                        raise CircuitOpenError(
+                                f"Model provider disabled after {self._failures} failures; "
+                                f"retrying in {max(remaining, 0):.0f}s."
+                        )
+
+        def record_success(self):
+                with self._lock:
+                        self._failures = 0
+                        self._opened_at = None
+                        self._probing = False
+
+        def record_rejection(self):
+                """Note a request the provider answered but refused.
+
+                That says nothing about the provider's health, so the failure
+                count is kept. A trial call still closes the breaker, since
+                the provider is reachable again.
+                """
+                with self._lock:
+                        if self._probing:
+                                self._failures = 0
+                                self._opened_at = None
+                                self._probing = False
+
+        def release(self):
+                """Drop a trial call that ended without an outcome."""
+                with self._lock:
+                        self._probing = False
+
+        def record_failure(self):
+                with self._lock:
+                        self._failures += 1
+                        if self._probing or self._failures >= self.failure_threshold:
+                                self._opened_at = time.monotonic()
+                                self._probing = False
+
+
+# Status codes and exception names that mean "try again later".
+_RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+_RETRYABLE_NAMES = (
+        "Timeout", "ResourceExhausted", "ServiceUnavailable", "RateLimit",
+        "TooManyRequests", "ConnectError", "RemoteProtocolError", "DeadlineExceeded",
+)
+# Error text naming a rate limit. The status must stand alone, so model
+# names, ports or token counts containing "429" do not match.
+_RETRYABLE_TEXT = re.compile(r"\b429\b|rate limit", re.IGNORECASE)
+_PROVIDER_NAMES = {
+        "ChatGoogleGenerativeAI": "gemini",
+        "ChatOllama": "ollama",
+        "FakeChatModel": "fake",
+}
+
+
+def _provider_name(model):
+        name = type(model).__name__
+        return _PROVIDER_NAMES.get(name, name.lower())
+
+
+def _is_retryable(exc):
+        if isinstance(exc, (TimeoutError, ConnectionError)):
+                return True
+        for attr in ("status_code", "code", "status"):
+                value = getattr(exc, attr, None)
+                value = getattr(value, "value", value)  # grpc / http enums
+                if isinstance(value, int) and value in _RETRYABLE_STATUS:
+                        return True
+        name = type(exc).__name__
+        if any(part in name for part in _RETRYABLE_NAMES):
+                return True
+        return bool(_RETRYABLE_TEXT.search(str(exc)))
+
+
+class LLMScheduler:
+        """Admission control for model calls, per provider.
+
+        Each call first passes the provider's circuit breaker and token
+        bucket. Retryable failures (timeouts, 429 and 5xx answers) are
+        retried up to ``max_retries`` times with exponential backoff and full
+        jitter; other errors are raised immediately.
+        """
+
+        def __init__(
+                self,
+                rpm=None,
+                max_retries=4,
+                base_delay=1.0,
+                max_delay=30.0,
+                failure_threshold=5,
+                reset_timeout=30.0,
+                sleep=time.sleep,
+                seed=None,
+        ):
+                self.rpm = dict(rpm or {})
+                self.max_retries = max_retries
+                self.base_delay = base_delay
+                self.max_delay = max_delay
+                self.failure_threshold = failure_threshold
+                self.reset_timeout = reset_timeout
+                self._sleep = sleep
+                self._rng = random.Random(seed)
+                self._providers = {}
+                self._lock = threading.Lock()
+
+        @classmethod
+        def from_env(cls):
+                """Build from ``VIOLETA_RPM_<PROVIDER>`` and ``VIOLETA_LLM_*`` settings."""
+                rpm = {
+                        key[len("VIOLETA_RPM_"):].lower(): float(value)
+                        for key, value in os.environ.items()
+                        if key.startswith("VIOLETA_RPM_") and value
+                }
+                return cls(
+                        rpm=rpm,
+                        max_retries=int(os.getenv("VIOLETA_LLM_MAX_RETRIES", "4")),
+                        base_delay=float(os.getenv("VIOLETA_LLM_BACKOFF", "1")),
+                        max_delay=float(os.getenv("VIOLETA_LLM_BACKOFF_MAX", "30")),
+                        failure_threshold=int(os.getenv("VIOLETA_LLM_BREAKER_THRESHOLD", "5")),
+                        reset_timeout=float(os.getenv("VIOLETA_LLM_BREAKER_RESET", "30")),
                 )
-        return ChatOllama(
-                model="deepseek-r1:14b",
-                base_url=os.environ["OLLAMA_HOST"],
+
+        def limits(self, provider):
+                """Return the ``(TokenBucket, CircuitBreaker)`` pair of ``provider``."""
+                with self._lock:
+                        pair = self._providers.get(provider)
+                        if pair is None:
+                                rate = self.rpm.get(provider, 0) / 60
+                                pair = self._providers[provider] = (
+                                        TokenBucket(rate, sleep=self._sleep),
+                                        CircuitBreaker(self.failure_threshold, self.reset_timeout),
+                                )
+                return pair
+
+        def call(self, model, func):
+                """Run ``func()`` for ``model`` and return ``(result, retries)``.
+
+                An exception that escapes carries the retry count as
+                ``llm_retries``.
+                """
+                bucket, breaker = self.limits(_provider_name(model))
+                retries = 0
+                while True:
+                        breaker.allow()
+                        bucket.acquire()
+                        try:
+                                result = func()
+                        except Exception as exc:
+                                exc.llm_retries = retries
+                                if not _is_retryable(exc):
+                                        # The provider answered; the request
+                                        # itself was rejected.
+                                        breaker.record_rejection()
+                                        raise
+                                breaker.record_failure()
+                                if retries >= self.max_retries or breaker.is_open:
+                                        raise
+                                cap = min(self.max_delay, self.base_delay * 2 ** retries)
+                                retries += 1
+                                self._sleep(self._rng.uniform(0, cap))
+                                continue
+                        except BaseException:
+                                breaker.release()
+                                raise
+                        breaker.record_success()
+                        return result, retries
+
+
+_SCHEDULER = LLMScheduler.from_env()
+
+
+def _cache_get(key):
+        if key is None or _CACHE_BYPASS.get():
+                return None
+        try:
+                return _RESPONSE_CACHE.get(key)
+        except sqlite3.Error:
+                return None
+
+
+def _cache_put(key, content):
+        if key is None or not isinstance(content, str):
+                return
+        try:
+                _RESPONSE_CACHE.put(key, content)
+        except sqlite3.Error:
+                pass  # A locked or read-only cache only costs the speed-up.
+
+
+def _invoke(model, messages) -> str:
+        """Send ``messages`` to ``model`` and return the response text, via the cache."""
+        started = time.perf_counter()
+        step = _CURRENT_STEP.get()
+        key = _cache_key(model, messages) if LLM_CACHE_ENABLED else None
+        cached = _cache_get(key)
+        if cached is not None:
+                _record_call(model, step, messages, started, time.perf_counter(), cached, cache_hit=True)
+                return cached
+        try:
+                response, retries = _SCHEDULER.call(model, lambda: model.invoke(messages))
+        except Exception as exc:
+                _record_call(
+                        model, step, messages, started,
+                        retries=getattr(exc, "llm_retries", 0), error=type(exc).__name__,
+                )
+                raise
+        content = response.content
+        _record_call(
+                model,
+                step,
+                messages,
+                started,
+                time.perf_counter(),
+                content if isinstance(content, str) else "",
+                getattr(response, "usage_metadata", None),
+                retries=retries,
         )
+        _cache_put(key, content)
+        return content
+
+
+def _stream_reply(model, messages, step=None) -> Iterator[str]:
+        """Yield the response to ``messages`` as it arrives, without think blocks."""
+        started = time.perf_counter()
+        key = _cache_key(model, messages) if LLM_CACHE_ENABLED else None
+        cached = _cache_get(key)
+        if cached is not None:
+                _record_call(model, step, messages, started, time.perf_counter(), cached, cache_hit=True)
+                yield remove_think_block(cached)
+                return
+        parts = []
+        usage = {}
+        first_token = None
+        retries = 0
+
+        def _open():
+                # Retries are only safe until the first chunk has been shown.
+                iterator = iter(model.stream(messages))
+                return next(iterator, None), iterator
+
+        def _chunks():
+                nonlocal first_token, retries
+                first, rest = None, iter(())
+                try:
+                        (first, rest), retries = _SCHEDULER.call(model, _open)
+                except Exception as exc:
+                        retries = getattr(exc, "llm_retries", 0)
+                        raise
+                for chunk in itertools.chain([first] if first is not None else [], rest):
+                        text = chunk.content if isinstance(chunk.content, str) else ""
+                        if text and first_token is None:
+                                first_token = time.perf_counter()
+                        parts.append(text)
+                        for name, value in (getattr(chunk, "usage_metadata", None) or {}).items():
+                                if isinstance(value, int):
+                                        usage[name] = usage.get(name, 0) + value
+                        yield text
+
+        try:
+                yield from ThinkFilter().stream(_chunks())
+        except Exception as exc:
+                _record_call(
+                        model, step, messages, started, first_token, "".join(parts),
+                        retries=retries, error=type(exc).__name__,
+                )
+                raise
+        content = "".join(parts)
+        _record_call(model, step, messages, started, first_token, content, usage or None, retries=retries)
+        _cache_put(key, content)
+
+
+def _reply(model, messages, stream=False):
+        """Return the chat reply text, or an iterator of text chunks with ``stream``."""
+        if stream:
+                # The generator runs after this step returns, so pass its name along.
+                return _stream_reply(model, messages, _CURRENT_STEP.get())
+        return remove_think_block(_invoke(model, messages))
 
-def step1(messages: List[Dict[str, str]]) -> str:
+
+class FakeChatModel:
+        """Offline stand-in for the chat clients (``VIOLETA_LLM_PROVIDER=fake``).
+
+        Answers are canned per step and shaped like what the real prompts ask
+        for, so every parser downstream sees valid JSON. The same request
+        always gets the same answer and the same simulated latency.
+
+        Latency is drawn from ``distribution`` (``constant``, ``uniform``,
+        ``normal``, ``lognormal`` or ``exponential``) around ``latency`` seconds
+        with spread ``jitter``; it is spent before the first token, and
+        streamed replies add ``token_latency`` per chunk. Replies start with a
+        short ``<think>`` block like deepseek-r1 does.
+        """
+
+        def __init__(
+                self,
+                latency=0.0,
+                jitter=0.0,
+                distribution="constant",
+                token_latency=0.0,
+                seed=0,
+                model="fake-llm",
+        ):
+                if distribution not in ("constant", "uniform", "normal", "lognormal", "exponential"):
+                        raise ValueError(f"Unknown latency distribution '{distribution}'.")
+                self.model = model
+                self.seed = seed
+                self.latency = latency
+                self.jitter = jitter
+                self.distribution = distribution
+                self.token_latency = token_latency
+
+        @classmethod
+        def from_env(cls):
+                return cls(
+                        latency=float(os.getenv("VIOLETA_FAKE_LATENCY", "0")),
+                        jitter=float(os.getenv("VIOLETA_FAKE_JITTER", "0")),
+                        distribution=os.getenv("VIOLETA_FAKE_DISTRIBUTION", "constant"),
+                        token_latency=float(os.getenv("VIOLETA_FAKE_TOKEN_LATENCY", "0")),
+                        seed=int(os.getenv("VIOLETA_FAKE_SEED", "0")),
+                )
+
+        def invoke(self, messages):
+                content = self._reply(messages)
+                time.sleep(self.sample_latency(messages))
+                return AIMessage(content=content)
+
+        def stream(self, messages):
+                content = self._reply(messages)
+                time.sleep(self.sample_latency(messages))
+                for token in re.findall(r"\S+\s*|\s+", content):
+                        yield AIMessageChunk(content=token)
+                        if self.token_latency:
+                                time.sleep(self.token_latency)
+
+        def sample_latency(self, messages) -> float:
+                rng = random.Random(f"{self.seed}:{self._digest(messages)}")
+                mean, spread = self.latency, self.jitter
+                if self.distribution == "uniform":
+                        value = rng.uniform(mean - spread, mean + spread)
+                elif self.distribution == "normal":
+                        value = rng.gauss(mean, spread)
+                elif self.distribution == "lognormal":
+                        value = mean * rng.lognormvariate(0, spread) if mean > 0 else 0.0
+                elif self.distribution == "exponential":
+                        value = rng.expovariate(1 / mean) if mean > 0 else 0.0
+                else:
+                        value = mean
+                return max(0.0, value)
+
+        @staticmethod
+        def _digest(messages):
+                text = "\x00".join(f"{m.type}:{m.content}" for m in messages)
+                return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+        def _reply(self, messages):
+                system = next((str(m.content) for m in messages if m.type == "system"), "")
+                human = {}
+                for message in messages:
+                        if message.type == "human":
+                                label, _, value = str(message.content).partition(": ")
+                                human[label] = value
+                last = str(messages[-1].content) if messages else ""
+
+                if "one-sentence kernels for the skill" in system:
+                        skill = human.get("Atomic skill", "skill")
+                        body = json.dumps({skill: [
+                                {
+                                        "kernel": f"Practising {skill} turns effort into skill.",
+                                        "input": "practice",
+                                        "verb": "turns",
+                                        "output": f"effort into {skill}",
+                                }
+                        ]})
+                elif "why mastering this kernel" in system:
+                        body = json.dumps([
+                                "prevents costly mistakes in everyday tasks",
+                                "builds confidence for harder problems",
+                        ])
+                elif "KERNEL ANALOGIES" in system:
+                        try:
+                                kernels = json.loads(human.get("Kernels", "[]"))
+                        except ValueError:
+                                kernels = []
+                        body = json.dumps({"kernels": [_fake_mapping(k) for k in kernels]})
+                elif "For every kernel and mechanic pair" in system:
+                        rows = re.findall(r"^(K\d+):", last, re.M)
+                        cols = re.findall(r"^(M\d+):", last, re.M)
+                        body = json.dumps({
+                                row: {col: f"Accepted – {row} fits {col}." for col in cols}
+                                for row in rows
+                        })
+                elif "STEP 8B" in system:
+                        body = "Accepted – the mechanic rehearses the kernel's micro-action."
+                else:
+                        body = f"Here are some ideas about: {last[:200]}"
+                return f"<think>Fake reasoning.</think>\n{body}"
+
+
+def _fake_mapping(kernel):
+        if not isinstance(kernel, dict):
+                kernel = {"kernel": str(kernel)}
+        return {
+                "kernel": kernel.get("kernel", ""),
+                "original_input": kernel.get("original_input", ""),
+                "original_verb": kernel.get("original_verb", ""),
+                "original_output": kernel.get("original_output", ""),
+                "in_world_input": f"in-world {kernel.get('original_input', 'input')}",
+                "in_world_verb": kernel.get("original_verb", "") or "becomes",
+                "in_world_output": f"in-world {kernel.get('original_output', 'output')}",
+                "in_world_kernel_sentence": f"In this world, {kernel.get('kernel', '')}",
+                "benefit_mapping": [
+                        {"benefit": benefit, "in_world_effect": f"In-world: {benefit}"}
+                        for benefit in kernel.get("benefits", []) or []
+                ],
+                "preserved": "Y",
+        }
+
+
+@instrumented
+def step1(messages: List[Dict[str, str]], stream: bool = False) -> Union[str, Iterator[str]]:
         """Return a chat-based response for choosing an atomic unit."""
         system_prompt = """Theory about what Atomic Unit is:
         
@@ -62,12 +874,17 @@ the designer’s educational goals, target audience, and contextual constraints.
                 else:
                         lc_messages.append(AIMessage(content=msg["content"]))
 
-        response = model.invoke(lc_messages)
-        return remove_think_block(response.content)
+        return _reply(model, lc_messages, stream)
+
 
+@instrumented
+def step2_kernels(atomic_unit: str, atomic_skills, max_workers: Optional[int] = None) -> str:
+        """Generate kernel sentences for each atomic skill by learning type.
 
-def step2_kernels(atomic_unit: str, atomic_skills) -> str:
-        """Generate kernel sentences for each atomic skill by learning type."""
+        Skills are sent to the model concurrently, at most ``max_workers``
+        (default ``LLM_CONCURRENCY``) at a time. The merged result and the
+        ``k{n}`` kernel ids follow the order of the skills.
+        """
 
         prompts = {
                 "Declarative": (
@@ -293,33 +1110,40 @@ output:
         else:
                 skills_by_type = {"Procedural": _flatten(atomic_skills)}
 
-        results = {}
-
-        for lt, skills in skills_by_type.items():
-                prompt = prompts.get(lt, prompts["Procedural"])
-                for skill in skills:
-                        lc_messages = [SystemMessage(content=prompt)]
-                        lc_messages.append(HumanMessage(content=f"Atomic unit: {atomic_unit}"))
-                        lc_messages.append(HumanMessage(content=f"Atomic skill: {skill}"))
+        jobs = [
+                (lt, prompts.get(lt, prompts["Procedural"]), skill)
+                for lt, skills in skills_by_type.items()
+                for skill in skills
+        ]
+
+        def _generate(job):
+                lt, prompt, skill = job
+                lc_messages = [SystemMessage(content=prompt)]
+                lc_messages.append(HumanMessage(content=f"Atomic unit: {atomic_unit}"))
+                lc_messages.append(HumanMessage(content=f"Atomic skill: {skill}"))
+
+                response = _invoke(model, lc_messages)
+                cleaned = remove_think_block(response)
+                cleaned = remove_code_fences(cleaned)
+                try:
+                        data = json.loads(cleaned)
+                        for k, kernels in list(data.items()):
+                                if isinstance(kernels, list):
+                                        for kernel in kernels:
+                                                if isinstance(kernel, dict):
+                                                        kernel["learning_type"] = lt
+                                elif isinstance(kernels, dict):
+                                        kernels["learning_type"] = lt
+                                        data[k] = [kernels]
+                                else:
+                                        data[k] = [{"kernel": kernels, "learning_type": lt}]
+                except Exception:
+                        data = {skill: [{"kernel": cleaned, "learning_type": lt}]}
+                return data
 
-                        response = model.invoke(lc_messages)
-                        cleaned = remove_think_block(response.content)
-                        cleaned = remove_code_fences(cleaned)
-                        try:
-                                data = json.loads(cleaned)
-                                for k, kernels in list(data.items()):
-                                        if isinstance(kernels, list):
-                                                for kernel in kernels:
-                                                        if isinstance(kernel, dict):
-                                                                kernel["learning_type"] = lt
-                                        elif isinstance(kernels, dict):
-                                                kernels["learning_type"] = lt
-                                                data[k] = [kernels]
-                                        else:
-                                                data[k] = [{"kernel": kernels, "learning_type": lt}]
-                        except Exception:
-                                data = {skill: [{"kernel": cleaned, "learning_type": lt}]}
-                        results.update(data)
+        results = {}
+        for data in _map_concurrent(_generate, jobs, max_workers):
+                results.update(data)
 
         # Ensure each kernel has a unique id
         counter = 1
@@ -333,6 +1157,7 @@ output:
         return json.dumps(results, indent=2)
 
 
+@instrumented
 def step2_why_it_matters(atomic_unit: str, kernel: dict) -> List[str]:
         """Generate a couple of short reasons why a kernel matters."""
         system_prompt = """
@@ -367,8 +1192,8 @@ output:
         lc_messages.append(HumanMessage(content=f"Atomic unit: {atomic_unit}"))
         lc_messages.append(HumanMessage(content=f"Kernel: {json.dumps(kernel)}"))
 
-        response = model.invoke(lc_messages)
-        cleaned = remove_think_block(response.content)
+        response = _invoke(model, lc_messages)
+        cleaned = remove_think_block(response)
         cleaned = remove_code_fences(cleaned)
         try:
                 data = json.loads(cleaned)
@@ -385,7 +1210,8 @@ output:
 
 
 
-def step3a(atomic_unit, atomic_skills, messages: List[Dict[str, str]]) -> str:
+@instrumented
+def step3a(atomic_unit, atomic_skills, messages: List[Dict[str, str]], stream: bool = False) -> Union[str, Iterator[str]]:
         """Return a chat-based response for choosing a theme."""
         system_prompt = """
 STEP 3A – PICK A CANDIDATE THEME  
@@ -422,10 +1248,10 @@ Theme blurb: [two paragraphs as described above]
                 else:
                         lc_messages.append(AIMessage(content=msg["content"]))
 
-        response = model.invoke(lc_messages)
-        return remove_think_block(response.content)
+        return _reply(model, lc_messages, stream)
 
 
+@instrumented
 def step3b(theme: str, kernels_with_benefits) -> str:
         """Map kernels and their benefits into the chosen theme."""
         system_prompt = """
@@ -476,17 +1302,91 @@ Output format:
                 HumanMessage(content=f"Kernels: {json.dumps(kernels_with_benefits)}")
         )
 
-        response = model.invoke(lc_messages)
-        return remove_think_block(response.content)
+        response = _invoke(model, lc_messages)
+        return remove_think_block(response)
+
+
+@instrumented
+def step3b_all(
+        theme: str,
+        kernels_with_benefits: List[Dict],
+        max_workers: int = 1,
+        timeout: Optional[float] = None,
+) -> Dict:
+        """Run step3b separately for each kernel and merge the results.
+
+        Up to ``max_workers`` kernels are mapped at the same time. A kernel
+        whose call raises, or runs longer than ``timeout`` seconds, is left
+        out and listed under ``"errors"`` as ``{"index", "kernel", "error"}``
+        so the other kernels still come back. A timed-out call keeps its
+        slot until it actually returns, so no more than ``max_workers``
+        requests are ever in flight. The merged ``"kernels"`` keep the input
+        order.
+        """
 
+        kernels = list(kernels_with_benefits)
+        finished = queue.Queue()
 
-def step3b_all(theme: str, kernels_with_benefits: List[Dict]) -> Dict:
-        """Run step3b separately for each kernel and merge the results."""
+        def _run(index):
+                try:
+                        finished.put((index, step3b(theme, [kernels[index]]), None))
+                except Exception as exc:
+                        finished.put((index, None, exc))
+
+        outputs = {}
+        errors = {}
+        # Deadline (or None) of each call in flight. A timed-out call is
+        # abandoned: its late answer is ignored.
+        running = {}
+        # Calls whose thread has not reported back yet, abandoned ones
+        # included: they still hold a model request open, so they count
+        # against ``max_workers`` until they return.
+        live = set()
+        # Set while every slot is held by an abandoned call: the kernels not
+        # started yet fail if no slot frees up within ``timeout``.
+        slot_deadline = None
+        next_index = 0
+        while len(outputs) + len(errors) < len(kernels):
+                while next_index < len(kernels) and len(live) < max(1, max_workers):
+                        ctx = contextvars.copy_context()
+                        threading.Thread(target=ctx.run, args=(_run, next_index), daemon=True).start()
+                        running[next_index] = time.monotonic() + timeout if timeout else None
+                        live.add(next_index)
+                        next_index += 1
+                if running or next_index == len(kernels):
+                        slot_deadline = None
+                elif slot_deadline is None:
+                        slot_deadline = time.monotonic() + timeout
+
+                deadlines = [d for d in running.values() if d is not None]
+                if slot_deadline is not None:
+                        deadlines.append(slot_deadline)
+                wait = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+                try:
+                        index, result, exc = finished.get(timeout=wait)
+                except queue.Empty:
+                        now = time.monotonic()
+                        for index, deadline in list(running.items()):
+                                if deadline is not None and deadline <= now:
+                                        del running[index]
+                                        errors[index] = f"Timed out after {timeout:g}s"
+                        if slot_deadline is not None and slot_deadline <= now:
+                                for index in range(next_index, len(kernels)):
+                                        errors[index] = f"Timed out after {timeout:g}s waiting for a free slot"
+                                next_index = len(kernels)
+                        continue
+                live.discard(index)
+                if index not in running:
+                        continue
+                del running[index]
+                if exc is not None:
+                        errors[index] = str(exc) or type(exc).__name__
+                else:
+                        outputs[index] = result
 
         combined = {"kernels": []}
-        for kern in kernels_with_benefits:
-                result = step3b(theme, [kern])
-                cleaned = remove_code_fences(result)
+        for index in sorted(outputs):
+                cleaned = remove_code_fences(outputs[index])
                 try:
                         parsed = json.loads(cleaned)
                         if isinstance(parsed, dict) and "kernels" in parsed:
@@ -495,10 +1395,16 @@ def step3b_all(theme: str, kernels_with_benefits: List[Dict]) -> Dict:
                                 combined["kernels"].append(parsed)
                 except Exception:
                         combined["kernels"].append(cleaned)
+        if errors:
+                combined["errors"] = [
+                        {"index": index, "kernel": kernels[index], "error": errors[index]}
+                        for index in sorted(errors)
+                ]
         return combined
 
 
-def step2(atomic_unit, messages: List[Dict[str, str]]) -> str:
+@instrumented
+def step2(atomic_unit, messages: List[Dict[str, str]], stream: bool = False) -> Union[str, Iterator[str]]:
         """Return a chat-based response for choosing atomic skills."""
         system_prompt = """
 ### STEP 2 · DECOMPOSE & TYPE-TAG THE ATOMIC SKILLS
@@ -578,20 +1484,167 @@ metacognitive skills (M):
                 else:
                         lc_messages.append(AIMessage(content=msg["content"]))
 
-        response = model.invoke(lc_messages)
-        return remove_think_block(response.content)
+        return _reply(model, lc_messages, stream)
+
+
+
+class StreamFilter:
+        """Single-pass text filter for streamed model output.
+
+        ``feed`` takes chunks in order and returns the text that is final so
+        far; ``flush`` returns the rest once the stream ends and resets the
+        filter. ``filter`` applies it to a whole string and ``stream`` to an
+        iterable of chunks.
+        """
+
+        def feed(self, chunk: str) -> str:
+                raise NotImplementedError
+
+        def flush(self) -> str:
+                raise NotImplementedError
+
+        def filter(self, text: str) -> str:
+                return self.feed(text) + self.flush()
+
+        def stream(self, chunks) -> Iterator[str]:
+                for chunk in chunks:
+                        text = self.feed(chunk)
+                        if text:
+                                yield text
+                text = self.flush()
+                if text:
+                        yield text
+
+
+class ThinkFilter(StreamFilter):
+        """Drop ``<think>…</think>`` blocks and the whitespace after them.
+
+        Tags may be split across chunks. A block that is never closed is kept
+        verbatim, matching ``re.sub(r"<think>.*?</think>\\s*", "", text, flags=re.DOTALL)``.
+        """
+
+        OPEN = "<think>"
+        CLOSE = "</think>"
+
+        def __init__(self):
+                self._pending = ""  # text not yet emitted (or the open block)
+                self._inside = False
+                self._searched = 0  # offset in an open block already searched
+                self._skip_space = False
+
+        def feed(self, chunk: str) -> str:
+                out = []
+                self._pending += chunk
+                while self._pending:
+                        if self._skip_space:
+                                self._pending = self._pending.lstrip()
+                                if not self._pending:
+                                        break
+                                self._skip_space = False
+                        if self._inside:
+                                end = self._pending.find(self.CLOSE, self._searched)
+                                if end == -1:
+                                        self._searched = max(
+                                                len(self.OPEN), len(self._pending) - len(self.CLOSE) + 1
+                                        )
+                                        break
+                                self._pending = self._pending[end + len(self.CLOSE):]
+                                self._inside = False
+                                self._skip_space = True
+                                continue
+                        start = self._pending.find(self.OPEN)
+                        if start == -1:
+                                keep = _partial_tag(self._pending, self.OPEN)
+                                out.append(self._pending[: len(self._pending) - keep])
+                                self._pending = self._pending[len(self._pending) - keep:]
+                                break
+                        out.append(self._pending[:start])
+                        self._pending = self._pending[start:]
+                        self._inside = True
+                        self._searched = len(self.OPEN)
+                return "".join(out)
+
+        def flush(self) -> str:
+                rest = "" if self._skip_space else self._pending
+                self.__init__()
+                return rest
+
+
+class FenceFilter(StreamFilter):
+        """Drop markdown code-fence markers.
+
+        A marker is removed together with a language tag and newline right
+        after it, as on an opening ```` ```json ```` line; any other ``` is
+        removed on its own. The result matches the ``re.sub`` and ``replace``
+        passes ``remove_code_fences`` used to make, before stripping.
+        """
+
+        FENCE = "```"
+
+        def __init__(self):
+                self._pending = ""  # input whose fences are not decided yet
+                self._carry = ""  # trailing backticks that may join a later fence
+
+        def feed(self, chunk: str) -> str:
+                self._pending += chunk
+                return self._drop_bare_fences(self._drop_opening_fences(False), False)
+
+        def flush(self) -> str:
+                rest = self._drop_bare_fences(self._drop_opening_fences(True), True)
+                self.__init__()
+                return rest
+
+        def _drop_opening_fences(self, final):
+                text = self._pending
+                out = []
+                pos = 0
+                while True:
+                        start = text.find(self.FENCE, pos)
+                        if start == -1:
+                                keep = 0 if final else _partial_tag(text[pos:], self.FENCE)
+                                out.append(text[pos : len(text) - keep])
+                                pos = len(text) - keep
+                                break
+                        end = start + len(self.FENCE)
+                        while end < len(text) and text[end].isascii() and text[end].isalpha():
+                                end += 1
+                        if end == len(text) and not final:
+                                # The language tag may continue in the next chunk.
+                                out.append(text[pos:start])
+                                pos = start
+                                break
+                        if end < len(text) and text[end] == "\n":
+                                out.append(text[pos:start])
+                                pos = end + 1
+                        else:
+                                # Not an opening fence; move on by one character.
+                                out.append(text[pos : start + 1])
+                                pos = start + 1
+                self._pending = text[pos:]
+                return "".join(out)
+
+        def _drop_bare_fences(self, text, final):
+                text = (self._carry + text).replace(self.FENCE, "")
+                keep = 0 if final else len(text) - len(text.rstrip("`"))
+                self._carry = text[len(text) - keep:]
+                return text[: len(text) - keep]
+
 
+def _partial_tag(text: str, tag: str) -> int:
+        """Length of the longest suffix of ``text`` that is a proper prefix of ``tag``."""
+        for size in range(min(len(tag) - 1, len(text)), 0, -1):
+                if text.endswith(tag[:size]):
+                        return size
+        return 0
 
 
 def remove_think_block(text: str) -> str:
-        return re.sub(r"<think>.*?</think>\s*","", text, flags=re.DOTALL)
+        return ThinkFilter().filter(text)
 
 
 def remove_code_fences(text: str) -> str:
         """Strip markdown-style triple backtick fences from the text."""
-        text = re.sub(r"```[a-zA-Z]*\n", "", text)
-        text = text.replace("```", "")
-        return text.strip()
+        return FenceFilter().filter(text).strip()
 
 
 def step3_mapping(theme: str, skill_kernels) -> str:
@@ -599,7 +1652,8 @@ def step3_mapping(theme: str, skill_kernels) -> str:
         return step3b(theme, skill_kernels)
 
 
-def step4(theme: str, atomic_skills, messages: List[Dict[str, str]]) -> str:
+@instrumented
+def step4(theme: str, atomic_skills, messages: List[Dict[str, str]], stream: bool = False) -> Union[str, Iterator[str]]:
         """Generate a short emotional arc description."""
         system_prompt = f"""
 ### STEP 4 – Map the Emotional Arc
@@ -629,11 +1683,11 @@ Relief Satisfaction: Arises from the successful application of all skills, parti
                 else:
                         lc_messages.append(AIMessage(content=msg["content"]))
 
-        response = model.invoke(lc_messages)
-        return remove_think_block(response.content)
+        return _reply(model, lc_messages, stream)
 
 
-def step5(feelings: str, messages: List[Dict[str, str]]) -> str:
+@instrumented
+def step5(feelings: str, messages: List[Dict[str, str]], stream: bool = False) -> Union[str, Iterator[str]]:
         """Arrange feelings into a simple hierarchy or sequence."""
 
         system_prompt = f"""
@@ -711,10 +1765,10 @@ Back-ups
                 else:
                         lc_messages.append(AIMessage(content=msg["content"]))
 
-        response = model.invoke(lc_messages)
-        return remove_think_block(response.content)
+        return _reply(model, lc_messages, stream)
 
 
+@instrumented
 def step6_mechanic_ideas(
     layered_feelings: str,
     medium: str,
@@ -722,7 +1776,8 @@ def step6_mechanic_ideas(
     atomic_skills,
     theme_blurb: str,
     messages: List[Dict[str, str]],
-) -> str:
+    stream: bool = False,
+) -> Union[str, Iterator[str]]:
         """Suggest mechanics for each feeling."""
 
         system_prompt = f"""
@@ -761,10 +1816,10 @@ Constant pressure: Tight margin of success
                 else:
                         lc_messages.append(AIMessage(content=msg["content"]))
 
-        response = model.invoke(lc_messages)
-        return remove_think_block(response.content)
+        return _reply(model, lc_messages, stream)
 
 
+@instrumented
 def step7_mvp_ideas(
     mechanic: str,
     medium: str,
@@ -772,7 +1827,8 @@ def step7_mvp_ideas(
     atomic_skills,
     theme_blurb: str,
     messages: List[Dict[str, str]],
-) -> str:
+    stream: bool = False,
+) -> Union[str, Iterator[str]]:
         """Suggest schema breakdowns for building the MVP."""
 
         system_prompt = f"""
@@ -811,17 +1867,18 @@ Target Mechanic:
                 else:
                         lc_messages.append(AIMessage(content=msg["content"]))
 
-        response = model.invoke(lc_messages)
-        return remove_think_block(response.content)
+        return _reply(model, lc_messages, stream)
 
 
+@instrumented
 def step7_theme_fit(
     theme_vignette: str,
     kernel_mappings,
     parent: str,
     element: str,
     messages: List[Dict[str, str]],
-) -> str:
+    stream: bool = False,
+) -> Union[str, Iterator[str]]:
     """Suggest how an element functions within the chosen theme."""
 
     mapping_text = json.dumps(kernel_mappings, indent=2) if kernel_mappings else ""
@@ -849,10 +1906,10 @@ Provide short suggestions on how this element could represent or operate within
         else:
             lc_messages.append(AIMessage(content=msg["content"]))
 
-    response = model.invoke(lc_messages)
-    return remove_think_block(response.content)
+    return _reply(model, lc_messages, stream)
 
-def step8_sit_ideas(skills, emotions, messages: List[Dict[str, str]]) -> str:
+@instrumented
+def step8_sit_ideas(skills, emotions, messages: List[Dict[str, str]], stream: bool = False) -> Union[str, Iterator[str]]:
     """Suggest direct skill → emotion links for the SIT."""
 
     skills_text = ", ".join(skills)
@@ -877,15 +1934,19 @@ Suggest which skills directly influence which emotions. Respond using the format
         else:
             lc_messages.append(AIMessage(content=msg["content"]))
 
-    response = model.invoke(lc_messages)
-    return remove_think_block(response.content)
+    return _reply(model, lc_messages, stream)
+
+
+_STEP8B_HEADER = "### STEP 8B – Triadic Integration Table – Kernel\n\n"
+_STEP8B_VERDICT = re.compile(r"^\s*(Accepted|Revised|Rejected)\b")
 
 
+@instrumented
 def step8b_cell(kernel: str, mechanic: str, emotion: str) -> str:
     """Evaluate how a mechanic serves a kernel for a given emotion."""
     system_prompt = (
-        "### STEP 8B – Triadic Integration Table – Kernel\n\n"
-        "For the given kernel and mechanic, determine whether the mechanic can "
+        _STEP8B_HEADER
+        + "For the given kernel and mechanic, determine whether the mechanic can "
         "express the real-life micro-action trained by the kernel within the "
         "emotional context. Respond with one of: Accepted – <rationale>, "
         "Revised – <rationale>, or Rejected – <rationale>. Return only a single "
@@ -903,10 +1964,107 @@ def step8b_cell(kernel: str, mechanic: str, emotion: str) -> str:
         SystemMessage(content=system_prompt),
         HumanMessage(content=user_prompt),
     ]
-    response = model.invoke(lc_messages)
-    return remove_think_block(response.content)
+    response = _invoke(model, lc_messages)
+    return remove_think_block(response)
+
+
+def _step8b_block(kernels: List[str], mechanics: List[str], emotion: str):
+    """Ask for every kernel × mechanic cell in one request.
+
+    Returns ``{(kernel_index, mechanic_index): verdict}`` for the cells whose
+    answer parsed; missing or malformed cells are simply absent.
+    """
+    system_prompt = (
+        _STEP8B_HEADER
+        + "For every kernel and mechanic pair below, determine whether the "
+        "mechanic can express the real-life micro-action trained by the kernel "
+        "within the emotional context. Judge each pair on its own. Each verdict "
+        "is a single sentence starting with Accepted – <rationale>, "
+        "Revised – <rationale>, or Rejected – <rationale>.\n\n"
+        "Return only a JSON object that maps each kernel label to an object "
+        "mapping each mechanic label to its verdict, for example:\n"
+        '{"K1": {"M1": "Accepted – ...", "M2": "Rejected – ..."}}'
+    )
+    user_prompt = "\n".join(
+        [f"Emotion: {emotion}", "Kernels:"]
+        + [f"K{i}: {kernel}" for i, kernel in enumerate(kernels, start=1)]
+        + ["Mechanics:"]
+        + [f"M{j}: {mechanic}" for j, mechanic in enumerate(mechanics, start=1)]
+    )
+
+    model = get_llm()
+    lc_messages = [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=user_prompt),
+    ]
+    response = _invoke(model, lc_messages)
+    cleaned = remove_code_fences(remove_think_block(response))
+    try:
+        data = json.loads(cleaned)
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+
+    cells = {}
+    for i in range(len(kernels)):
+        row = data.get(f"K{i + 1}")
+        if not isinstance(row, dict):
+            continue
+        for j in range(len(mechanics)):
+            verdict = row.get(f"M{j + 1}")
+            if isinstance(verdict, str) and _STEP8B_VERDICT.match(verdict):
+                cells[(i, j)] = verdict.strip()
+    return cells
+
+
+@instrumented
+def step8b_matrix(
+    kernels: List[str],
+    mechanics: List[str],
+    emotion: str,
+    per_row: bool = False,
+    max_workers: Optional[int] = None,
+) -> List[List[str]]:
+    """Evaluate a whole TIT-K table and return one row of verdicts per kernel.
+
+    The table is sent as a single request (or one request per kernel with
+    ``per_row``, run concurrently) that answers with JSON. Only cells whose
+    batched answer is missing or malformed fall back to ``step8b_cell``.
+    """
+    kernels = list(kernels)
+    mechanics = list(mechanics)
+    if not kernels or not mechanics:
+        return [[] for _ in kernels]
+
+    cells = {}
+    if per_row:
+        rows = _map_concurrent(
+            lambda kernel: _step8b_block([kernel], mechanics, emotion),
+            kernels,
+            max_workers,
+        )
+        for i, row in enumerate(rows):
+            cells.update({(i, j): verdict for (_, j), verdict in row.items()})
+    else:
+        cells = _step8b_block(kernels, mechanics, emotion)
+
+    missing = [
+        (i, j)
+        for i in range(len(kernels))
+        for j in range(len(mechanics))
+        if (i, j) not in cells
+    ]
+    fallbacks = _map_concurrent(
+        lambda cell: step8b_cell(kernels[cell[0]], mechanics[cell[1]], emotion),
+        missing,
+        max_workers,
+    )
+    cells.update(zip(missing, fallbacks))
+    return [[cells[(i, j)] for j in range(len(mechanics))] for i in range(len(kernels))]
 
 
+@instrumented
 def generate_game_description(data: dict) -> str:
     """Generate a high-level game description from gathered data."""
     system_prompt = (
@@ -943,5 +2101,5 @@ def generate_game_description(data: dict) -> str:
         SystemMessage(content=system_prompt),
         HumanMessage(content=f"Structured game data:\n{content}"),
     ]
-    response = model.invoke(lc_messages)
-    return remove_think_block(response.content)
+    response = _invoke(model, lc_messages)
+    return remove_think_block(response)
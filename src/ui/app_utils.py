@@ -1,29 +1,371 @@
 import json
+import marshal
+import os
 import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
 
-from gdsf import GDSFParser
+from gdsf import ConflictError, Journal, SQLiteStore, StorageBackend, open_store
+from gdsf.journal import apply_changes
+from gdsf.store import filter_cells
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 DATA_PATH = BASE_DIR / "ui" / "data"
 DATA_PATH.mkdir(exist_ok=True)
-GDSF_FILE = DATA_PATH / "info.gdsf"
+# "gdsf" keeps the project in one text file, "sqlite" in a database with one
+# row per section. The backend of any other path follows its suffix.
+STORE_BACKEND = os.getenv("VIOLETA_STORE", "gdsf").lower()
+GDSF_FILE = DATA_PATH / ("info.sqlite" if STORE_BACKEND == "sqlite" else "info.gdsf")
+# Sections holding nested JSON that stores can query cell by cell.
+INDEXED_SECTIONS = {"tit_table": ("emotion", "skill", "kernel", "column")}
+# Projects live in ``DATA_PATH/<project_id>/``. Sessions that have not picked
+# one share ``GDSF_FILE``.
+PROJECT_ID_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+MAX_OPEN_PROJECTS = int(os.getenv("VIOLETA_MAX_OPEN_PROJECTS", "32"))
+# Every save is also recorded in ``<data file>.journal`` for undo, redo and
+# point-in-time restore, with a full checkpoint every JOURNAL_CHECKPOINT_EVERY
+# changes.
+JOURNAL_ENABLED = os.getenv("VIOLETA_JOURNAL", "1") != "0"
+JOURNAL_CHECKPOINT_EVERY = int(os.getenv("VIOLETA_JOURNAL_CHECKPOINT_EVERY", "50"))
+
+# Open section stores per project path, shared by every session in this
+# process and evicted least recently used first beyond MAX_OPEN_PROJECTS. A
+# store reloads only when its file changed and stamps each state with a
+# version the decoded-value memo below checks.
+_STORES: OrderedDict[Path, StorageBackend] = OrderedDict()
+# The change journal of each open store, evicted along with it.
+_JOURNALS: dict[Path, Journal] = {}
+# Compiled trees per ``(path, section)`` as ``(raw value, CompiledTree)``.
+_TREE_CACHE: dict[tuple[Path, str], tuple[str, "CompiledTree"]] = {}
+# Decoded JSON values per ``(path, section, default)`` as ``(version, blob)``.
+# ``blob`` is the marshalled value, or ``None`` if the value is not JSON.
+_DECODED_CACHE: dict[tuple[Path, str, str], tuple[int, bytes | None]] = {}
+_CACHE_LOCK = threading.Lock()
+# Section updates collected by an open ``transaction()`` as ``(path, updates)``.
+# Context-local, so concurrent Streamlit sessions never see each other's.
+_PENDING: ContextVar[tuple[Path, dict] | None] = ContextVar("pending", default=None)
+# Project of the current session (``None`` for the shared file).
+_PROJECT: ContextVar[str | None] = ContextVar("project", default=None)
+
+
+def project_file(project_id: str | None) -> Path:
+    """Return the data file of ``project_id``, or the shared one for ``None``."""
+    if project_id is None:
+        return GDSF_FILE
+    if not PROJECT_ID_PATTERN.fullmatch(project_id):
+        raise ValueError(
+            f"Invalid project ID {project_id!r}: use letters, digits, '.', '_' or '-'."
+        )
+    return DATA_PATH / project_id / GDSF_FILE.name
+
+
+def set_project(project_id: str | None) -> None:
+    """Make loads and saves in the current context use ``project_id``.
+
+    The selection is context-local, so concurrent Streamlit sessions each
+    work on their own project. Pages call this at the top of every run.
+    Widget callbacks run before that, often on a fresh thread with no
+    project selected, so they wrap their body in ``project()``.
+    """
+    path = project_file(project_id or None)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _PROJECT.set(project_id or None)
+
+
+def current_project() -> str | None:
+    return _PROJECT.get()
+
+
+@contextmanager
+def project(project_id: str | None):
+    """Use ``project_id`` inside the block and restore the previous project."""
+    token = _PROJECT.set(_PROJECT.get())
+    try:
+        set_project(project_id)
+        yield
+    finally:
+        _PROJECT.reset(token)
+
+
+def list_projects() -> list[str]:
+    """Return the IDs of the projects found under ``DATA_PATH``."""
+    return sorted(
+        entry.name
+        for entry in DATA_PATH.iterdir()
+        if entry.is_dir() and PROJECT_ID_PATTERN.fullmatch(entry.name)
+    )
+
+
+def _data_file() -> Path:
+    return project_file(_PROJECT.get())
+
+
+def _store(path: Path) -> StorageBackend:
+    with _CACHE_LOCK:
+        store = _STORES.get(path)
+        if store is not None:
+            _STORES.move_to_end(path)
+            return store
+        created = not path.exists()
+        store = _STORES[path] = open_store(path, indexed=INDEXED_SECTIONS)
+        while len(_STORES) > MAX_OPEN_PROJECTS:
+            # Sessions still holding an evicted store keep using it; it is
+            # released once they are done.
+            evicted, _ = _STORES.popitem(last=False)
+            _JOURNALS.pop(evicted, None)
+            for key in [key for key in _TREE_CACHE if key[0] == evicted]:
+                del _TREE_CACHE[key]
+            for key in [key for key in _DECODED_CACHE if key[0] == evicted]:
+                del _DECODED_CACHE[key]
+        legacy = path.with_suffix(".gdsf")
+        if created and isinstance(store, SQLiteStore) and legacy.exists():
+            # First switch to SQLite: carry the text project over.
+            store.import_gdsf(legacy)
+    return store
+
+
+def _journal(path: Path) -> Journal | None:
+    if not JOURNAL_ENABLED:
+        return None
+    _store(path)
+    with _CACHE_LOCK:
+        journal = _JOURNALS.get(path)
+        if journal is None:
+            journal = _JOURNALS[path] = Journal(
+                path.with_name(path.name + ".journal"), JOURNAL_CHECKPOINT_EVERY
+            )
+    return journal
+
+
+def _commit(path: Path, changes: dict, **options) -> None:
+    """Write ``changes`` to the store of ``path`` through its journal."""
+    store = _store(path)
+    journal = _journal(path)
+    if journal is None:
+        apply_changes(store, changes, **options)
+    else:
+        journal.commit(store, changes, **options)
+
+
+def _cached_sections(path: Path) -> tuple[int, dict]:
+    """Return ``(version, sections)`` for ``path``, re-parsing only on change."""
+    return _store(path).read()
+
+
+def invalidate_cache() -> None:
+    """Forget every cached gdsf file so the next load reads from disk."""
+    with _CACHE_LOCK:
+        _STORES.clear()
+        _JOURNALS.clear()
+        _TREE_CACHE.clear()
+        _DECODED_CACHE.clear()
+
+
+def _pending_updates() -> dict:
+    pending = _PENDING.get()
+    if pending is None or pending[0] != _data_file():
+        return {}
+    return pending[1]
 
 
 def _load_data() -> dict:
-    if GDSF_FILE.exists():
-        parser = GDSFParser(GDSF_FILE)
-        return parser.sections
-    return {}
+    # Hand out fresh section dicts: callers replace entries before saving and
+    # must not touch the shared cache.
+    _, sections = _cached_sections(_data_file())
+    sections = {**sections, **_pending_updates()}
+    return {name: dict(values) for name, values in sections.items()}
+
+
+def _load_value(name: str, default: str = "") -> str:
+    """Return the raw ``value`` string stored in section ``name``."""
+    pending = _pending_updates()
+    if name in pending:
+        return pending[name].get("value", default)
+    _, sections = _cached_sections(_data_file())
+    return sections.get(name, {}).get("value", default)
+
+
+def _load_json(name: str, default: str = ""):
+    """Return the decoded JSON ``value`` of section ``name``.
+
+    A section is decoded once per file version and kept as a marshal blob.
+    Every call unpacks a private copy, which is cheaper than ``json.loads``
+    and lets callers mutate the result without touching the cache. Raises
+    ``ValueError`` if the stored value is not valid JSON.
+    """
+    pending = _pending_updates()
+    if name in pending:
+        return json.loads(pending[name].get("value", default))
+    path = _data_file()
+    version, sections = _cached_sections(path)
+    key = (path, name, default)
+    with _CACHE_LOCK:
+        cached = _DECODED_CACHE.get(key)
+    if cached is None or cached[0] != version:
+        raw = sections.get(name, {}).get("value", default)
+        try:
+            blob = marshal.dumps(json.loads(raw))
+        except Exception:
+            blob = None
+        cached = (version, blob)
+        with _CACHE_LOCK:
+            _DECODED_CACHE[key] = cached
+    if cached[1] is None:
+        raise ValueError(f"Section '{name}' does not hold a JSON value.")
+    return marshal.loads(cached[1])
+
+
+def _save_section(name: str, value: str) -> None:
+    """Store ``value`` in section ``name``, writing only that section.
+
+    The section is appended to the file. A worker killed mid-append leaves a
+    torn tail that loads ignore and the next save cuts off.
+    """
+    pending = _PENDING.get()
+    path = _data_file()
+    if pending is not None and pending[0] == path:
+        pending[1][name] = {"value": value}
+        return
+    _commit(path, {name: {"value": value}})
+
+
+@contextmanager
+def transaction(expected_revision: int | None = None, atomic: bool = True):
+    """Group several saves into a single atomic write of the gdsf file.
+
+    Saves made inside the block are held in memory, and loads in the same
+    block see them. On a clean exit they are committed together through a
+    temp file and ``os.replace``. If the block or the commit raises, nothing
+    is written and later loads still return the saved state. Nested blocks
+    join the outermost one.
+
+    With ``atomic=False`` the saves are appended in one write instead, which
+    is still all or nothing but only costs the changed sections.
+
+    With ``expected_revision`` (see ``current_revision()``) the commit only
+    goes through if nobody saved the project since that revision; otherwise
+    ``ConflictError`` is raised and nothing is written.
+    """
+    if _PENDING.get() is not None:
+        yield
+        return
+    path = _data_file()
+    updates: dict[str, dict] = {}
+    token = _PENDING.set((path, updates))
+    try:
+        yield
+    finally:
+        _PENDING.reset(token)
+    if updates:
+        _commit(path, updates, atomic=atomic, expected_revision=expected_revision)
+
+
+# Shown by pages whose compare-and-swap save lost to another session.
+CONFLICT_MESSAGE = (
+    "Someone else saved this project since the page was loaded. "
+    "Check the latest data and save again."
+)
+
+
+def current_revision() -> int:
+    """Return the saved revision of the current project."""
+    return _store(_data_file()).current_revision()
+
+
+def page_revision(state, key: str) -> int | None:
+    """Return the revision recorded under ``key`` by the previous run and record this one.
+
+    ``state`` is the session state of a page. Call this where the page
+    renders a save button, after any saves earlier in the run: the revision
+    from the previous run is the one the user's edits were made against, to
+    be passed as ``expected_revision`` when the button is pressed.
+
+    A save made after the call leaves the recorded revision behind this
+    session's own write, so the next save would conflict with it. Pages that
+    do not rerun after saving call ``record_page_revision()`` on success.
+    """
+    previous = state.get(key)
+    state[key] = current_revision()
+    return previous
+
+
+def record_page_revision(state, key: str) -> None:
+    """Record the current revision under ``key`` after a successful save."""
+    state[key] = current_revision()
+
+
+def retry_on_conflict(update, retries: int = 3):
+    """Run ``update()`` as a compare-and-swap transaction and return its result.
+
+    ``update`` should load what it changes, modify it and save it. When
+    another writer saved the project in the meantime the transaction is
+    dropped and ``update`` runs again on the fresh data, up to ``retries``
+    more times before ``ConflictError`` propagates. The store checks the
+    revision under its write lock, so the commit appends the changed sections
+    instead of rewriting the whole file.
+    """
+    for attempt in range(retries + 1):
+        revision = current_revision()
+        try:
+            with transaction(expected_revision=revision, atomic=False):
+                return update()
+        except ConflictError:
+            if attempt == retries:
+                raise
+
 
+def undo() -> bool:
+    """Revert the latest change to the current project; ``False`` if none."""
+    path = _data_file()
+    journal = _journal(path)
+    return journal is not None and journal.undo(_store(path)) is not None
 
-def _save_data(sections: dict) -> None:
-    with open(GDSF_FILE, "w") as f:
-        for name, values in sections.items():
-            f.write(f"[{name}]\n")
-            for k, v in values.items():
-                f.write(f'{k} = "{v}"\n')
-            f.write("\n")
+
+def redo() -> bool:
+    """Re-apply the latest undone change; ``False`` if none."""
+    path = _data_file()
+    journal = _journal(path)
+    return journal is not None and journal.redo(_store(path)) is not None
+
+
+def can_undo() -> bool:
+    journal = _journal(_data_file())
+    return journal is not None and journal.can_undo()
+
+
+def can_redo() -> bool:
+    journal = _journal(_data_file())
+    return journal is not None and journal.can_redo()
+
+
+def change_history() -> list[dict]:
+    """Return the journal of the current project, oldest entry first.
+
+    Each entry has ``seq``, ``ts`` (UNIX time), ``op`` (``edit``, ``undo``,
+    ``redo``, ``restore`` or ``checkpoint``), ``target`` and ``sections``.
+    """
+    journal = _journal(_data_file())
+    return journal.history() if journal is not None else []
+
+
+def restore(seq: int | None = None, timestamp: float | None = None) -> None:
+    """Bring the current project back to journal entry ``seq``.
+
+    With ``timestamp`` the last entry written at or before that time is
+    used. The restore itself can be undone.
+    """
+    path = _data_file()
+    journal = _journal(path)
+    if journal is None:
+        raise RuntimeError("The change journal is disabled (VIOLETA_JOURNAL=0).")
+    if seq is None:
+        seq = journal.seq_at(timestamp)
+        if seq is None:
+            raise ValueError("No journal entry at or before that time.")
+    journal.restore(_store(path), seq)
 
 
 REQUIRED_SECTIONS = [
@@ -57,34 +399,27 @@ def all_steps_completed() -> bool:
 
 
 def save_atomic_unit(value: str) -> None:
-    data = _load_data()
-    data["atomic_unit"] = {"value": value}
-    _save_data(data)
+    _save_section("atomic_unit", value)
 
 
 def load_atomic_unit() -> str:
-    data = _load_data()
-    return data.get("atomic_unit", {}).get("value", "")
+    return _load_value("atomic_unit")
 
 
 def save_learning_types(types: list[str]) -> None:
     """Persist selected learning types to the gdsf file."""
-    data = _load_data()
-    data["learning_types"] = {"value": json.dumps(types)}
-    _save_data(data)
+    _save_section("learning_types", json.dumps(types))
 
 
 def load_learning_types() -> list[str]:
     """Return the learning types stored in the gdsf file."""
-    data = _load_data()
-    raw = data.get("learning_types", {}).get("value", "[]")
     try:
-        loaded = json.loads(raw)
-        if isinstance(loaded, list):
-            return loaded
-        return [str(loaded)]
-    except Exception:
+        loaded = _load_json("learning_types", "[]")
+    except ValueError:
         return []
+    if isinstance(loaded, list):
+        return loaded
+    return [str(loaded)]
 
 
 def _parse_atomic_skills(text: str):
@@ -139,40 +474,30 @@ def save_atomic_skills(skills) -> None:
     else:
         parsed = skills
 
-    data = _load_data()
-    data["atomic_skills"] = {"value": json.dumps(parsed)}
-    _save_data(data)
+    _save_section("atomic_skills", json.dumps(parsed))
 
 
 def load_atomic_skills():
-    data = _load_data()
-    raw = data.get("atomic_skills", {}).get("value", "")
     try:
-        return json.loads(raw)
-    except Exception:
-        return raw
+        return _load_json("atomic_skills")
+    except ValueError:
+        return _load_value("atomic_skills")
 
 
 def save_theme(theme: str) -> None:
-    data = _load_data()
-    data["theme"] = {"value": theme}
-    _save_data(data)
+    _save_section("theme", theme)
 
 
 def load_theme() -> str:
-    data = _load_data()
-    return data.get("theme", {}).get("value", "")
+    return _load_value("theme")
 
 
 def save_theme_name(name: str) -> None:
-    data = _load_data()
-    data["theme_name"] = {"value": name}
-    _save_data(data)
+    _save_section("theme_name", name)
 
 
 def load_theme_name() -> str:
-    data = _load_data()
-    return data.get("theme_name", {}).get("value", "")
+    return _load_value("theme_name")
 
 
 def save_skill_kernels(kernels: str) -> None:
@@ -181,18 +506,14 @@ def save_skill_kernels(kernels: str) -> None:
         parsed = json.loads(kernels)
     except Exception:
         parsed = kernels
-    data = _load_data()
-    data["skill_kernels"] = {"value": json.dumps(parsed)}
-    _save_data(data)
+    _save_section("skill_kernels", json.dumps(parsed))
 
 
 def load_skill_kernels():
-    data = _load_data()
-    raw = data.get("skill_kernels", {}).get("value", "")
     try:
-        return json.loads(raw)
-    except Exception:
-        return raw
+        return _load_json("skill_kernels")
+    except ValueError:
+        return _load_value("skill_kernels")
 
 
 # Adding new kernel mapping functions
@@ -204,18 +525,14 @@ def save_kernel_mappings(mappings: str) -> None:
         parsed = json.loads(mappings)
     except Exception:
         parsed = mappings
-    data = _load_data()
-    data["kernel_mappings"] = {"value": json.dumps(parsed)}
-    _save_data(data)
+    _save_section("kernel_mappings", json.dumps(parsed))
 
 
 def load_kernel_mappings():
-    data = _load_data()
-    raw = data.get("kernel_mappings", {}).get("value", "")
     try:
-        return json.loads(raw)
-    except Exception:
-        return raw
+        return _load_json("kernel_mappings")
+    except ValueError:
+        return _load_value("kernel_mappings")
 
 
 def save_kernel_benefits(benefits: str) -> None:
@@ -224,18 +541,14 @@ def save_kernel_benefits(benefits: str) -> None:
         parsed = json.loads(benefits)
     except Exception:
         parsed = benefits
-    data = _load_data()
-    data["kernel_benefits"] = {"value": json.dumps(parsed)}
-    _save_data(data)
+    _save_section("kernel_benefits", json.dumps(parsed))
 
 
 def load_kernel_benefits():
-    data = _load_data()
-    raw = data.get("kernel_benefits", {}).get("value", "")
     try:
-        return json.loads(raw)
-    except Exception:
-        return raw
+        return _load_json("kernel_benefits")
+    except ValueError:
+        return _load_value("kernel_benefits")
 
 
 def save_kernel_benefit_mappings(mappings: str) -> None:
@@ -244,18 +557,14 @@ def save_kernel_benefit_mappings(mappings: str) -> None:
         parsed = json.loads(mappings)
     except Exception:
         parsed = mappings
-    data = _load_data()
-    data["kernel_benefit_mappings"] = {"value": json.dumps(parsed)}
-    _save_data(data)
+    _save_section("kernel_benefit_mappings", json.dumps(parsed))
 
 
 def load_kernel_benefit_mappings():
-    data = _load_data()
-    raw = data.get("kernel_benefit_mappings", {}).get("value", "")
     try:
-        return json.loads(raw)
-    except Exception:
-        return raw
+        return _load_json("kernel_benefit_mappings")
+    except ValueError:
+        return _load_value("kernel_benefit_mappings")
 
 
 def save_kernel_analogies(analogies) -> None:
@@ -264,18 +573,14 @@ def save_kernel_analogies(analogies) -> None:
         parsed = json.loads(analogies)
     except Exception:
         parsed = analogies
-    data = _load_data()
-    data["kernel_analogies"] = {"value": json.dumps(parsed)}
-    _save_data(data)
+    _save_section("kernel_analogies", json.dumps(parsed))
 
 
 def load_kernel_analogies():
-    data = _load_data()
-    raw = data.get("kernel_analogies", {}).get("value", "{}")
     try:
-        return json.loads(raw)
-    except Exception:
-        return raw
+        return _load_json("kernel_analogies", "{}")
+    except ValueError:
+        return _load_value("kernel_analogies", "{}")
 
 
 # Functions for saving the kernel-theme mapping produced in Step 3B
@@ -285,18 +590,14 @@ def save_kernel_theme_mapping(info: str) -> None:
         parsed = json.loads(info)
     except Exception:
         parsed = info
-    data = _load_data()
-    data["kernel_theme_mapping"] = {"value": json.dumps(parsed)}
-    _save_data(data)
+    _save_section("kernel_theme_mapping", json.dumps(parsed))
 
 
 def load_kernel_theme_mapping():
-    data = _load_data()
-    raw = data.get("kernel_theme_mapping", {}).get("value", "")
     try:
-        return json.loads(raw)
-    except Exception:
-        return raw
+        return _load_json("kernel_theme_mapping")
+    except ValueError:
+        return _load_value("kernel_theme_mapping")
 
 
 # ---------------------------------------------------------------------------
@@ -349,20 +650,16 @@ def save_emotional_arc(
 
     parsed_feelings = _parse_feelings(feelings)
 
-    data = _load_data()
     payload = {"vignette": vignette, "feelings": parsed_feelings}
     if parsed_cohesion is not None:
         payload["cohesion"] = parsed_cohesion
-    data["emotional_arc"] = {"value": json.dumps(payload)}
-    _save_data(data)
+    _save_section("emotional_arc", json.dumps(payload))
 
 
 def load_emotional_arc():
-    data = _load_data()
-    raw = data.get("emotional_arc", {}).get("value", "")
     try:
-        return json.loads(raw)
-    except Exception:
+        return _load_json("emotional_arc")
+    except ValueError:
         return {}
 
 
@@ -422,18 +719,14 @@ def save_layered_feelings(structure: str) -> None:
     """Save the optional Layer Feelings structure."""
     parsed = _parse_layered_feelings(structure)
 
-    data = _load_data()
-    data["layered_feelings"] = {"value": json.dumps(parsed)}
-    _save_data(data)
+    _save_section("layered_feelings", json.dumps(parsed))
 
 
 def load_layered_feelings():
-    data = _load_data()
-    raw = data.get("layered_feelings", {}).get("value", "")
     try:
-        return json.loads(raw)
-    except Exception:
-        return raw
+        return _load_json("layered_feelings")
+    except ValueError:
+        return _load_value("layered_feelings")
 
 
 # ---------------------------------------------------------------------------
@@ -443,18 +736,14 @@ def save_base_mechanics_tree(structure: str) -> None:
     """Save the Base Mechanics Tree structure."""
     parsed = _parse_layered_feelings(structure)
 
-    data = _load_data()
-    data["base_mechanics_tree"] = {"value": json.dumps(parsed)}
-    _save_data(data)
+    _save_section("base_mechanics_tree", json.dumps(parsed))
 
 
 def load_base_mechanics_tree():
-    data = _load_data()
-    raw = data.get("base_mechanics_tree", {}).get("value", "")
     try:
-        return json.loads(raw)
-    except Exception:
-        return raw
+        return _load_json("base_mechanics_tree")
+    except ValueError:
+        return _load_value("base_mechanics_tree")
 
 
 def flatten_mechanics(tree: dict) -> list:
@@ -513,18 +802,14 @@ def mechanic_mappings_to_text(mapping: dict) -> str:
 
 def save_mechanic_mappings(mappings: str) -> None:
     parsed = _parse_mechanic_mappings(mappings)
-    data = _load_data()
-    data["mechanic_mappings"] = {"value": json.dumps(parsed)}
-    _save_data(data)
+    _save_section("mechanic_mappings", json.dumps(parsed))
 
 
 def load_mechanic_mappings():
-    data = _load_data()
-    raw = data.get("mechanic_mappings", {}).get("value", "")
     try:
-        return json.loads(raw)
-    except Exception:
-        return raw
+        return _load_json("mechanic_mappings")
+    except ValueError:
+        return _load_value("mechanic_mappings")
 
 
 def build_base_mechanics_tree(layered_feelings: dict, mapping: dict) -> dict:
@@ -591,18 +876,14 @@ def schemas_to_text(schemas: list) -> str:
 
 def save_list_of_schemas(schemas: str) -> None:
     parsed = _parse_schemas(schemas)
-    data = _load_data()
-    data["list_of_schemas"] = {"value": json.dumps(parsed)}
-    _save_data(data)
+    _save_section("list_of_schemas", json.dumps(parsed))
 
 
 def load_list_of_schemas():
-    data = _load_data()
-    raw = data.get("list_of_schemas", {}).get("value", "")
     try:
-        return json.loads(raw)
-    except Exception:
-        return raw
+        return _load_json("list_of_schemas")
+    except ValueError:
+        return _load_value("list_of_schemas")
 
 
 # ---------------------------------------------------------------------------
@@ -610,18 +891,14 @@ def load_list_of_schemas():
 
 def save_step7_queue(queue: list) -> None:
     """Persist the remaining Step 7 queue to the gdsf file."""
-    data = _load_data()
-    data["step7_queue"] = {"value": json.dumps(queue)}
-    _save_data(data)
+    _save_section("step7_queue", json.dumps(queue))
 
 
 def load_step7_queue() -> list:
     """Load the saved Step 7 queue if present."""
-    data = _load_data()
-    raw = data.get("step7_queue", {}).get("value", "")
     try:
-        return json.loads(raw)
-    except Exception:
+        return _load_json("step7_queue")
+    except ValueError:
         return []
 
 # ---------------------------------------------------------------------------
@@ -696,18 +973,14 @@ def save_sit(table: str | dict) -> None:
         parsed = table
     else:
         parsed = _parse_sit(table)
-    data = _load_data()
-    data["sit_table"] = {"value": json.dumps(parsed)}
-    _save_data(data)
+    _save_section("sit_table", json.dumps(parsed))
 
 
 def load_sit():
-    data = _load_data()
-    raw = data.get("sit_table", {}).get("value", "")
     try:
-        return json.loads(raw)
-    except Exception:
-        return raw
+        return _load_json("sit_table")
+    except ValueError:
+        return _load_value("sit_table")
 
 
 # ---------------------------------------------------------------------------
@@ -725,48 +998,130 @@ def save_tit(table: str | dict) -> None:
         except Exception:
             parsed = {}
 
-    data = _load_data()
-    data["tit_table"] = {"value": json.dumps(parsed)}
-    _save_data(data)
+    _save_section("tit_table", json.dumps(parsed))
 
 
 def load_tit():
     """Load the stored Triadic Integration Table."""
 
-    data = _load_data()
-    raw = data.get("tit_table", {}).get("value", "")
     try:
-        return json.loads(raw)
-    except Exception:
-        return raw
-
-
-def _find_subtree(tree: dict, target: str):
-    """Return the subtree rooted at ``target`` if present."""
+        return _load_json("tit_table")
+    except ValueError:
+        return _load_value("tit_table")
 
-    if not isinstance(tree, dict):
-        return None
-    if target in tree:
-        return tree[target]
-    for _, val in tree.items():
-        if isinstance(val, dict):
-            found = _find_subtree(val, target)
-            if found is not None:
-                return found
-    return None
 
+def load_tit_cells(emotion: str | None = None, skill: str | None = None) -> list[dict]:
+    """Return the TIT-K cells, optionally only those of ``emotion``/``skill``.
 
-def _collect_nodes(node: dict) -> list[str]:
-    """Collect all node names from a nested mapping."""
+    Each cell is a dict with ``emotion``, ``skill``, ``kernel``, ``column``
+    and ``value`` keys. The SQLite backend answers from an index without
+    decoding the whole table.
+    """
+    filters = {"emotion": emotion, "skill": skill}
+    filters = {k: v for k, v in filters.items() if v is not None}
+    pending = _pending_updates()
+    if "tit_table" in pending:
+        levels = INDEXED_SECTIONS["tit_table"]
+        return filter_cells(pending["tit_table"].get("value"), levels, filters)
+    return _store(_data_file()).cells("tit_table", **filters)
+
+
+class CompiledTree:
+    """Read-only index over a nested ``{name: subtree}`` tree such as the BMT.
+
+    Built in one pass: ``subtree()`` then answers in constant time with the
+    first match of a depth-first search that checks a node's own keys before
+    descending into its children in order. ``parent()`` returns the parent
+    of a name's first occurrence (``None`` at the root) and
+    ``descendants()`` the pre-ordered names below its subtree.
+    """
 
-    result: list[str] = []
-    if not isinstance(node, dict):
-        return result
-    for key, val in node.items():
-        result.append(key)
-        if isinstance(val, dict):
-            result.extend(_collect_nodes(val))
-    return result
+    def __init__(self, tree):
+        self._tree = tree  # Keeps the ids used by ``_descendants`` valid.
+        self._descendants: dict[int, tuple[str, ...]] = {}
+        self._resolved: dict[tuple, tuple[str, ...]] = {}
+        found = self._compile(tree, None) if isinstance(tree, dict) else {}
+        self._subtrees = {name: subtree for name, (subtree, _) in found.items()}
+        self._parents = {name: parent for name, (_, parent) in found.items()}
+
+    def _compile(self, node: dict, parent: str | None) -> dict:
+        """Index ``node``; map every name below it to ``(subtree, parent)``."""
+        found: dict = {}
+        names: list[str] = []
+        for key, val in node.items():
+            names.append(key)
+            if isinstance(val, dict):
+                for name, match in self._compile(val, key).items():
+                    # A ``None`` match does not stop the search in later
+                    # siblings, but a direct key of ``node`` always wins.
+                    if match[0] is not None:
+                        found.setdefault(name, match)
+                names.extend(self._descendants[id(val)])
+        found.update((key, (val, parent)) for key, val in node.items())
+        self._descendants[id(node)] = tuple(names)
+        return found
+
+    def __contains__(self, name) -> bool:
+        return name in self._subtrees
+
+    def subtree(self, name):
+        """Return the value stored under the first node called ``name``."""
+        return self._subtrees.get(name)
+
+    def parent(self, name) -> str | None:
+        return self._parents.get(name)
+
+    def descendants(self, name) -> list[str]:
+        """Return every name below ``name`` in pre-order (empty for leaves)."""
+        subtree = self._subtrees.get(name)
+        if not isinstance(subtree, dict):
+            return []
+        return list(self._descendants[id(subtree)])
+
+    def expand(self, names) -> list[str]:
+        """Return ``names`` with their descendants, without duplicates.
+
+        Results are memoized per sequence of names.
+        """
+        key = tuple(names)
+        resolved = self._resolved.get(key)
+        if resolved is None:
+            ordered: dict = {}
+            for name in key:
+                ordered[name] = None
+                subtree = self._subtrees.get(name)
+                if isinstance(subtree, dict):
+                    ordered.update(dict.fromkeys(self._descendants[id(subtree)]))
+            resolved = self._resolved[key] = tuple(ordered)
+        return list(resolved)
+
+
+def compiled_tree(name: str = "base_mechanics_tree") -> CompiledTree:
+    """Return the ``CompiledTree`` of the tree stored in section ``name``.
+
+    Trees are compiled once per stored value of their section, so saving
+    other sections never rebuilds them.
+    """
+    pending = _pending_updates()
+    if name in pending:
+        raw = pending[name].get("value", "")
+    else:
+        _, sections = _cached_sections(_data_file())
+        raw = sections.get(name, {}).get("value", "")
+    key = (_data_file(), name)
+    with _CACHE_LOCK:
+        cached = _TREE_CACHE.get(key)
+    if cached is not None and (cached[0] is raw or cached[0] == raw):
+        return cached[1]
+    try:
+        tree = json.loads(raw)
+    except ValueError:
+        tree = None
+    compiled = CompiledTree(tree)
+    if name not in pending:
+        with _CACHE_LOCK:
+            _TREE_CACHE[key] = (raw, compiled)
+    return compiled
 
 
 def get_schemas_for_emotion(emotion: str) -> list[str]:
@@ -777,21 +1132,4 @@ def get_schemas_for_emotion(emotion: str) -> list[str]:
         mechanics = mappings.get(emotion, [])
     else:
         mechanics = []
-
-    bmt = load_base_mechanics_tree()
-    schemas: list[str] = []
-
-    for mech in mechanics:
-        schemas.append(mech)
-        subtree = _find_subtree(bmt, mech) if isinstance(bmt, dict) else None
-        if isinstance(subtree, dict):
-            schemas.extend(_collect_nodes(subtree))
-
-    # remove duplicates while preserving order
-    seen: set[str] = set()
-    ordered: list[str] = []
-    for item in schemas:
-        if item not in seen:
-            seen.add(item)
-            ordered.append(item)
-    return ordered
+    return compiled_tree("base_mechanics_tree").expand(mechanics)
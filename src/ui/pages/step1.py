@@ -2,6 +2,8 @@ import streamlit as st
 import app_utils
 import ai
 
+app_utils.set_project(st.session_state.get("project_id"))
+
 st.header("Step 1 - Atomic unit")
 st.info(
     "Practical skills that require bodily control (e.g., horse riding or knife handling) "
@@ -49,8 +51,9 @@ if submitted:
         selected_types.append("Procedural")
     if lt_metacognitive:
         selected_types.append("Metacognitive")
-    app_utils.save_learning_types(selected_types)
-    app_utils.save_atomic_unit(atomic_unit_input)
+    with app_utils.transaction():
+        app_utils.save_learning_types(selected_types)
+        app_utils.save_atomic_unit(atomic_unit_input)
 
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -61,8 +64,8 @@ for message in st.session_state.messages:
 prompt = st.chat_input("Generate Ideas")
 if prompt:
     st.session_state.messages.append({"role": "user", "content": prompt})
-    with st.spinner("Generating answer..."):
-        answer = ai.step1(st.session_state.messages)
-    st.session_state.messages.append({"role": "assistant", "content": answer})
     st.chat_message("user").write(prompt)
-    st.chat_message("assistant").write(answer)
+    answer = st.chat_message("assistant").write_stream(
+        ai.step1(st.session_state.messages, stream=True)
+    )
+    st.session_state.messages.append({"role": "assistant", "content": answer})
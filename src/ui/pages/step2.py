@@ -3,6 +3,8 @@ import streamlit as st
 import app_utils
 import ai
 
+app_utils.set_project(st.session_state.get("project_id"))
+
 st.header("Step 2 - Atomic Skills & Kernels")
 
 atomic_unit = app_utils.load_atomic_unit()
@@ -66,12 +68,17 @@ st.text_area(
 )
 
 def generate_kernels():
-    with st.spinner("Generating kernels..."):
+    # Callbacks run before the page code, possibly on a new thread, so the
+    # project chosen at the top of the page is not selected yet.
+    with app_utils.project(st.session_state.get("project_id")), st.spinner(
+        "Generating kernels..."
+    ), ai.bypass_cache(st.session_state.get("kernels_fresh", False)):
         generated = ai.step2_kernels(
             atomic_unit, app_utils.load_atomic_skills()
         )
     st.session_state.kernels_text = generated
 
+st.checkbox("Ignore cached answers", key="kernels_fresh")
 st.button("Generate Kernels", on_click=generate_kernels)
 
 if st.button("Save Kernels"):
@@ -79,6 +86,8 @@ if st.button("Save Kernels"):
 
 st.subheader("Why It Matters")
 
+benefits_revision = app_utils.page_revision(st.session_state, "step2_revision")
+
 skill_kernels = app_utils.load_skill_kernels()
 benefits = app_utils.load_kernel_benefits() or {}
 benefit_mappings = app_utils.load_kernel_benefit_mappings() or []
@@ -155,8 +164,14 @@ if st.button("Save Why It Matters"):
             if override:
                 mapping["copy_override"] = override
             mappings.append(mapping)
-    app_utils.save_kernel_benefits(json.dumps(benefits_dict))
-    app_utils.save_kernel_benefit_mappings(json.dumps(mappings))
+    try:
+        with app_utils.transaction(expected_revision=benefits_revision):
+            app_utils.save_kernel_benefits(json.dumps(benefits_dict))
+            app_utils.save_kernel_benefit_mappings(json.dumps(mappings))
+    except app_utils.ConflictError:
+        st.error(app_utils.CONFLICT_MESSAGE)
+    else:
+        app_utils.record_page_revision(st.session_state, "step2_revision")
 
 
 if "messages" not in st.session_state:
@@ -168,9 +183,9 @@ for message in st.session_state.messages:
 prompt = st.chat_input("Generate Ideas")
 if prompt:
     st.session_state.messages.append({"role": "user", "content": prompt})
-    with st.spinner("Generating answer..."):
-        answer = ai.step2(atomic_unit, st.session_state.messages)
-    st.session_state.messages.append({"role": "assistant", "content": answer})
     st.chat_message("user").write(prompt)
-    st.chat_message("assistant").write(answer)
+    answer = st.chat_message("assistant").write_stream(
+        ai.step2(atomic_unit, st.session_state.messages, stream=True)
+    )
+    st.session_state.messages.append({"role": "assistant", "content": answer})
 
@@ -3,6 +3,8 @@ import streamlit as st
 import app_utils
 import ai
 
+app_utils.set_project(st.session_state.get("project_id"))
+
 atomic_unit = app_utils.load_atomic_unit()
 atomic_skills = app_utils.load_atomic_skills()
 
@@ -27,8 +29,9 @@ with st.form("step3_form"):
     submitted = st.form_submit_button("Save Theme")
 
 if submitted:
-    app_utils.save_theme(theme_input)
-    app_utils.save_theme_name(theme_name_input)
+    with app_utils.transaction():
+        app_utils.save_theme(theme_input)
+        app_utils.save_theme_name(theme_name_input)
 
 # ---------------------------------------------------------------------------
 # Step 3B – Kernel Theme Mapping
@@ -50,36 +53,48 @@ st.text_area(
 
 
 def generate_kernel_theme_mapping():
-    theme_val = app_utils.load_theme()
-    skill_kernels = app_utils.load_skill_kernels()
-    benefits = app_utils.load_kernel_benefits() or {}
-    benefit_maps = app_utils.load_kernel_benefit_mappings() or []
-
-    kernels_list = []
-    if isinstance(skill_kernels, dict):
-        for kern_list in skill_kernels.values():
-            if isinstance(kern_list, list):
-                for kern in kern_list:
-                    kern_benefits = [
-                        m.get("copy_override") or benefits.get(m.get("benefit_id"))
-                        for m in benefit_maps
-                        if m.get("kernel_id") == kern.get("id")
-                        and m.get("benefit_id") in benefits
-                    ]
-                    kernels_list.append(
-                        {
-                            "kernel": kern.get("kernel", ""),
-                            "original_input": kern.get("input", ""),
-                            "original_verb": kern.get("verb", ""),
-                            "original_output": kern.get("output", ""),
-                            "learning_type": kern.get("learning_type", ""),
-                            "benefits": kern_benefits,
-                        }
-                    )
-
-    mapping = ai.step3b_all(theme_val, kernels_list)
-    st.session_state.kernel_theme_text = json.dumps(mapping, indent=2)
-    app_utils.save_kernel_theme_mapping(st.session_state.kernel_theme_text)
+    # Callbacks run before the page code, possibly on a new thread, so the
+    # project chosen at the top of the page is not selected yet.
+    with app_utils.project(st.session_state.get("project_id")):
+        theme_val = app_utils.load_theme()
+        skill_kernels = app_utils.load_skill_kernels()
+        benefits = app_utils.load_kernel_benefits() or {}
+        benefit_maps = app_utils.load_kernel_benefit_mappings() or []
+
+        kernels_list = []
+        if isinstance(skill_kernels, dict):
+            for kern_list in skill_kernels.values():
+                if isinstance(kern_list, list):
+                    for kern in kern_list:
+                        kern_benefits = [
+                            m.get("copy_override") or benefits.get(m.get("benefit_id"))
+                            for m in benefit_maps
+                            if m.get("kernel_id") == kern.get("id")
+                            and m.get("benefit_id") in benefits
+                        ]
+                        kernels_list.append(
+                            {
+                                "kernel": kern.get("kernel", ""),
+                                "original_input": kern.get("input", ""),
+                                "original_verb": kern.get("verb", ""),
+                                "original_output": kern.get("output", ""),
+                                "learning_type": kern.get("learning_type", ""),
+                                "benefits": kern_benefits,
+                            }
+                        )
+
+        mapping = ai.step3b_all(
+            theme_val,
+            kernels_list,
+            max_workers=ai.LLM_CONCURRENCY,
+            timeout=ai.STEP3B_TIMEOUT,
+        )
+        for failure in mapping.pop("errors", []):
+            st.warning(
+                f"Kernel '{failure['kernel'].get('kernel', '')}' was skipped: {failure['error']}"
+            )
+        st.session_state.kernel_theme_text = json.dumps(mapping, indent=2)
+        app_utils.save_kernel_theme_mapping(st.session_state.kernel_theme_text)
 
 
 st.button("Generate Kernel Theme Mapping", on_click=generate_kernel_theme_mapping)
@@ -94,8 +109,8 @@ for message in st.session_state.messages:
 prompt = st.chat_input("Generate Ideas")
 if prompt:
     st.session_state.messages.append({"role": "user", "content": prompt})
-    with st.spinner("Generating answer..."):
-        answer = ai.step3a(atomic_unit, atomic_skills, st.session_state.messages)
-    st.session_state.messages.append({"role": "assistant", "content": answer})
     st.chat_message("user").write(prompt)
-    st.chat_message("assistant").write(answer)
\ No newline at end of file
+    answer = st.chat_message("assistant").write_stream(
+        ai.step3a(atomic_unit, atomic_skills, st.session_state.messages, stream=True)
+    )
+    st.session_state.messages.append({"role": "assistant", "content": answer})
\ No newline at end of file
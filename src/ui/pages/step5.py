@@ -2,6 +2,8 @@ import streamlit as st
 import app_utils
 import ai
 
+app_utils.set_project(st.session_state.get("project_id"))
+
 st.header("Step 5 - Layer Feelings (LF) Process")
 
 emotional_arc = app_utils.load_emotional_arc()
@@ -33,8 +35,8 @@ for message in st.session_state.messages:
 prompt = st.chat_input("Generate Ideas")
 if prompt:
     st.session_state.messages.append({"role": "user", "content": prompt})
-    with st.spinner("Generating answer..."):
-        answer = ai.step5(feelings, st.session_state.messages)
-    st.session_state.messages.append({"role": "assistant", "content": answer})
     st.chat_message("user").write(prompt)
-    st.chat_message("assistant").write(answer)
+    answer = st.chat_message("assistant").write_stream(
+        ai.step5(feelings, st.session_state.messages, stream=True)
+    )
+    st.session_state.messages.append({"role": "assistant", "content": answer})
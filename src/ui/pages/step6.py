@@ -2,8 +2,12 @@ import streamlit as st
 import app_utils
 import ai
 
+app_utils.set_project(st.session_state.get("project_id"))
+
 st.header("Step 6 - Form a Game (FAG)")
 
+mapping_revision = app_utils.page_revision(st.session_state, "step6_revision")
+
 atomic_unit = app_utils.load_atomic_unit()
 atomic_skills = app_utils.load_atomic_skills()
 theme_blurb = app_utils.load_theme()
@@ -45,14 +49,21 @@ with st.form("step6_form"):
     submitted = st.form_submit_button("Save Mapping")
 
 if submitted:
-    app_utils.save_mechanic_mappings(mechanics_input)
-    lf = layer if isinstance(layer, dict) else app_utils._parse_layered_feelings(layer_text)
-    mapping_dict = app_utils.load_mechanic_mappings()
-    if isinstance(mapping_dict, str):
-        mapping_dict = app_utils._parse_mechanic_mappings(mapping_dict)
-    bmt_dict = app_utils.build_base_mechanics_tree(lf, mapping_dict)
-    bmt_text = app_utils.layered_feelings_to_text(bmt_dict)
-    app_utils.save_base_mechanics_tree(bmt_text)
+    try:
+        with app_utils.transaction(expected_revision=mapping_revision):
+            app_utils.save_mechanic_mappings(mechanics_input)
+            lf = layer if isinstance(layer, dict) else app_utils._parse_layered_feelings(layer_text)
+            mapping_dict = app_utils.load_mechanic_mappings()
+            if isinstance(mapping_dict, str):
+                mapping_dict = app_utils._parse_mechanic_mappings(mapping_dict)
+            bmt_dict = app_utils.build_base_mechanics_tree(lf, mapping_dict)
+            new_bmt_text = app_utils.layered_feelings_to_text(bmt_dict)
+            app_utils.save_base_mechanics_tree(new_bmt_text)
+    except app_utils.ConflictError:
+        st.error(app_utils.CONFLICT_MESSAGE)
+    else:
+        bmt_text = new_bmt_text
+        app_utils.record_page_revision(st.session_state, "step6_revision")
 
 st.subheader("Base Mechanics Tree")
 st.text_area("Auto-generated BMT", bmt_text, height=160, disabled=True)
@@ -66,15 +77,16 @@ for message in st.session_state.messages:
 prompt = st.chat_input("Generate Ideas")
 if prompt:
     st.session_state.messages.append({"role": "user", "content": prompt})
-    with st.spinner("Generating answer..."):
-        answer = ai.step6_mechanic_ideas(
+    st.chat_message("user").write(prompt)
+    answer = st.chat_message("assistant").write_stream(
+        ai.step6_mechanic_ideas(
             layer_text,
             medium,
             atomic_unit,
             atomic_skills,
             theme_blurb,
             st.session_state.messages,
+            stream=True,
         )
+    )
     st.session_state.messages.append({"role": "assistant", "content": answer})
-    st.chat_message("user").write(prompt)
-    st.chat_message("assistant").write(answer)
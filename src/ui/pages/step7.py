@@ -2,6 +2,8 @@ import streamlit as st
 import app_utils
 import ai
 
+app_utils.set_project(st.session_state.get("project_id"))
+
 
 def _rerun():
     """Trigger a Streamlit rerun compatible across versions."""
@@ -179,29 +181,41 @@ if st.session_state.rec_queue or st.session_state.stage:
             _rerun()
 
     elif st.session_state.stage == "theme":
+        schemas_revision = app_utils.page_revision(st.session_state, "step7_revision")
         with st.form("theme_form"):
             prop = st.text_area("Thematic function", key="theme_input")
             save = st.form_submit_button("Save Element")
         if save:
-            st.session_state.schemas.append({"name": mech, "property": prop})
-            app_utils.save_list_of_schemas(
-                app_utils.schemas_to_text(st.session_state.schemas)
-            )
-            _save_queue()
-            st.session_state.current = None
-            st.session_state.parent = ""
-            st.session_state.stage = None
-            st.session_state.messages = []
-            _rerun()
+            schemas = st.session_state.schemas + [{"name": mech, "property": prop}]
+            try:
+                with app_utils.transaction(expected_revision=schemas_revision):
+                    app_utils.save_list_of_schemas(app_utils.schemas_to_text(schemas))
+                    _save_queue()
+            except app_utils.ConflictError:
+                st.error(app_utils.CONFLICT_MESSAGE)
+            else:
+                st.session_state.schemas = schemas
+                st.session_state.current = None
+                st.session_state.parent = ""
+                st.session_state.stage = None
+                st.session_state.messages = []
+                _rerun()
 
 else:
     st.success("All mechanics processed.")
     schemas_display = app_utils.schemas_to_text(st.session_state.schemas)
     st.text_area("Resulting List of Schemas", schemas_display, height=160)
+    schemas_revision = app_utils.page_revision(st.session_state, "step7_revision")
     if st.button("Save Result"):
-        app_utils.save_list_of_schemas(schemas_display)
-        app_utils.save_step7_queue([])
-        st.success("Schemas saved.")
+        try:
+            with app_utils.transaction(expected_revision=schemas_revision):
+                app_utils.save_list_of_schemas(schemas_display)
+                app_utils.save_step7_queue([])
+        except app_utils.ConflictError:
+            st.error(app_utils.CONFLICT_MESSAGE)
+        else:
+            app_utils.record_page_revision(st.session_state, "step7_revision")
+            st.success("Schemas saved.")
 
 # ---------------------------------------------------------------------------
 # Chat assistant
@@ -214,27 +228,28 @@ for message in st.session_state.messages:
 prompt = st.chat_input("Generate Ideas")
 if prompt:
     st.session_state.messages.append({"role": "user", "content": prompt})
-    with st.spinner("Generating answer..."):
-        if st.session_state.get("stage") == "theme":
-            parent = st.session_state.get("parent", "")
-            element = st.session_state.get("current", "")
-            answer = ai.step7_theme_fit(
-                vignette,
-                kernel_mappings,
-                parent,
-                element,
-                st.session_state.messages,
-            )
-        else:
-            mech = st.session_state.get("current", "") or bmt_text
-            answer = ai.step7_mvp_ideas(
-                mech,
-                medium,
-                atomic_unit,
-                atomic_skills,
-                theme_blurb,
-                st.session_state.messages,
-            )
-    st.session_state.messages.append({"role": "assistant", "content": answer})
     st.chat_message("user").write(prompt)
-    st.chat_message("assistant").write(answer)
+    if st.session_state.get("stage") == "theme":
+        parent = st.session_state.get("parent", "")
+        element = st.session_state.get("current", "")
+        chunks = ai.step7_theme_fit(
+            vignette,
+            kernel_mappings,
+            parent,
+            element,
+            st.session_state.messages,
+            stream=True,
+        )
+    else:
+        mech = st.session_state.get("current", "") or bmt_text
+        chunks = ai.step7_mvp_ideas(
+            mech,
+            medium,
+            atomic_unit,
+            atomic_skills,
+            theme_blurb,
+            st.session_state.messages,
+            stream=True,
+        )
+    answer = st.chat_message("assistant").write_stream(chunks)
+    st.session_state.messages.append({"role": "assistant", "content": answer})
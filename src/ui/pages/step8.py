@@ -3,6 +3,8 @@ import pandas as pd
 import app_utils
 import ai
 
+app_utils.set_project(st.session_state.get("project_id"))
+
 st.header("Step 8 - Scaling Influence Table (SIT)")
 
 # Load atomic-unit skills
@@ -93,8 +95,8 @@ for message in st.session_state.messages:
 prompt = st.chat_input("Generate Ideas")
 if prompt:
     st.session_state.messages.append({"role": "user", "content": prompt})
-    with st.spinner("Generating answer..."):
-        answer = ai.step8_sit_ideas(skills, emotions, st.session_state.messages)
-    st.session_state.messages.append({"role": "assistant", "content": answer})
     st.chat_message("user").write(prompt)
-    st.chat_message("assistant").write(answer)
+    answer = st.chat_message("assistant").write_stream(
+        ai.step8_sit_ideas(skills, emotions, st.session_state.messages, stream=True)
+    )
+    st.session_state.messages.append({"role": "assistant", "content": answer})
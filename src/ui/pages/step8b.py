@@ -3,6 +3,8 @@ import pandas as pd
 import app_utils
 import ai
 
+app_utils.set_project(st.session_state.get("project_id"))
+
 st.header("Step 8B - Triadic Integration Table – Kernel (TIT-K)")
 
 # Load SIT to find skill-emotion '+' pairs
@@ -63,14 +65,17 @@ if (
 
 
 def generate_suggestions():
-    with st.spinner("Generating suggestions..."):
-        for label, kernel_text in kernel_map.items():
+    with st.spinner("Generating suggestions..."), ai.bypass_cache(
+        st.session_state.get("tit_fresh", False)
+    ):
+        matrix = ai.step8b_matrix(list(kernel_map.values()), mechanics, emotion)
+        for label, suggestions in zip(kernel_map, matrix):
             mask = st.session_state.tit_df["Kernel"] == label
-            for mech in mechanics:
-                suggestion = ai.step8b_cell(kernel_text, mech, emotion)
+            for mech, suggestion in zip(mechanics, suggestions):
                 st.session_state.tit_df.loc[mask, mech] = suggestion
 
 
+st.checkbox("Ignore cached answers", key="tit_fresh")
 st.button("Evaluate Pairings", on_click=generate_suggestions)
 
 with st.form("tit_form"):
@@ -89,8 +94,17 @@ if submitted:
         label = row.get("Kernel")
         result[label] = {mech: row.get(mech, "") for mech in mechanics}
         result[label]["Result"] = row.get("Result", "")
-    existing_tit.setdefault(emotion, {})[skill] = result
-    app_utils.save_tit(existing_tit)
+    def _store_result():
+        # Re-read inside the transaction so rows saved meanwhile by other
+        # sessions for other emotions or skills are kept.
+        tit = app_utils.load_tit()
+        if not isinstance(tit, dict):
+            tit = {}
+        tit.setdefault(emotion, {})[skill] = result
+        app_utils.save_tit(tit)
+        return tit
+
+    existing_tit = app_utils.retry_on_conflict(_store_result)
     st.session_state.tit_df = edited
     st.success("TIT-K saved.")
 
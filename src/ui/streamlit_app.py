@@ -1,3 +1,5 @@
+import time
+import pandas as pd
 import streamlit as st
 import app_utils
 import ai
@@ -6,15 +8,102 @@ st.set_page_config(page_title="VIOLETA Wizard", layout="wide")
 st.title("🎮 VIOLETA Framework Wizard")
 st.sidebar.success("Select a step above.")
 
+# Each session works on its own project; "?project=<id>" links straight to one.
+if "project_id" not in st.session_state:
+    requested = st.query_params.get("project") or None
+    try:
+        app_utils.project_file(requested)
+    except ValueError:
+        requested = None
+    st.session_state.project_id = requested
+projects = [None, *app_utils.list_projects()]
+if st.session_state.project_id not in projects:
+    projects.append(st.session_state.project_id)
+selected = st.sidebar.selectbox(
+    "Project",
+    projects,
+    index=projects.index(st.session_state.project_id),
+    format_func=lambda project_id: project_id or "Shared (default)",
+)
+new_project = st.sidebar.text_input("New project ID")
+if st.sidebar.button("Create project") and new_project:
+    try:
+        app_utils.project_file(new_project)
+    except ValueError as exc:
+        st.sidebar.error(str(exc))
+    else:
+        selected = new_project
+if selected != st.session_state.project_id:
+    st.session_state.project_id = selected
+    st.query_params.clear()
+    if selected:
+        st.query_params["project"] = selected
+    st.rerun()
+app_utils.set_project(st.session_state.project_id)
+
+undo_col, redo_col = st.sidebar.columns(2)
+if undo_col.button("Undo", disabled=not app_utils.can_undo(), use_container_width=True):
+    app_utils.undo()
+    st.rerun()
+if redo_col.button("Redo", disabled=not app_utils.can_redo(), use_container_width=True):
+    app_utils.redo()
+    st.rerun()
+
+with st.sidebar.expander("Change history"):
+    entries = [e for e in app_utils.change_history() if e["op"] != "checkpoint"][::-1]
+    if not entries:
+        st.caption("No saved changes yet.")
+    else:
+        entry = st.selectbox(
+            "Restore the project as it was after",
+            entries,
+            format_func=lambda e: (
+                f"#{e['seq']} {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(e['ts']))} "
+                f"{e['op']}: {', '.join(e['sections']) or '-'}"
+            ),
+        )
+        if st.button("Restore"):
+            app_utils.restore(entry["seq"])
+            st.rerun()
+
+if st.sidebar.button("Reload model settings", help="Re-read .env and reconnect to the model."):
+    ai.reload_llm_clients()
+
+fresh = st.sidebar.checkbox("Ignore cached answers")
 if st.sidebar.button(
     "Generate Game Description",
     disabled=not app_utils.all_steps_completed(),
 ):
     info = app_utils.load_all_sections()
-    with st.spinner("Generating description..."):
+    with st.spinner("Generating description..."), ai.bypass_cache(fresh):
         description = ai.generate_game_description(info)
     st.session_state["game_description"] = description
 
 if "game_description" in st.session_state:
     st.subheader("Game Description")
     st.write(st.session_state["game_description"])
+
+with st.expander("LLM call metrics"):
+    records = ai.call_log()
+    if not records:
+        st.caption("No model calls recorded in this process yet.")
+    else:
+        calls = len(records)
+        hits = sum(record["cache_hit"] for record in records)
+        cols = st.columns(4)
+        cols[0].metric("Calls", calls)
+        cols[1].metric("Cache hit rate", f"{hits / calls:.0%}")
+        cols[2].metric(
+            "Avg wall time", f"{sum(r['wall_ms'] for r in records) / calls:,.0f} ms"
+        )
+        cols[3].metric(
+            "Tokens in / out",
+            f"{sum(r['prompt_tokens'] for r in records):,} / "
+            f"{sum(r['completion_tokens'] for r in records):,}",
+        )
+        st.dataframe(pd.DataFrame.from_dict(ai.summarize_calls(records), orient="index"))
+        if ai.LLM_TRACE_PATH is not None:
+            st.caption(f"Every call is also appended to {ai.LLM_TRACE_PATH}.")
+        if st.button("Clear metrics"):
+            ai.clear_call_log()
+            st.rerun()
@@ -0,0 +1,5 @@
+import os
+
+# Keep test runs from writing the LLM trace and response cache into src/ui/data.
+os.environ.setdefault("VIOLETA_LLM_TRACE", "0")
+os.environ.setdefault("VIOLETA_LLM_CACHE", "0")
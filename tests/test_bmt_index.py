@@ -0,0 +1,99 @@
+import json
+import random
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+import ui.app_utils as app_utils  # noqa: E402
+from ui.app_utils import CompiledTree  # noqa: E402
+
+
+def _find_subtree(tree, target):
+    # The recursive search ``get_schemas_for_emotion`` used before.
+    if not isinstance(tree, dict):
+        return None
+    if target in tree:
+        return tree[target]
+    for val in tree.values():
+        if isinstance(val, dict):
+            found = _find_subtree(val, target)
+            if found is not None:
+                return found
+    return None
+
+
+def _collect_nodes(node):
+    result = []
+    for key, val in node.items():
+        result.append(key)
+        if isinstance(val, dict):
+            result.extend(_collect_nodes(val))
+    return result
+
+
+def _expand(tree, mechanics):
+    result = []
+    for mech in mechanics:
+        result.append(mech)
+        subtree = _find_subtree(tree, mech)
+        if isinstance(subtree, dict):
+            result.extend(_collect_nodes(subtree))
+    return list(dict.fromkeys(result))
+
+
+def _random_tree(rng, names, depth):
+    tree = {}
+    for _ in range(rng.randint(0, 4)):
+        roll = rng.random()
+        if depth and roll < 0.5:
+            val = _random_tree(rng, names, depth - 1)
+        else:
+            val = rng.choice([None, "", [], "leaf"])
+        tree[rng.choice(names)] = val
+    return tree
+
+
+def test_matches_the_recursive_search():
+    rng = random.Random(7)
+    names = [f"m{i}" for i in range(8)]  # Few names, so many repeat.
+    for _ in range(300):
+        tree = _random_tree(rng, names, 4)
+        compiled = CompiledTree(tree)
+        for name in names:
+            assert compiled.subtree(name) == _find_subtree(tree, name)
+        mechanics = rng.sample(names, rng.randint(0, 4))
+        assert compiled.expand(mechanics) == _expand(tree, mechanics)
+
+
+def test_parents_and_descendants():
+    tree = {"Play": {"Explore": {"Map": {}}, "Fight": None}, "Rest": {"Map": {"Pin": {}}}}
+    compiled = CompiledTree(tree)
+    assert compiled.parent("Play") is None
+    assert compiled.parent("Explore") == "Play"
+    assert compiled.parent("Map") == "Explore"
+    assert compiled.descendants("Play") == ["Explore", "Map", "Fight"]
+    assert compiled.descendants("Fight") == []
+    assert "Pin" in compiled and "Missing" not in compiled
+    assert CompiledTree("not a tree").expand(["Play"]) == ["Play"]
+
+
+def test_compiled_once_per_tree_value(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_utils, "DATA_PATH", tmp_path)
+    monkeypatch.setattr(app_utils, "GDSF_FILE", tmp_path / "info.gdsf")
+    app_utils.invalidate_cache()
+
+    app_utils.save_base_mechanics_tree(json.dumps({"Play": {"Explore": {}, "Fight": {}}}))
+    app_utils.save_mechanic_mappings(json.dumps({"Joy": ["Play"]}))
+    compiled = app_utils.compiled_tree()
+    assert app_utils.get_schemas_for_emotion("Joy") == ["Play", "Explore", "Fight"]
+
+    app_utils.save_theme("Sea")
+    assert app_utils.compiled_tree() is compiled
+
+    with app_utils.transaction():
+        app_utils.save_base_mechanics_tree(json.dumps({"Play": {"Hide": {}}}))
+        assert app_utils.get_schemas_for_emotion("Joy") == ["Play", "Hide"]
+    assert app_utils.compiled_tree() is not compiled
+    assert app_utils.get_schemas_for_emotion("Joy") == ["Play", "Hide"]
+    assert json.loads(app_utils._load_value("base_mechanics_tree")) == {"Play": {"Hide": {}}}
+    app_utils.invalidate_cache()
@@ -0,0 +1,49 @@
+import json
+from pathlib import Path
+import sys
+import types
+
+# Provide dummy modules for optional dependencies
+sys.modules.setdefault("dotenv", types.SimpleNamespace(load_dotenv=lambda **kwargs: None))
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+import ui.ai as ai  # noqa: E402
+
+
+def _use_fake(monkeypatch):
+    monkeypatch.setenv("VIOLETA_LLM_PROVIDER", "fake")
+    monkeypatch.setattr(ai, "_LLM_CLIENTS", {})
+    monkeypatch.setattr(ai, "LLM_CACHE_ENABLED", False)
+
+
+def test_fake_provider_answers_every_step_with_valid_output(monkeypatch):
+    _use_fake(monkeypatch)
+    assert isinstance(ai.get_llm(), ai.FakeChatModel)
+
+    kernels = json.loads(ai.step2_kernels("Unit", {"Declarative": ["Fact"], "Procedural": ["Act"]}))
+    assert [k["id"] for ks in kernels.values() for k in ks] == ["k1", "k2"]
+    assert set(kernels["Fact"][0]) >= {"kernel", "input", "verb", "output"}
+
+    assert len(ai.step2_why_it_matters("Unit", kernels["Fact"][0])) == 2
+
+    mapping = ai.step3b_all("Space", [{"kernel": "a", "benefits": ["b"]}, {"kernel": "c"}])
+    assert [k["kernel"] for k in mapping["kernels"]] == ["a", "c"]
+    assert mapping["kernels"][0]["benefit_mapping"][0]["benefit"] == "b"
+
+    matrix = ai.step8b_matrix(["k a", "k b"], ["Race", "Trade"], "Joy")
+    assert matrix[1][1] == "Accepted – K2 fits M2."
+    assert ai.step8b_cell("k", "m", "Joy").startswith("Accepted")
+
+    reply = "".join(ai.step1([{"role": "user", "content": "hi"}], stream=True))
+    assert "<think>" not in reply and reply.endswith("hi")
+
+
+def test_fake_latency_is_deterministic_per_request():
+    messages = [ai.HumanMessage(content="hi")]
+    other = [ai.HumanMessage(content="bye")]
+    for distribution in ("uniform", "normal", "lognormal", "exponential"):
+        model = ai.FakeChatModel(latency=0.5, jitter=0.2, distribution=distribution, seed=7)
+        first = model.sample_latency(messages)
+        assert first == model.sample_latency(messages) >= 0
+        assert first != model.sample_latency(other)
+    assert ai.FakeChatModel(latency=0.3).sample_latency(messages) == 0.3
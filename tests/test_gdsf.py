@@ -1,9 +1,13 @@
+import io
 import tempfile
 from pathlib import Path
 import sys
 
+import pytest
+
 sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
-from gdsf import GDSFParser
+from gdsf import GDSFParser, iter_records
+from gdsf.mapped import MappedGDSFReader
 
 def test_schema_without_property():
     content = """[schema]
@@ -28,3 +32,124 @@ def test_multiline_values_with_blank_lines():
         parser = GDSFParser(path)
         assert parser.get_section("theme") == {"value": "Line1\n\nLine3"}
 
+
+
+def test_iter_records_yields_blocks_with_header_lines():
+    content = (
+        "# comment\n"
+        "[schema]\n"
+        "id = S1\n"
+        "name = \"Play\"\n"
+        "\n"
+        "[edge]\n"
+        "from = C1\n"
+        "to = S1\n"
+        "[theme]\n"
+        "value = \"a\nb\"\n"
+    )
+    records = list(iter_records(io.StringIO(content)))
+    assert records == [
+        ("schema", {"id": "S1", "name": "Play"}, 2),
+        ("edge", {"from": "C1", "to": "S1"}, 6),
+        ("theme", {"value": "a\nb"}, 9),
+    ]
+
+
+def test_lazy_parser_reads_on_demand():
+    content = "[theme]\nvalue = \"Old\"\n[schema]\nid = S1\nname = \"Play\"\n[theme]\nvalue = \"New\"\n"
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "test.gdsf"
+        path.write_text(content)
+        parser = GDSFParser(path, lazy=True)
+        assert "schemas" not in parser.__dict__
+        assert parser.get_section("theme") == {"value": "New"}
+        assert "schemas" not in parser.__dict__
+        assert [s["id"] for s in parser.schemas] == ["S1"]
+        assert parser.sections == {"theme": {"value": "New"}}
+
+
+def test_schema_and_edge_indexes():
+    path = Path(__file__).resolve().parents[1] / "src" / "gdsf" / "example.gdsf"
+    parser = GDSFParser(path)
+
+    assert parser.get_schema("C2")["name"] == "Daily Board"
+    assert parser.get_schema("missing") is None
+    assert [s["id"] for s in parser.get_schemas_by_type("component")] == ["C1", "C2"]
+    assert [s["id"] for s in parser.get_schemas_by_name("daily board")] == ["C2"]
+    assert [e["from"] for e in parser.get_edges_to("S1")] == ["C1", "P1"]
+    assert [e["to"] for e in parser.get_edges_from("C1")] == ["S1"]
+    assert parser.get_edges_from("S1") == []
+
+
+def test_snapshot_sidecar_round_trip_and_invalidation():
+    content = "[schema]\nid = S1\nname = \"Play Ünits\"\n[edge]\nfrom = S1\nto = S1\n[theme]\nvalue = \"a\n\nb\"\n"
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "test.gdsf"
+        path.write_text(content)
+        cold = GDSFParser(path, snapshot=True)
+        sidecar = Path(f"{path}c")
+        assert sidecar.exists()
+
+        warm = GDSFParser(path, snapshot=True)
+        for attr in ("schemas", "edges", "meta", "sections"):
+            assert getattr(warm, attr) == getattr(cold, attr) == getattr(GDSFParser(path), attr)
+        assert warm.get_schema("S1")["name"] == "Play Ünits"
+
+        path.write_text(content.replace("a\n\nb", "changed"))
+        assert GDSFParser(path, snapshot=True).get_section("theme") == {"value": "changed"}
+
+        sidecar.write_bytes(b"garbage")
+        assert GDSFParser(path, snapshot=True).get_section("theme") == {"value": "changed"}
+
+
+def test_mapped_reader_matches_text_parser():
+    content = (
+        "# c\r\n  [theme]  \r\nvalue = \"a  \r\n\r\n[not a header]\r\n  b \"  \r\n"
+        "k2=v=2\nmalformed\n[x=y]\n  key  =  \"  q\nz\n\"\n"
+        "[schema]\nid = S1\nname = \"Ünit\"\n[empty]\n  # hidden = yes\n"
+        "[theme]\nvalue = \"unterminated\nmore\n[after]\n"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "test.gdsf"
+        path.write_bytes(content.encode("utf-8"))
+        with open(path, encoding="utf-8") as f:
+            expected = list(iter_records(f))
+        with MappedGDSFReader(path) as reader:
+            records = [(s, dict(v), n) for s, v, n in reader.iter_records()]
+            assert records == expected
+            assert reader.get_section("theme") == {"value": "\"unterminated\nmore\n[after]"}
+            assert reader.to_parser().schemas == GDSFParser(path).schemas
+
+
+def test_load_many_parses_in_parallel_and_reports_duplicates():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = []
+        for i, ids in enumerate((["A1", "A2"], ["B1"], ["A2"])):
+            path = Path(tmpdir) / f"p{i}.gdsf"
+            path.write_text("".join(f"[schema]\nid = {sid}\nname = \"N\"\n" for sid in ids))
+            paths.append(path)
+
+        parsers = GDSFParser.load_many(paths[:2], workers=2)
+        assert [[s["id"] for s in p.schemas] for p in parsers] == [["A1", "A2"], ["B1"]]
+        assert parsers[0].get_schema("A2")["name"] == "N"
+
+        with pytest.raises(ValueError) as excinfo:
+            GDSFParser.load_many(paths, workers=2)
+        assert f"'A2' in {paths[0]} line 4 and {paths[2]} line 1" in str(excinfo.value)
+        assert len(GDSFParser.load_many(paths, workers=1, check_duplicates=False)) == 3
+
+
+def test_benchmark_corpus_parses_to_requested_counts(tmp_path):
+    sys.path.append(str(Path(__file__).resolve().parents[1] / "benchmarks"))
+    from corpus import write_corpus
+
+    options = dict(schemas=40, edges=70, sections=5, multiline_ratio=0.5,
+                   comment_ratio=0.5, malformed_ratio=0.5, seed=3)
+    path = tmp_path / "corpus.gdsf"
+    write_corpus(path, **options)
+    parser = GDSFParser(path)
+    assert (len(parser.schemas), len(parser.edges), len(parser.sections)) == (40, 70, 5)
+    assert any("\n\n" in s["description"] for s in parser.schemas)
+
+    write_corpus(tmp_path / "again.gdsf", **options)
+    assert (tmp_path / "again.gdsf").read_text() == path.read_text()
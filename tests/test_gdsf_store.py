@@ -0,0 +1,159 @@
+from pathlib import Path
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+import gdsf.store as store_module  # noqa: E402
+from gdsf import ConflictError, GDSFParser, GDSFStore  # noqa: E402
+
+
+def test_write_appends_only_changed_section(tmp_path):
+    path = tmp_path / "info.gdsf"
+    store = GDSFStore(path)
+    store.write({"theme": {"value": "Sea"}, "theme_name": {"value": "Abyss"}})
+    size = path.stat().st_size
+
+    store.write({"theme": {"value": "Space"}})
+    appended = path.read_text()[size:]
+    assert appended == '[theme]\nvalue = "Space"\n\n[meta]\nrevision = "2"\n# end of revision 2\n\n'
+
+    parser = GDSFParser(path)
+    assert parser.sections == {"theme": {"value": "Space"}, "theme_name": {"value": "Abyss"}}
+    assert GDSFStore(path).read()[1] == parser.sections
+
+
+def test_cached_state_matches_fresh_parse(tmp_path):
+    path = tmp_path / "info.gdsf"
+    store = GDSFStore(path)
+    store.write({"theme": {"value": " padded "}, "text": {"value": "a\n\nb"}})
+    assert store.read()[1] == GDSFParser(path).sections
+
+
+def test_superseded_blocks_are_compacted(tmp_path):
+    path = tmp_path / "info.gdsf"
+    store = GDSFStore(path, compact_min_bytes=200)
+    store.write({"keep": {"value": "x" * 50}})
+    for i in range(20):
+        store.write({"tit_table": {"value": str(i) * 20}})
+
+    assert path.stat().st_size < 400
+    assert GDSFParser(path).sections == {
+        "keep": {"value": "x" * 50},
+        "tit_table": {"value": "19" * 20},
+    }
+
+
+def test_compaction_keeps_meta_and_schemas(tmp_path):
+    path = tmp_path / "info.gdsf"
+    path.write_text(
+        "[meta]\nauthor = K\n\n[schema]\nid = S1\nname = \"Play\"\n\n[theme]\nvalue = \"Sea\"\n"
+    )
+    store = GDSFStore(path)
+    store.replace({"theme": {"value": "Space"}})
+
+    parser = GDSFParser(path)
+    assert parser.meta == {"author": "K", "revision": "1"}
+    assert [s["id"] for s in parser.schemas] == ["S1"]
+    assert parser.sections == {"theme": {"value": "Space"}}
+
+
+def test_stale_writer_gets_a_conflict(tmp_path):
+    path = tmp_path / "info.gdsf"
+    first, second = GDSFStore(path), GDSFStore(path)
+    first.write({"theme": {"value": "Sea"}})
+    revision = first.current_revision()
+
+    second.write({"theme": {"value": "Space"}}, expected_revision=revision)
+    with pytest.raises(ConflictError) as info:
+        first.write({"theme": {"value": "Lava"}}, expected_revision=revision)
+    assert (info.value.expected, info.value.actual) == (1, 2)
+    assert GDSFParser(path).sections == {"theme": {"value": "Space"}}
+
+    first.write({"theme": {"value": "Lava"}}, expected_revision=first.current_revision())
+    assert GDSFParser(path).meta["revision"] == "3"
+
+
+def _increment(path, times):
+    store = GDSFStore(path)
+    for _ in range(times):
+        while True:
+            revision = store.current_revision()
+            count = int(store.read()[1].get("counter", {}).get("value", "0"))
+            try:
+                store.write({"counter": {"value": str(count + 1)}}, expected_revision=revision)
+                break
+            except ConflictError:
+                pass
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_processes_never_lose_updates(tmp_path):
+    path = tmp_path / "info.gdsf"
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_increment, args=(path, 25)) for _ in range(4)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+
+    assert all(p.exitcode == 0 for p in workers)
+    parser = GDSFParser(path)
+    assert parser.sections["counter"] == {"value": "100"}
+    assert parser.meta["revision"] == "100"
+
+
+def test_failed_rewrite_keeps_disk_state(tmp_path, monkeypatch):
+    path = tmp_path / "info.gdsf"
+    store = GDSFStore(path)
+    store.write({"theme": {"value": "Old"}})
+
+    def full_disk(path, data):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(store_module, "atomic_write", full_disk)
+    for write in (
+        lambda: store.write({"theme": {"value": "New"}}, atomic=True),
+        lambda: store.replace({"theme": {"value": "New"}}),
+    ):
+        with pytest.raises(OSError):
+            write()
+        assert store.read()[1] == {"theme": {"value": "Old"}}
+        assert store.current_revision() == 1
+
+
+def test_torn_append_is_cut_off(tmp_path):
+    path = tmp_path / "info.gdsf"
+    store = GDSFStore(path)
+    store.write({"theme": {"value": "Sea"}, "skill_kernels": {"value": '["K_1"]'}})
+    committed = path.read_bytes()
+    # A writer killed in the middle of a long multi-line value.
+    path.write_bytes(committed + b'[tit_table]\nvalue = "{\n  \\"Joy\\": ')
+
+    reader = GDSFStore(path)
+    assert reader.read()[1] == {"theme": {"value": "Sea"}, "skill_kernels": {"value": '["K_1"]'}}
+
+    store.write({"theme": {"value": "Space"}})
+    assert path.read_bytes().startswith(committed + b"[theme]")
+    assert GDSFParser(path).sections == {
+        "theme": {"value": "Space"},
+        "skill_kernels": {"value": '["K_1"]'},
+    }
+    assert reader.current_revision() == 2
+
+
+def test_file_without_marker_is_rewritten(tmp_path):
+    path = tmp_path / "info.gdsf"
+    # Written by an earlier version: its only revision block comes first.
+    path.write_text('[meta]\nrevision = "4"\n\n[theme]\nvalue = "Sea"\n\n')
+    store = GDSFStore(path)
+    assert store.read()[1] == {"theme": {"value": "Sea"}}
+
+    store.write({"theme_name": {"value": "Abyss"}})
+    assert path.read_text().endswith('[meta]\nrevision = "5"\n# end of revision 5\n\n')
+    assert GDSFParser(path).sections == {
+        "theme": {"value": "Sea"},
+        "theme_name": {"value": "Abyss"},
+    }
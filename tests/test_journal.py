@@ -0,0 +1,202 @@
+import multiprocessing
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from gdsf import ConflictError, GDSFStore, Journal, SQLiteStore  # noqa: E402
+import ui.app_utils as app_utils  # noqa: E402
+
+
+def _value(store, name):
+    return store.read()[1].get(name, {}).get("value")
+
+
+@pytest.mark.parametrize("suffix", ["gdsf", "sqlite"])
+def test_undo_and_redo(tmp_path, suffix):
+    store = (GDSFStore if suffix == "gdsf" else SQLiteStore)(tmp_path / f"info.{suffix}")
+    journal = Journal(tmp_path / "info.journal")
+    store.write({"keep": {"value": "k"}})
+
+    journal.commit(store, {"theme": {"value": "Sea"}})
+    journal.commit(store, {"theme": {"value": "Space"}, "name": {"value": "Orbit"}})
+    assert journal.undo(store) is not None
+    assert _value(store, "theme") == "Sea"
+    assert _value(store, "name") is None
+    assert journal.undo(store) is not None
+    assert _value(store, "theme") is None
+    assert journal.undo(store) is None
+    assert _value(store, "keep") == "k"
+
+    journal.redo(store)
+    journal.redo(store)
+    assert (_value(store, "theme"), _value(store, "name")) == ("Space", "Orbit")
+    assert not journal.can_redo()
+
+    # A new change drops what is left to redo.
+    journal.undo(store)
+    journal.commit(store, {"theme": None})
+    assert not journal.can_redo()
+    assert "theme" not in store.read()[1]
+    journal.undo(store)
+    assert _value(store, "theme") == "Sea"
+
+
+def test_checkpoints_bound_replay(tmp_path):
+    store = GDSFStore(tmp_path / "info.gdsf")
+    journal = Journal(tmp_path / "info.journal", checkpoint_every=3)
+    states = {}
+    for i in range(10):
+        journal.commit(store, {f"s{i % 4}": {"value": str(i)}})
+        states[journal.history()[-1]["seq"]] = dict(store.read()[1])
+    journal.undo(store)
+    states[journal.history()[-1]["seq"]] = dict(store.read()[1])
+
+    history = journal.history()
+    checkpoints = [e["seq"] for e in history if e["op"] == "checkpoint"]
+    changes = [e for e in history if e["op"] != "checkpoint"]
+    assert len(checkpoints) == 1 + len(changes) // 3
+    for seq, state in states.items():
+        assert journal.state_at(seq) == state
+
+    # Replays read from the nearest checkpoint only.
+    spans = []
+    read = journal._read
+    journal._read = lambda first, last=None: spans.append((first, last)) or read(first, last)
+    journal.state_at(history[-1]["seq"])
+    assert spans[0][0] == checkpoints[-1]
+
+
+def test_restore_is_undoable(tmp_path):
+    store = GDSFStore(tmp_path / "info.gdsf")
+    journal = Journal(tmp_path / "info.journal")
+    journal.commit(store, {"theme": {"value": "Sea"}})
+    good = journal.history()[-1]
+    journal.commit(store, {"theme": {"value": "Bad"}, "extra": {"value": "x"}})
+
+    journal.restore(store, good["seq"])
+    assert store.read()[1] == {"theme": {"value": "Sea"}}
+    assert journal.seq_at(good["ts"]) >= good["seq"]
+
+    journal.undo(store)
+    assert store.read()[1] == {"theme": {"value": "Bad"}, "extra": {"value": "x"}}
+    journal.restore(store, 1)  # The baseline checkpoint: before any change.
+    assert store.read()[1] == {}
+
+
+def test_history_is_shared_and_survives_torn_writes(tmp_path):
+    path = tmp_path / "info.gdsf"
+    first = Journal(tmp_path / "info.journal")
+    first.commit(GDSFStore(path), {"theme": {"value": "Sea"}})
+    with open(tmp_path / "info.journal", "a") as f:
+        f.write('{"seq": 99, "op": "ed')  # A crash mid-append.
+
+    second = Journal(tmp_path / "info.journal")
+    assert second.can_undo()
+    second.undo(GDSFStore(path))
+    assert GDSFStore(path).read()[1] == {}
+    assert first.can_redo()
+
+
+def test_app_utils_undo_redo_and_restore(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_utils, "DATA_PATH", tmp_path)
+    monkeypatch.setattr(app_utils, "GDSF_FILE", tmp_path / "info.gdsf")
+    app_utils.invalidate_cache()
+
+    app_utils.save_theme("Sea")
+    with app_utils.transaction():
+        app_utils.save_theme("Space")
+        app_utils.save_theme_name("Orbit")
+    assert app_utils.can_undo()
+
+    assert app_utils.undo()
+    assert (app_utils.load_theme(), app_utils.load_theme_name()) == ("Sea", "")
+    assert app_utils.can_redo()
+    assert app_utils.redo()
+    assert (app_utils.load_theme(), app_utils.load_theme_name()) == ("Space", "Orbit")
+
+    first_edit = next(e for e in app_utils.change_history() if e["op"] == "edit")
+    assert first_edit["sections"] == ["theme"]
+    app_utils.restore(first_edit["seq"])
+    assert (app_utils.load_theme(), app_utils.load_theme_name()) == ("Sea", "")
+
+    with app_utils.project("other"):
+        assert not app_utils.can_undo()
+    app_utils.invalidate_cache()
+
+
+def _crash(path, journal_path, after_apply):
+    import gdsf.journal as journal_module
+
+    apply = journal_module.apply_changes
+
+    def apply_and_die(store, changes, **options):
+        if after_apply:
+            apply(store, changes, **options)
+        os._exit(1)
+
+    journal_module.apply_changes = apply_and_die
+    Journal(journal_path).commit(GDSFStore(path), {"theme": {"value": "Space"}})
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+@pytest.mark.parametrize("after_apply", [True, False])
+def test_change_is_journaled_before_the_store(tmp_path, after_apply):
+    path, journal_path = tmp_path / "info.gdsf", tmp_path / "info.journal"
+    journal = Journal(journal_path)
+    journal.commit(GDSFStore(path), {"theme": {"value": "Sea"}})
+
+    process = multiprocessing.get_context("fork").Process(
+        target=_crash, args=(path, journal_path, after_apply)
+    )
+    process.start()
+    process.join()
+    assert process.exitcode == 1
+    store = GDSFStore(path)
+    assert _value(store, "theme") == ("Space" if after_apply else "Sea")
+
+    # The next writer settles the dangling change against the store.
+    journal.checkpoint(store)
+    edits = [e for e in journal.history() if e["op"] == "edit"]
+    assert len(edits) == (2 if after_apply else 1)
+    assert journal.state_at(edits[-1]["seq"]) == store.read()[1]
+    journal.undo(store)
+    assert _value(store, "theme") == ("Sea" if after_apply else None)
+
+
+def test_refused_change_is_aborted(tmp_path):
+    store = GDSFStore(tmp_path / "info.gdsf")
+    journal = Journal(tmp_path / "info.journal")
+    journal.commit(store, {"theme": {"value": "Sea"}})
+    revision = store.current_revision()
+    store.write({"name": {"value": "Orbit"}})
+
+    with pytest.raises(ConflictError):
+        journal.commit(store, {"theme": {"value": "Space"}}, expected_revision=revision)
+    assert [e["op"] for e in journal.history()] == ["checkpoint", "edit"]
+    assert journal.history()[-1]["sections"] == ["theme"]
+    journal.undo(store)
+    assert _value(store, "theme") is None
+
+
+class _FullDiskStore(GDSFStore):
+    """Caches a change before writing it, then fails like a full disk."""
+
+    def write(self, changes, atomic=False, expected_revision=None):
+        self.read()
+        self._parser.sections = {**self._parser.sections, **changes}
+        raise OSError("No space left on device")
+
+
+def test_failed_write_is_aborted(tmp_path):
+    store = _FullDiskStore(tmp_path / "info.gdsf")
+    journal = Journal(tmp_path / "info.journal")
+    GDSFStore(store.path).write({"theme": {"value": "Old"}})
+
+    with pytest.raises(OSError):
+        journal.commit(store, {"theme": {"value": "New"}, "theme_name": {"value": "Orbit"}})
+    assert [e["op"] for e in journal.history()] == ["checkpoint"]
+    assert not journal.can_undo()
+    assert store.read()[1] == {"theme": {"value": "Old"}}
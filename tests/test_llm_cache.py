@@ -0,0 +1,72 @@
+from pathlib import Path
+from types import SimpleNamespace
+import sys
+import types
+
+# Provide dummy modules for optional dependencies
+sys.modules.setdefault("dotenv", types.SimpleNamespace(load_dotenv=lambda **kwargs: None))
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+import ui.ai as ai  # noqa: E402
+
+
+class NamedModel:
+    model = "fake-1"
+    temperature = 0.2
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return SimpleNamespace(content=f"answer {self.calls}")
+
+
+def _use_cache(tmp_path, monkeypatch, **options):
+    cache = ai.ResponseCache(tmp_path / "cache.sqlite", **options)
+    monkeypatch.setattr(ai, "_RESPONSE_CACHE", cache)
+    monkeypatch.setattr(ai, "LLM_CACHE_ENABLED", True)
+    return cache
+
+
+def test_identical_requests_are_answered_from_cache(tmp_path, monkeypatch):
+    _use_cache(tmp_path, monkeypatch)
+    model = NamedModel()
+    messages = [ai.SystemMessage(content="sys"), ai.HumanMessage(content="hi")]
+
+    assert ai._invoke(model, messages) == "answer 1"
+    assert ai._invoke(model, [ai.SystemMessage(content="sys\r\n"), ai.HumanMessage(content=" hi")]) == "answer 1"
+    assert model.calls == 1
+
+    model.temperature = 0.9
+    assert ai._invoke(model, messages) == "answer 2"
+
+    with ai.bypass_cache():
+        assert ai._invoke(model, messages) == "answer 3"
+    assert ai._invoke(model, messages) == "answer 3"
+
+
+def test_unnamed_models_are_never_cached(tmp_path, monkeypatch):
+    cache = _use_cache(tmp_path, monkeypatch)
+    model = SimpleNamespace(invoke=lambda messages: SimpleNamespace(content="x"))
+    ai._invoke(model, [ai.HumanMessage(content="hi")])
+    assert cache._connect().execute("SELECT COUNT(*) FROM responses").fetchone() == (0,)
+
+
+def test_cache_evicts_least_recently_used_and_expired(tmp_path, monkeypatch):
+    cache = _use_cache(tmp_path, monkeypatch, max_bytes=10, ttl=60)
+    clock = [1000.0]
+    monkeypatch.setattr(ai.time, "time", lambda: clock[0])
+
+    cache.put("a", "aaaa")
+    clock[0] += 1
+    cache.put("b", "bbbb")
+    clock[0] += 1
+    assert cache.get("a") == "aaaa"  # "b" is now least recently used
+    clock[0] += 1
+    cache.put("c", "cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa" and cache.get("c") == "cccc"
+
+    clock[0] += 61
+    assert cache.get("c") is None
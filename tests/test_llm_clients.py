@@ -0,0 +1,36 @@
+from pathlib import Path
+import sys
+import types
+
+# Provide dummy modules for optional dependencies
+sys.modules.setdefault("dotenv", types.SimpleNamespace(load_dotenv=lambda **kwargs: None))
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+import ui.ai as ai  # noqa: E402
+
+
+def test_clients_are_pooled_per_configuration(monkeypatch):
+    built = []
+
+    class FakeOllama:
+        def __init__(self, model, base_url):
+            built.append((model, base_url))
+
+    monkeypatch.setattr(ai, "ChatOllama", FakeOllama)
+    monkeypatch.setattr(ai, "load_dotenv", lambda **kwargs: None)
+    monkeypatch.setattr(ai, "_LLM_CLIENTS", {})
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    monkeypatch.delenv("GEMINI_KEY", raising=False)
+    monkeypatch.setenv("OLLAMA_HOST", "http://a:11434")
+
+    first = ai.get_llm()
+    assert ai.get_llm() is first
+
+    monkeypatch.setenv("OLLAMA_HOST", "http://b:11434")
+    other = ai.get_llm()
+    assert other is not first
+    assert built == [("deepseek-r1:14b", "http://a:11434"), ("deepseek-r1:14b", "http://b:11434")]
+
+    ai.reload_llm_clients()
+    assert ai.get_llm() is not other
+    assert len(built) == 3
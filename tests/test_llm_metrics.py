@@ -0,0 +1,70 @@
+import json
+from pathlib import Path
+from types import SimpleNamespace
+import sys
+import types
+
+# Provide dummy modules for optional dependencies
+sys.modules.setdefault("dotenv", types.SimpleNamespace(load_dotenv=lambda **kwargs: None))
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+import ui.ai as ai  # noqa: E402
+
+
+class UsageModel:
+    model = "fake-usage"
+
+    def invoke(self, messages):
+        return SimpleNamespace(
+            content="Accepted – ok.",
+            usage_metadata={"input_tokens": 42, "output_tokens": 7},
+        )
+
+    def stream(self, messages):
+        for text in ["<think>x</think>", "Hello", " there"]:
+            yield SimpleNamespace(content=text, usage_metadata=None)
+
+
+def test_calls_are_traced_per_step(tmp_path, monkeypatch):
+    trace = tmp_path / "trace.jsonl"
+    monkeypatch.setattr(ai, "LLM_TRACE_PATH", trace)
+    monkeypatch.setattr(ai, "_RESPONSE_CACHE", ai.ResponseCache(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(ai, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(ai, "get_llm", lambda: UsageModel())
+    ai.clear_call_log()
+
+    ai.step8b_cell("k", "m", "Joy")
+    ai.step8b_cell("k", "m", "Joy")
+    assert "".join(ai.step4("T", ["s"], [{"role": "user", "content": "hi"}], stream=True)) == "Hello there"
+
+    records = ai.call_log()
+    assert [r["step"] for r in records] == ["step8b_cell", "step8b_cell", "step4"]
+    assert records[0]["prompt_tokens"] == 42 and records[0]["completion_tokens"] == 7
+    assert not records[0]["tokens_estimated"]
+    assert [r["cache_hit"] for r in records] == [False, True, False]
+    assert records[2]["ttft_ms"] is not None and records[2]["tokens_estimated"]
+
+    lines = [json.loads(line) for line in trace.read_text().splitlines()]
+    assert lines == records
+
+    summary = ai.summarize_calls()
+    assert summary["step8b_cell"]["calls"] == 2
+    assert summary["step8b_cell"]["cache_hits"] == 1
+
+
+def test_trace_is_rotated_past_its_size_limit(tmp_path, monkeypatch):
+    trace = tmp_path / "trace.jsonl"
+    monkeypatch.setattr(ai, "LLM_TRACE_PATH", trace)
+    model = UsageModel()
+    ai._record_call(model, "step4", [], 0.0, content="ok")
+    line_size = trace.stat().st_size
+    trace.unlink()
+    monkeypatch.setattr(ai, "LLM_TRACE_MAX_BYTES", int(2.5 * line_size))
+
+    for _ in range(10):
+        ai._record_call(model, "step4", [], 0.0, content="ok")
+    # Every third record fills the trace past its limit and rotates it.
+    assert len(trace.read_text().splitlines()) == 1
+    rotated = (tmp_path / "trace.jsonl.1").read_text().splitlines()
+    assert len(rotated) == 3
+    assert all(json.loads(line)["step"] == "step4" for line in rotated)
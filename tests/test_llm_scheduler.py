@@ -0,0 +1,191 @@
+from pathlib import Path
+from types import SimpleNamespace
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+# Provide dummy modules for optional dependencies
+sys.modules.setdefault("dotenv", types.SimpleNamespace(load_dotenv=lambda **kwargs: None))
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+import ui.ai as ai  # noqa: E402
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class FlakyModel:
+    """Fails with a 429 ``failures`` times before answering."""
+
+    def __init__(self, failures, error=RateLimited, message="429 Resource exhausted"):
+        self.failures = failures
+        self.error = error
+        self.message = message
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error(self.message)
+        return SimpleNamespace(content="ok")
+
+    def stream(self, messages):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error(self.message)
+        yield SimpleNamespace(content="o")
+        yield SimpleNamespace(content="k")
+
+
+def _scheduler(monkeypatch, **kwargs):
+    delays = []
+    scheduler = ai.LLMScheduler(sleep=delays.append, seed=0, **kwargs)
+    monkeypatch.setattr(ai, "_SCHEDULER", scheduler)
+    return scheduler, delays
+
+
+def test_retries_with_exponential_backoff(monkeypatch):
+    _, delays = _scheduler(monkeypatch, base_delay=1.0, max_delay=3.0)
+    model = FlakyModel(3)
+    ai.clear_call_log()
+
+    assert ai._invoke(model, []) == "ok"
+    assert model.calls == 4
+    assert len(delays) == 3
+    # Full jitter below caps of 1, 2 and then max_delay.
+    assert all(0 <= d <= cap for d, cap in zip(delays, [1.0, 2.0, 3.0]))
+    assert ai.call_log()[-1]["retries"] == 3
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    _scheduler(monkeypatch, max_retries=2, failure_threshold=10)
+    model = FlakyModel(5)
+    ai.clear_call_log()
+
+    with pytest.raises(RateLimited):
+        ai._invoke(model, [])
+    assert model.calls == 3
+    record = ai.call_log()[-1]
+    assert record["retries"] == 2
+    assert record["error"] == "RateLimited"
+
+
+def test_other_errors_are_not_retried(monkeypatch):
+    _, delays = _scheduler(monkeypatch)
+    model = FlakyModel(1, error=ValueError, message="bad request")
+
+    with pytest.raises(ValueError):
+        ai._invoke(model, [])
+    assert model.calls == 1
+    assert delays == []
+
+
+def test_digits_in_error_text_are_not_a_status():
+    assert ai._is_retryable(RuntimeError("HTTP 429 Too Many Requests"))
+    assert ai._is_retryable(RuntimeError("Rate limit exceeded"))
+    assert not ai._is_retryable(ValueError("model 'qwen-14290' not found"))
+    assert not ai._is_retryable(ValueError("prompt has 4290 tokens, limit is 4096"))
+
+
+def test_stream_retries_before_first_token(monkeypatch):
+    _scheduler(monkeypatch)
+    model = FlakyModel(2)
+    ai.clear_call_log()
+
+    assert "".join(ai._stream_reply(model, [])) == "ok"
+    assert ai.call_log()[-1]["retries"] == 2
+
+
+def test_circuit_breaker_fails_fast(monkeypatch):
+    scheduler, _ = _scheduler(monkeypatch, max_retries=10, failure_threshold=3, reset_timeout=60)
+    model = FlakyModel(100)
+
+    with pytest.raises(RateLimited):
+        ai._invoke(model, [])
+    assert model.calls == 3
+    with pytest.raises(ai.CircuitOpenError):
+        ai._invoke(model, [])
+    assert model.calls == 3
+
+    # After the reset timeout one trial call goes through and closes it.
+    _, breaker = scheduler.limits(ai._provider_name(model))
+    breaker._opened_at -= 60
+    model.failures = 0
+    assert ai._invoke(model, []) == "ok"
+    assert not breaker.is_open
+
+
+def test_trial_call_rejected_by_the_provider_closes_the_breaker(monkeypatch):
+    scheduler, _ = _scheduler(monkeypatch, max_retries=0, failure_threshold=1, reset_timeout=60)
+    model = FlakyModel(1)
+    with pytest.raises(RateLimited):
+        ai._invoke(model, [])
+    _, breaker = scheduler.limits(ai._provider_name(model))
+    assert breaker.is_open
+
+    # A non-retryable error still shows the provider is reachable.
+    breaker._opened_at -= 60
+    model.calls, model.error, model.message = 0, ValueError, "bad request"
+    with pytest.raises(ValueError):
+        ai._invoke(model, [])
+    assert not breaker.is_open
+    assert ai._invoke(model, []) == "ok"
+
+    # A trial call interrupted without an outcome frees the probe slot.
+    breaker.record_failure()
+    breaker._opened_at -= 60
+    with pytest.raises(KeyboardInterrupt):
+        scheduler.call(model, lambda: (_ for _ in ()).throw(KeyboardInterrupt()))
+    assert ai._invoke(model, []) == "ok"
+    assert not breaker.is_open
+
+
+def test_rejected_requests_do_not_reset_the_failure_count(monkeypatch):
+    scheduler, _ = _scheduler(monkeypatch, max_retries=0, failure_threshold=3, reset_timeout=60)
+    flaky, rejected = FlakyModel(100), FlakyModel(100, error=ValueError, message="bad request")
+
+    for _ in range(2):
+        with pytest.raises(RateLimited):
+            ai._invoke(flaky, [])
+        with pytest.raises(ValueError):
+            ai._invoke(rejected, [])
+    with pytest.raises(RateLimited):
+        ai._invoke(flaky, [])
+    _, breaker = scheduler.limits(ai._provider_name(flaky))
+    assert breaker.is_open
+    with pytest.raises(ai.CircuitOpenError):
+        ai._invoke(rejected, [])
+
+
+def test_token_bucket_caps_request_rate():
+    bucket = ai.TokenBucket(rate=50, capacity=2)
+    starts = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(3):
+            bucket.acquire()
+            with lock:
+                starts.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # 12 calls with a burst of 2 need at least 10 refills at 50/s.
+    assert len(starts) == 12
+    assert max(starts) - min(starts) >= 10 / 50 * 0.9
+
+
+def test_rates_come_from_env(monkeypatch):
+    monkeypatch.setenv("VIOLETA_RPM_GEMINI", "120")
+    scheduler = ai.LLMScheduler.from_env()
+    bucket, _ = scheduler.limits("gemini")
+    assert bucket.rate == 2
+    assert scheduler.limits("ollama")[0].rate == 0
@@ -0,0 +1,62 @@
+from pathlib import Path
+from types import SimpleNamespace
+import sys
+import types
+
+# Provide dummy modules for optional dependencies
+sys.modules.setdefault("dotenv", types.SimpleNamespace(load_dotenv=lambda **kwargs: None))
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+import ui.ai as ai  # noqa: E402
+
+CHUNKS = ["<th", "ink>plan ", "the reply</thi", "nk>\n\n", "Hello", " world"]
+
+
+class StreamingModel:
+    def __init__(self):
+        self.streamed = 0
+
+    def stream(self, messages):
+        self.streamed += 1
+        for chunk in CHUNKS:
+            yield SimpleNamespace(content=chunk)
+
+    def invoke(self, messages):
+        return SimpleNamespace(content="".join(CHUNKS))
+
+
+def test_chat_steps_stream_without_think_block(monkeypatch):
+    model = StreamingModel()
+    monkeypatch.setattr(ai, "get_llm", lambda: model)
+    messages = [{"role": "user", "content": "hi"}]
+
+    chunks = list(ai.step1(messages, stream=True))
+
+    assert chunks == ["Hello", " world"]
+    assert ai.step1(messages) == "Hello world"
+
+
+def test_streamed_reply_fills_the_cache(tmp_path, monkeypatch):
+    model = StreamingModel()
+    model.model = "fake-1"
+    monkeypatch.setattr(ai, "get_llm", lambda: model)
+    monkeypatch.setattr(ai, "_RESPONSE_CACHE", ai.ResponseCache(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(ai, "LLM_CACHE_ENABLED", True)
+    messages = [{"role": "user", "content": "hi"}]
+
+    assert "".join(ai.step5("calm", messages, stream=True)) == "Hello world"
+    assert "".join(ai.step5("calm", messages, stream=True)) == "Hello world"
+    assert model.streamed == 1
+
+
+def test_filters_handle_tags_split_across_chunks():
+    think = ai.ThinkFilter()
+    chunks = ["A<", "think>x</", "think", ">  B <thi", "nk>never closed"]
+    assert "".join(think.stream(chunks)) == "AB <think>never closed"
+    assert think.filter("<think>\nplan\n</think>\nAnswer") == "Answer"
+
+    fences = ai.FenceFilter()
+    chunks = ["``", "`js", "on\n{\"a\": ", "1}\n`", "``"]
+    assert "".join(fences.stream(chunks)) == '{"a": 1}\n'
+    assert ai.remove_code_fences("```python\nprint(1)\n```\n") == "print(1)"
+    assert ai.remove_code_fences("a ```` b") == "a ` b"
@@ -0,0 +1,128 @@
+import contextvars
+import json
+import runpy
+import sys
+import threading
+import types
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+# Provide dummy modules for optional dependencies
+sys.modules.setdefault("dotenv", types.SimpleNamespace(load_dotenv=lambda **kwargs: None))
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+import ui.ai as ai  # noqa: E402
+import ui.app_utils as app_utils  # noqa: E402
+
+PAGES = Path(__file__).resolve().parents[1] / "src" / "ui" / "pages"
+
+
+class SessionState(dict):
+    __getattr__ = dict.__getitem__
+    __setattr__ = dict.__setitem__
+
+
+@pytest.fixture
+def data_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_utils, "DATA_PATH", tmp_path)
+    monkeypatch.setattr(app_utils, "GDSF_FILE", tmp_path / "info.gdsf")
+    app_utils.invalidate_cache()
+    yield tmp_path
+    app_utils.invalidate_cache()
+
+
+def test_projects_are_isolated(data_path):
+    with app_utils.project("alpha"):
+        app_utils.save_theme("Sea")
+        assert app_utils.current_project() == "alpha"
+    with app_utils.project("beta"):
+        app_utils.save_theme("Space")
+    app_utils.save_theme("Shared")
+
+    with app_utils.project("alpha"):
+        assert app_utils.load_theme() == "Sea"
+    with app_utils.project("beta"):
+        assert app_utils.load_theme() == "Space"
+    assert app_utils.load_theme() == "Shared"
+    assert app_utils.current_project() is None
+    assert (data_path / "alpha" / "info.gdsf").exists()
+    assert app_utils.list_projects() == ["alpha", "beta"]
+
+
+def test_sessions_keep_their_own_project(data_path):
+    barrier = threading.Barrier(4)
+    seen = {}
+
+    def session(name):
+        app_utils.set_project(name)
+        barrier.wait()
+        for i in range(20):
+            app_utils.save_theme(f"{name} {i}")
+            seen[name] = app_utils.load_theme()
+
+    threads = [
+        threading.Thread(target=contextvars.Context().run, args=(session, f"p{i}"))
+        for i in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert seen == {f"p{i}": f"p{i} 19" for i in range(4)}
+
+
+def test_open_stores_are_bounded(data_path, monkeypatch):
+    monkeypatch.setattr(app_utils, "MAX_OPEN_PROJECTS", 2)
+    for name in ["a", "b", "a", "c"]:
+        with app_utils.project(name):
+            app_utils.save_theme(name)
+            app_utils.load_learning_types()
+
+    assert list(app_utils._STORES) == [data_path / "a" / "info.gdsf", data_path / "c" / "info.gdsf"]
+    assert {key[0] for key in app_utils._DECODED_CACHE} <= set(app_utils._STORES)
+    with app_utils.project("b"):
+        assert app_utils.load_theme() == "b"
+
+
+@pytest.mark.parametrize("project_id", ["", "../etc", "a/b", ".hidden", "x" * 65])
+def test_invalid_project_ids(data_path, project_id):
+    if project_id == "":
+        # An empty ID selects the shared file.
+        app_utils.set_project(project_id)
+        assert app_utils.current_project() is None
+        return
+    with pytest.raises(ValueError):
+        app_utils.set_project(project_id)
+
+
+def test_page_callbacks_use_the_session_project(data_path, monkeypatch):
+    # Streamlit runs widget callbacks before the page code of the next run,
+    # usually on a new thread that starts without a project selected.
+    callbacks = {}
+    st = mock.MagicMock()
+    st.session_state = SessionState(project_id="alpha")
+    st.form_submit_button.return_value = False
+    st.chat_input.return_value = None
+    st.button.side_effect = lambda label, on_click=None, **kw: callbacks.setdefault(label, on_click) and False
+    monkeypatch.setitem(sys.modules, "streamlit", st)
+    monkeypatch.setitem(sys.modules, "app_utils", app_utils)
+    monkeypatch.setitem(sys.modules, "ai", ai)
+    monkeypatch.setattr(ai, "step3b_all", lambda theme, kernels, **kw: {"kernels": [theme]})
+
+    with app_utils.project("alpha"):
+        app_utils.save_theme("Sea")
+    contextvars.Context().run(runpy.run_path, str(PAGES / "step3.py"))
+
+    thread = threading.Thread(
+        target=contextvars.Context().run, args=(callbacks["Generate Kernel Theme Mapping"],)
+    )
+    thread.start()
+    thread.join()
+
+    with app_utils.project("alpha"):
+        assert app_utils.load_kernel_theme_mapping() == {"kernels": ["Sea"]}
+    assert app_utils.load_kernel_theme_mapping() == ""
+    assert json.loads(st.session_state.kernel_theme_text) == {"kernels": ["Sea"]}
@@ -0,0 +1,233 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+import gdsf.store as store_module  # noqa: E402
+from gdsf import ConflictError, GDSFStore  # noqa: E402
+import ui.app_utils as app_utils  # noqa: E402
+
+
+def _use_tmp_file(tmp_path, monkeypatch):
+    gdsf_file = tmp_path / "info.gdsf"
+    monkeypatch.setattr(app_utils, "DATA_PATH", tmp_path)
+    monkeypatch.setattr(app_utils, "GDSF_FILE", gdsf_file)
+    return gdsf_file
+
+
+def test_loads_share_one_parse(tmp_path, monkeypatch):
+    _use_tmp_file(tmp_path, monkeypatch)
+    app_utils.save_theme("Deep sea")
+    app_utils.save_theme_name("Abyss")
+
+    parses = []
+
+    class CountingParser(store_module.GDSFParser):
+        def __init__(self, path):
+            parses.append(path)
+            super().__init__(path)
+
+    monkeypatch.setattr(store_module, "GDSFParser", CountingParser)
+    app_utils.invalidate_cache()
+    assert app_utils.load_theme() == "Deep sea"
+    assert app_utils.load_theme_name() == "Abyss"
+    assert app_utils.load_atomic_unit() == ""
+    assert len(parses) == 1
+
+
+def test_external_change_is_picked_up(tmp_path, monkeypatch):
+    gdsf_file = _use_tmp_file(tmp_path, monkeypatch)
+    app_utils.save_theme("Deep sea")
+    assert app_utils.load_theme() == "Deep sea"
+
+    gdsf_file.write_text('[theme]\nvalue = "Outer space, far away"\n')
+    assert app_utils.load_theme() == "Outer space, far away"
+
+
+def test_callers_cannot_mutate_cache(tmp_path, monkeypatch):
+    _use_tmp_file(tmp_path, monkeypatch)
+    app_utils.save_theme("Deep sea")
+
+    sections = app_utils.load_all_sections()
+    sections["theme"]["value"] = "changed"
+    assert app_utils.load_theme() == "Deep sea"
+
+
+def test_decoded_values_are_private_copies(tmp_path, monkeypatch):
+    _use_tmp_file(tmp_path, monkeypatch)
+    kernels = {"Fact": [{"kernel": "k", "input": "i", "verb": "v", "output": "o"}]}
+    app_utils.save_skill_kernels(app_utils.json.dumps(kernels))
+
+    loaded = app_utils.load_skill_kernels()
+    loaded["Fact"][0].setdefault("id", "k1")
+    assert app_utils.load_skill_kernels() == kernels
+
+
+def test_json_decoded_once_per_version(tmp_path, monkeypatch):
+    _use_tmp_file(tmp_path, monkeypatch)
+    app_utils.save_sit({"Planning": {"Progress": "+"}})
+
+    decodes = []
+    real_loads = app_utils.json.loads
+
+    def counting_loads(raw, *args, **kwargs):
+        decodes.append(raw)
+        return real_loads(raw, *args, **kwargs)
+
+    monkeypatch.setattr(app_utils.json, "loads", counting_loads)
+    assert app_utils.load_sit() == {"Planning": {"Progress": "+"}}
+    assert app_utils.load_sit() == {"Planning": {"Progress": "+"}}
+    assert len(decodes) == 1
+
+    app_utils.save_sit({"Planning": {"Progress": "-"}})
+    assert app_utils.load_sit() == {"Planning": {"Progress": "-"}}
+    assert len(decodes) == 2
+
+
+def test_transaction_commits_once(tmp_path, monkeypatch):
+    gdsf_file = _use_tmp_file(tmp_path, monkeypatch)
+    app_utils.save_theme("Old")
+    before = gdsf_file.read_text()
+
+    with app_utils.transaction():
+        app_utils.save_mechanic_mappings("Progress: Deck building")
+        assert app_utils.load_mechanic_mappings() == {"Progress": ["Deck building"]}
+        app_utils.save_theme("New")
+        assert gdsf_file.read_text() == before
+
+    assert app_utils.load_theme() == "New"
+    assert app_utils.load_mechanic_mappings() == {"Progress": ["Deck building"]}
+    # Only the data file, its journal and lock file, no leftover temp files.
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "info.gdsf", "info.gdsf.journal", "info.gdsf.lock"
+    ]
+
+
+def test_failed_transaction_writes_nothing(tmp_path, monkeypatch):
+    _use_tmp_file(tmp_path, monkeypatch)
+    app_utils.save_theme("Old")
+
+    try:
+        with app_utils.transaction():
+            app_utils.save_theme("New")
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    assert app_utils.load_theme() == "Old"
+
+
+def test_compare_and_swap_appends(tmp_path, monkeypatch):
+    gdsf_file = _use_tmp_file(tmp_path, monkeypatch)
+    app_utils.save_theme("Sea")
+    app_utils.save_tit({"Joy": {"Run": {"K_1": {"Dash": ""}}}})
+    before = gdsf_file.read_bytes()
+    rewrites = []
+    rewrite = GDSFStore._rewrite
+    monkeypatch.setattr(
+        GDSFStore, "_rewrite", lambda self, *args: rewrites.append(args) or rewrite(self, *args)
+    )
+
+    app_utils.retry_on_conflict(lambda: app_utils.save_tit({"Joy": {"Run": {"K_1": {"Dash": "✔"}}}}))
+    assert rewrites == []
+    assert gdsf_file.read_bytes().startswith(before)
+    assert app_utils.load_tit() == {"Joy": {"Run": {"K_1": {"Dash": "✔"}}}}
+
+    with app_utils.transaction():
+        app_utils.save_theme("Space")
+    assert len(rewrites) == 1
+
+
+def test_conflicting_transaction_is_retried(tmp_path, monkeypatch):
+    _use_tmp_file(tmp_path, monkeypatch)
+    app_utils.save_sit({"Planning": {"Progress": "-"}})
+    runs = []
+
+    def update():
+        sit = app_utils.load_sit()
+        sit["Focus"] = {"Progress": "+"}
+        app_utils.save_sit(sit)
+        if not runs:
+            # Another session saves while this update is in flight.
+            GDSFStore(app_utils.GDSF_FILE).write({"theme": {"value": "Sea"}})
+        runs.append(sit)
+
+    revision = app_utils.current_revision()
+    app_utils.retry_on_conflict(update)
+    assert len(runs) == 2
+    assert app_utils.load_sit() == {"Planning": {"Progress": "-"}, "Focus": {"Progress": "+"}}
+    assert app_utils.load_theme() == "Sea"
+    assert app_utils.current_revision() == revision + 2
+
+    with pytest.raises(ConflictError):
+        with app_utils.transaction(expected_revision=revision):
+            app_utils.save_theme("Stale")
+    assert app_utils.load_theme() == "Sea"
+
+
+def test_failed_commit_keeps_loads_in_sync_with_disk(tmp_path, monkeypatch):
+    gdsf_file = _use_tmp_file(tmp_path, monkeypatch)
+    app_utils.save_theme("Old")
+
+    def full_disk(path, data):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(store_module, "atomic_write", full_disk)
+    with pytest.raises(OSError):
+        with app_utils.transaction():
+            app_utils.save_theme("New")
+            app_utils.save_theme_name("Orbit")
+    assert (app_utils.load_theme(), app_utils.load_theme_name()) == ("Old", "")
+    assert store_module.GDSFParser(gdsf_file).sections["theme"] == {"value": "Old"}
+    assert [e["op"] for e in app_utils.change_history()] == ["checkpoint", "edit"]
+
+
+def test_torn_single_save_does_not_swallow_later_saves(tmp_path, monkeypatch):
+    gdsf_file = _use_tmp_file(tmp_path, monkeypatch)
+    app_utils.save_theme("Sea")
+    app_utils.save_skill_kernels('["K_1"]')
+    # A worker killed while appending a large value.
+    with open(gdsf_file, "ab") as f:
+        f.write(b'[tit_table]\nvalue = "{\\"Joy\\": ')
+
+    app_utils.invalidate_cache()
+    app_utils.save_theme("Space")
+    app_utils.invalidate_cache()
+    assert app_utils.load_theme() == "Space"
+    assert app_utils.load_skill_kernels() == ["K_1"]
+
+
+def test_page_revision_catches_saves_between_runs(tmp_path, monkeypatch):
+    _use_tmp_file(tmp_path, monkeypatch)
+    app_utils.save_theme("Sea")
+    state = {}
+    assert app_utils.page_revision(state, "step6_revision") is None
+
+    # The user edits the form while another session saves.
+    GDSFStore(app_utils.GDSF_FILE).write({"theme": {"value": "Space"}})
+    revision = app_utils.page_revision(state, "step6_revision")
+    with pytest.raises(ConflictError):
+        with app_utils.transaction(expected_revision=revision):
+            app_utils.save_theme("Lava")
+    assert app_utils.load_theme() == "Space"
+
+    # Saving again from the refreshed page goes through.
+    with app_utils.transaction(expected_revision=app_utils.page_revision(state, "step6_revision")):
+        app_utils.save_theme("Lava")
+    assert app_utils.load_theme() == "Lava"
+
+
+def test_page_revision_allows_repeated_saves_from_one_session(tmp_path, monkeypatch):
+    _use_tmp_file(tmp_path, monkeypatch)
+    app_utils.save_theme("Sea")
+    state = {}
+    app_utils.page_revision(state, "step6_revision")  # The run that renders the form.
+
+    for theme in ("Space", "Lava"):
+        # Each submit is a new run that saves after recording its revision.
+        revision = app_utils.page_revision(state, "step6_revision")
+        with app_utils.transaction(expected_revision=revision):
+            app_utils.save_theme(theme)
+        app_utils.record_page_revision(state, "step6_revision")
+    assert app_utils.load_theme() == "Lava"
@@ -0,0 +1,156 @@
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from gdsf import ConflictError, GDSFParser, GDSFStore, SQLiteStore, open_store  # noqa: E402
+import ui.app_utils as app_utils  # noqa: E402
+
+SOURCE = """[meta]
+author = K
+version = "2"
+
+[schema]
+id = S1
+name = "Play"
+property = "mechanic"
+
+[schema]
+id = S2
+name = "Trust"
+property = "emotion"
+
+[edge]
+from = S1
+to = S2
+relation = "evokes"
+
+[theme]
+value = "Deep
+sea
+
+[not a header]"
+
+[atomic_unit]
+value = "Nutrition"
+"""
+
+TIT = {
+    "Joy": {
+        "Protein": {"K_1 Meat": {"Collect": "✔", "Result": "ok"}},
+        "Carbs": {"K_1 Bread": {"Collect": ""}},
+    },
+    "Fear": {"Protein": {"K_1 Meat": {"Dodge": True}}},
+}
+LEVELS = {"tit": ("emotion", "skill", "kernel", "column")}
+
+
+def test_gdsf_round_trip_is_lossless(tmp_path):
+    source = tmp_path / "in.gdsf"
+    source.write_text(SOURCE)
+    store = SQLiteStore(tmp_path / "info.sqlite")
+    store.import_gdsf(source)
+    store.export_gdsf(tmp_path / "out.gdsf")
+
+    before, after = GDSFParser(source), GDSFParser(tmp_path / "out.gdsf")
+    assert after.meta == {**before.meta, "revision": "1"}
+    assert after.schemas == before.schemas
+    assert after.edges == before.edges
+    assert after.sections == before.sections
+    assert store.read()[1] == before.sections
+
+
+def test_values_match_the_text_backend(tmp_path):
+    changes = {"theme": {"value": " padded "}, "text": {"value": "a\n\nb"}}
+    text_store = GDSFStore(tmp_path / "info.gdsf")
+    sql_store = SQLiteStore(tmp_path / "info.sqlite")
+    text_store.write(changes)
+    sql_store.write(changes)
+    assert sql_store.read()[1] == text_store.read()[1]
+
+
+def test_sees_commits_from_other_connections(tmp_path):
+    path = tmp_path / "info.sqlite"
+    reader, writer = SQLiteStore(path), SQLiteStore(path)
+    version, sections = reader.read()
+    assert sections == {}
+
+    writer.write({"theme": {"value": "Sea"}})
+    new_version, sections = reader.read()
+    assert new_version != version
+    assert sections == {"theme": {"value": "Sea"}}
+    assert reader.read()[0] == new_version
+
+    writer.replace({"theme_name": {"value": "Abyss"}})
+    assert reader.read()[1] == {"theme_name": {"value": "Abyss"}}
+    mode = sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+
+@pytest.mark.parametrize("cls", [GDSFStore, SQLiteStore])
+def test_cells_are_queried_by_level(tmp_path, cls):
+    store = cls(tmp_path / f"info.{cls.__name__}", indexed=LEVELS)
+    store.write({"tit": {"value": json.dumps(TIT)}})
+
+    joy = store.cells("tit", emotion="Joy")
+    assert [(c["skill"], c["column"], c["value"]) for c in joy] == [
+        ("Protein", "Collect", "✔"),
+        ("Protein", "Result", "ok"),
+        ("Carbs", "Collect", ""),
+    ]
+    assert store.cells("tit", skill="Protein", column="Dodge") == [
+        {"emotion": "Fear", "skill": "Protein", "kernel": "K_1 Meat", "column": "Dodge", "value": True}
+    ]
+
+    store.write({"tit": {"value": json.dumps({"Joy": {}})}})
+    assert store.cells("tit") == []
+    with pytest.raises(ValueError):
+        store.cells("tit", mood="Joy")
+    with pytest.raises(ValueError):
+        store.cells("theme")
+
+
+def test_open_store_follows_suffix(tmp_path):
+    assert isinstance(open_store(tmp_path / "a.gdsf"), GDSFStore)
+    assert isinstance(open_store(tmp_path / "a.sqlite"), SQLiteStore)
+    assert isinstance(open_store(tmp_path / "a.txt", backend="sqlite"), SQLiteStore)
+    with pytest.raises(ValueError):
+        open_store(tmp_path / "a.gdsf", backend="csv")
+
+
+def test_app_utils_on_sqlite(tmp_path, monkeypatch):
+    (tmp_path / "info.gdsf").write_text(SOURCE)
+    monkeypatch.setattr(app_utils, "DATA_PATH", tmp_path)
+    monkeypatch.setattr(app_utils, "GDSF_FILE", tmp_path / "info.sqlite")
+    app_utils.invalidate_cache()
+
+    # The existing text project is imported on first use.
+    assert app_utils.load_atomic_unit() == "Nutrition"
+
+    app_utils.save_tit(TIT)
+    assert app_utils.load_tit() == TIT
+    cells = app_utils.load_tit_cells("Joy", "Carbs")
+    assert [(c["kernel"], c["column"]) for c in cells] == [("K_1 Bread", "Collect")]
+
+    with app_utils.transaction():
+        app_utils.save_tit({"Calm": {"Rest": {"K_1": {"Sit": "✔"}}}})
+        assert [c["emotion"] for c in app_utils.load_tit_cells()] == ["Calm"]
+    assert app_utils.load_tit_cells("Joy") == []
+    app_utils.invalidate_cache()
+
+
+def test_stale_writer_gets_a_conflict(tmp_path):
+    path = tmp_path / "info.sqlite"
+    first, second = SQLiteStore(path), SQLiteStore(path)
+    revision = first.current_revision()
+    second.write({"theme": {"value": "Space"}}, expected_revision=revision)
+
+    with pytest.raises(ConflictError):
+        first.write({"theme": {"value": "Lava"}}, expected_revision=revision)
+    with pytest.raises(ConflictError):
+        first.replace({}, expected_revision=revision)
+    assert first.read()[1] == {"theme": {"value": "Space"}}
+    assert first.current_revision() == revision + 1
@@ -60,3 +60,35 @@ def test_step2_why_it_matters(monkeypatch):
     assert reasons == ["r1", "r2"]
     assert any("Atomic unit: Unit" == m for m in recorded["messages"])
     assert any("Kernel:" in m for m in recorded["messages"])
+
+
+def test_step2_kernels_concurrent_ids_follow_skill_order(monkeypatch):
+    import threading
+    import time
+
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+
+    class SlowModel:
+        def invoke(self, messages):
+            skill = messages[-1].content.split(": ", 1)[1]
+            with lock:
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+            # Earlier skills answer last.
+            time.sleep(0.01 * (10 - int(skill[1:])))
+            with lock:
+                active["now"] -= 1
+            kernels = [{"kernel": f"{skill}-a"}, {"kernel": f"{skill}-b"}]
+            return SimpleNamespace(content=json.dumps({skill: kernels}))
+
+    monkeypatch.setattr(ai, "get_llm", lambda: SlowModel())
+
+    skills = {"Declarative": ["s0", "s1", "s2"], "Procedural": ["s3", "s4", "s5"]}
+    data = json.loads(ai.step2_kernels("Unit", skills, max_workers=3))
+
+    assert list(data) == ["s0", "s1", "s2", "s3", "s4", "s5"]
+    ids = [k["id"] for kernels in data.values() for k in kernels]
+    assert ids == [f"k{i}" for i in range(1, 13)]
+    assert data["s4"][0]["learning_type"] == "Procedural"
+    assert 1 < active["peak"] <= 3
@@ -24,3 +24,59 @@ def test_step3b_all(monkeypatch):
 
     assert calls == [[{"k": "one"}], [{"k": "two"}]]
     assert result == {"kernels": [{"kernel": "one"}, {"kernel": "two"}]}
+
+
+def test_step3b_all_parallel_keeps_order_and_partial_results(monkeypatch):
+    import time
+
+    def fake_step3b(theme, kernels):
+        name = kernels[0]["k"]
+        if name == "slow":
+            time.sleep(1)
+        if name == "bad":
+            raise RuntimeError("model unavailable")
+        time.sleep(0.05 if name == "a" else 0)
+        return json.dumps({"kernels": [{"kernel": name}]})
+
+    monkeypatch.setattr(ai, "step3b", fake_step3b)
+
+    kernels = [{"k": "a"}, {"k": "slow"}, {"k": "bad"}, {"k": "b"}, {"k": "c"}]
+    start = time.monotonic()
+    result = ai.step3b_all("T", kernels, max_workers=2, timeout=0.2)
+
+    assert time.monotonic() - start < 0.9
+    assert result["kernels"] == [{"kernel": "a"}, {"kernel": "b"}, {"kernel": "c"}]
+    assert [(e["index"], e["kernel"]) for e in result["errors"]] == [(1, {"k": "slow"}), (2, {"k": "bad"})]
+    assert result["errors"][0]["error"] == "Timed out after 0.2s"
+    assert result["errors"][1]["error"] == "model unavailable"
+
+
+def test_step3b_all_abandoned_calls_keep_their_slot(monkeypatch):
+    import threading
+
+    release = threading.Event()
+    lock = threading.Lock()
+    in_flight = [0, 0]  # current, peak
+
+    def stalled_step3b(theme, kernels):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+        release.wait(5)
+        with lock:
+            in_flight[0] -= 1
+        return json.dumps({"kernels": [{"kernel": kernels[0]["k"]}]})
+
+    monkeypatch.setattr(ai, "step3b", stalled_step3b)
+
+    kernels = [{"k": str(i)} for i in range(6)]
+    try:
+        result = ai.step3b_all("T", kernels, max_workers=2, timeout=0.1)
+    finally:
+        release.set()
+
+    assert in_flight[1] == 2
+    assert "kernels" in result and result["kernels"] == []
+    errors = [e["error"] for e in result["errors"]]
+    assert errors[:2] == ["Timed out after 0.1s"] * 2
+    assert errors[2:] == ["Timed out after 0.1s waiting for a free slot"] * 4
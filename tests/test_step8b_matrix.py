@@ -0,0 +1,56 @@
+import json
+from pathlib import Path
+from types import SimpleNamespace
+import sys
+import types
+
+# Provide dummy modules for optional dependencies
+sys.modules.setdefault("dotenv", types.SimpleNamespace(load_dotenv=lambda **kwargs: None))
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+import ui.ai as ai  # noqa: E402
+
+
+def test_step8b_matrix_one_call_with_per_cell_fallback(monkeypatch):
+    prompts = []
+    answer = {
+        "K1": {"M1": "Accepted – fits.", "M2": "Maybe?"},
+        "K2": {"M1": "Rejected – no link.", "M2": "Revised – add a timer."},
+    }
+
+    class FakeModel:
+        def invoke(self, messages):
+            prompts.append(messages[1].content)
+            return SimpleNamespace(content="<think>x</think>```json\n" + json.dumps(answer) + "\n```")
+
+    cells = []
+
+    def fake_cell(kernel, mechanic, emotion):
+        cells.append((kernel, mechanic, emotion))
+        return "Revised – fallback."
+
+    monkeypatch.setattr(ai, "get_llm", lambda: FakeModel())
+    monkeypatch.setattr(ai, "step8b_cell", fake_cell)
+
+    matrix = ai.step8b_matrix(["kern a", "kern b"], ["Race", "Trade"], "Joy")
+
+    assert len(prompts) == 1
+    assert "K2: kern b" in prompts[0] and "M2: Trade" in prompts[0]
+    assert cells == [("kern a", "Trade", "Joy")]
+    assert matrix == [
+        ["Accepted – fits.", "Revised – fallback."],
+        ["Rejected – no link.", "Revised – add a timer."],
+    ]
+
+
+def test_step8b_matrix_per_row(monkeypatch):
+    class FakeModel:
+        def invoke(self, messages):
+            kernel = messages[1].content.split("K1: ", 1)[1].split("\n", 1)[0]
+            return SimpleNamespace(content=json.dumps({"K1": {"M1": f"Accepted – {kernel}"}}))
+
+    monkeypatch.setattr(ai, "get_llm", lambda: FakeModel())
+    monkeypatch.setattr(ai, "step8b_cell", lambda *args: "unused")
+
+    matrix = ai.step8b_matrix(["a", "b", "c"], ["Race"], "Joy", per_row=True, max_workers=2)
+    assert matrix == [["Accepted – a"], ["Accepted – b"], ["Accepted – c"]]